@@ -1,12 +1,20 @@
 from flask import Flask
 from .routes import bp
-from .database import init_db, populate_mock_data
+from .database import init_db, create_schema, populate_mock_data
 from .config import Config
+from .cache import init_cache
+from .instrumentation import init_instrumentation
+from .webhooks import init_webhooks
+from .scheduler import init_scheduler
+from .shops import init_shops
+from .timeseries import init_timeseries
 import logging
 
-def create_app():
+def create_app(test_config=None):
     app = Flask(__name__)
     app.config.from_object(Config)
+    if test_config:
+        app.config.update(test_config)  # e.g. point benchmarks or tests at another database
 
     # Configure logging
     logging.basicConfig(level=logging.INFO)
@@ -14,10 +22,22 @@ def create_app():
 
     # Register blueprints or routes
     from .routes import bp
+    from .api import api_bp
     app.register_blueprint(bp)
+    app.register_blueprint(api_bp)
 
-    # Initialize database
+    # Instrumentation wires its row-counting cursor into the engine options, so it goes first
+    init_instrumentation(app)
+
+    # Initialize database; production workers leave schema and seeding to scripts/init_db.py
     init_db(app)
-    populate_mock_data(app)
+    if app.config["BOOT_MODE"] != "production":
+        create_schema(app)
+        populate_mock_data(app)
+    init_cache(app)
+    init_shops(app)
+    init_timeseries(app)
+    init_webhooks(app)
+    init_scheduler(app)
 
     return app
@@ -0,0 +1,236 @@
+from .models import db, Product, Variant, InventoryItem, InventoryLevel, DailyProductSales
+import heapq
+from datetime import date, timedelta
+from itertools import islice
+from sqlalchemy import case, func, or_, select, union_all
+from .engines import read_session
+
+
+def _window_start(days, today=None):
+    """First calendar day of a window of `days` days ending today."""
+    return (today or date.today()) - timedelta(days=days - 1)
+
+
+def get_sales_velocities(shop, period_days=30, product_ids=None):
+    """
+    Calculate the average daily sales for every product sold by a shop in one grouped query.
+    Args:
+        shop: Shopify shop domain (string)
+        period_days: Number of days to consider for the average, including today (default: 30)
+        product_ids: Optional iterable of product IDs to restrict the query to
+    Returns:
+        dict: product_id -> average daily sales. Products without sales in the window are absent.
+    """
+    query = read_session().query(
+        DailyProductSales.product_id,
+        func.sum(DailyProductSales.quantity)
+    ).filter(
+        DailyProductSales.shop == shop,
+        DailyProductSales.date >= _window_start(period_days)
+    )
+    if product_ids is not None:
+        query = query.filter(DailyProductSales.product_id.in_(list(product_ids)))
+
+    return {
+        product_id: total_quantity / period_days
+        for product_id, total_quantity in query.group_by(DailyProductSales.product_id)
+    }
+
+
+def owned_by(shop):
+    """Filter for the products a shop sees: its own plus the shared catalog (shop IS NULL)."""
+    return or_(Product.shop == shop, Product.shop.is_(None))
+
+
+def _stock_query(by_location=False, session=None):
+    columns = [Variant.product_id]
+    if by_location:
+        columns.append(InventoryLevel.location_id)
+    return (session or read_session()).query(
+        *columns,
+        func.sum(InventoryLevel.available).label("stock")
+    ).join(InventoryItem, InventoryItem.variant_id == Variant.id).join(
+        InventoryLevel, InventoryLevel.inventory_item_id == InventoryItem.id
+    ).group_by(*columns)
+
+
+def get_stock_levels(product_ids=None, by_location=False):
+    """
+    Sum InventoryLevel.available per product in one joined aggregate query.
+    Args:
+        product_ids: Optional iterable of product IDs to restrict the query to
+        by_location: Break the totals down per location (default: False)
+    Returns:
+        dict: product_id -> stock, or (product_id, location_id) -> stock when by_location is set.
+        Products without inventory levels are absent.
+    """
+    query = _stock_query(by_location)
+    if product_ids is not None:
+        query = query.filter(Variant.product_id.in_(list(product_ids)))
+    if by_location:
+        return {(product_id, location_id): stock for product_id, location_id, stock in query}
+    return {product_id: stock for product_id, stock in query}
+
+
+def get_products_with_stock(shop=None):
+    """
+    Load every product (of `shop`, if given) together with its total stock in a single query.
+    Returns:
+        list: (Product, stock) tuples, with stock 0 for products without inventory levels.
+    """
+    # ORM objects stay on db.session so callers can modify them
+    stock = _stock_query(session=db.session).subquery()
+    query = db.session.query(
+        Product,
+        func.coalesce(stock.c.stock, 0)
+    ).outerjoin(stock, stock.c.product_id == Product.id)
+    if shop is not None:
+        query = query.filter(owned_by(shop))
+    return query.order_by(Product.id).all()
+
+
+def _per_product(shop, *columns):
+    """
+    Rows of (product_id, title, *columns) for every product (of `shop`, if given) in product ID order, with the
+    columns aggregated over the product's inventory levels.
+    """
+    def seek(owner=None):
+        query = select(Product.id.label("product_id"), Product.title, *columns).select_from(Product).outerjoin(
+            Variant, Variant.product_id == Product.id
+        ).outerjoin(
+            InventoryItem, InventoryItem.variant_id == Variant.id
+        ).outerjoin(
+            InventoryLevel, InventoryLevel.inventory_item_id == InventoryItem.id
+        )
+        if owner is not None:
+            query = query.where(owner)
+        return query.group_by(Product.id)
+
+    if shop is None:
+        statement = seek().order_by(Product.id)
+    else:
+        # Own and shared products as two seeks on ix_products_shop_id: each groups its levels as it walks the
+        # products in order. An OR (or a stock subquery over all levels) sorts every inventory level instead,
+        # which dominated once products had levels at many locations.
+        statement = union_all(seek(Product.shop == shop), seek(Product.shop.is_(None)))
+        statement = statement.order_by(statement.selected_columns.product_id)
+    return read_session().execute(statement).all()
+
+
+def get_catalog_stock(shop=None):
+    """
+    Load the id, title and total stock of every product (of `shop`, if given) as plain rows, without building
+    ORM objects.
+    Returns:
+        list: (product_id, title, stock) tuples ordered by product ID.
+    """
+    return _per_product(shop, func.coalesce(func.sum(InventoryLevel.available), 0))
+
+
+LOCATION_SEPARATOR = "\x1f"  # Location IDs are free-form strings; stock is an integer
+
+
+def get_location_stock(shop=None):
+    """
+    Load the stock of every product (of `shop`, if given) at every location in one query grouped by product.
+    Each product's levels come back packed, so 50k products x 100 locations is 50k rows rather than 5M tuples.
+    Returns:
+        list: (product_id, title, location_ids, available) tuples ordered by product ID. location_ids is the
+        LOCATION_SEPARATOR-joined list of the product's inventory level locations and available the
+        comma-joined stock of each, entry by entry (a location repeats for products with several variants).
+        Both are None for products without inventory levels.
+    """
+    # The outer joins yield one NULL level for a variant without inventory levels: both lists skip it, so they
+    # stay aligned entry by entry
+    has_level = InventoryLevel.id.is_not(None)
+    return _per_product(
+        shop,
+        func.group_concat(case((has_level, func.coalesce(InventoryLevel.location_id, ""))), LOCATION_SEPARATOR),
+        func.group_concat(case((has_level, InventoryLevel.available)), ",")
+    )
+
+
+def _product_stock(location=None):
+    """Correlated subquery: the stock of the outer query's product, optionally at one location only."""
+    query = select(func.coalesce(func.sum(InventoryLevel.available), 0)).select_from(Variant).join(
+        InventoryItem, InventoryItem.variant_id == Variant.id
+    ).join(
+        InventoryLevel, InventoryLevel.inventory_item_id == InventoryItem.id
+    ).where(Variant.product_id == Product.id)
+    if location is not None:
+        query = query.where(InventoryLevel.location_id == location)
+    return query.correlate(Product).scalar_subquery()
+
+
+def _stocked_at(location):
+    return select(Variant.id).join(
+        InventoryItem, InventoryItem.variant_id == Variant.id
+    ).join(
+        InventoryLevel, InventoryLevel.inventory_item_id == InventoryItem.id
+    ).where(Variant.product_id == Product.id, InventoryLevel.location_id == location).correlate(Product).exists()
+
+
+def get_inventory_page(shop, limit=100, after=None, location=None, max_stock=None):
+    """
+    One page of a shop's inventory in product ID order, using keyset pagination: each page seeks past the last
+    product ID of the previous one, so the cost of a page does not grow with its position in the catalog.
+    Stock is computed per returned product with correlated subqueries rather than for the whole catalog.
+    Args:
+        shop: Shopify shop domain (string)
+        limit: Maximum number of rows
+        after: Product ID of the last row of the previous page (None for the first page)
+        location: Only products stocked at this location, with their stock there
+        max_stock: Only products with at most this much stock (low-stock filter)
+    Returns:
+        list: (product_id, title, stock) tuples
+    """
+    stock = _product_stock(location).label("stock")
+
+    def seek(owner):
+        query = read_session().query(Product.id, Product.title, stock).filter(owner)
+        if after is not None:
+            query = query.filter(Product.id > after)
+        if location is not None:
+            query = query.filter(_stocked_at(location))
+        if max_stock is not None:
+            query = query.filter(stock <= max_stock)
+        return query.order_by(Product.id).limit(limit).all()
+
+    # Own and shared products are two ordered seeks on ix_products_shop_id; an OR would sort the whole catalog
+    merged = heapq.merge(seek(Product.shop == shop), seek(Product.shop.is_(None)), key=lambda row: row[0])
+    return list(islice(merged, limit))
+
+
+def iter_inventory(shop, page_size=1000, **filters):
+    """Stream a shop's whole inventory as (product_id, title, stock) rows, one keyset page in memory at a time."""
+    after = None
+    while True:
+        page = get_inventory_page(shop, page_size, after, **filters)
+        yield from page
+        if len(page) < page_size:
+            return
+        after = page[-1][0]
+
+
+def get_product_titles(product_ids):
+    """Map the given product IDs to their titles; unknown IDs are absent."""
+    product_ids = list(product_ids)
+    if not product_ids:
+        return {}
+    return dict(read_session().query(Product.id, Product.title).filter(Product.id.in_(product_ids)))
+
+
+def get_sales_rows(shop, since_days=30, today=None):
+    """
+    Read a shop's raw (product_id, date, quantity) rollup rows for the last `since_days` days, including today.
+    """
+    today = today or date.today()
+    return read_session().query(
+        DailyProductSales.product_id,
+        DailyProductSales.date,
+        DailyProductSales.quantity
+    ).filter(
+        DailyProductSales.shop == shop,
+        DailyProductSales.date >= _window_start(since_days, today),
+        DailyProductSales.date <= today
+    ).all()
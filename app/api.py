@@ -0,0 +1,296 @@
+# app/api.py
+import csv
+import gzip
+import hashlib
+import io
+import json
+import math
+from datetime import date
+from flask import Blueprint, Response, jsonify, request, stream_with_context, current_app as app
+from .aggregates import get_inventory_page, iter_inventory
+from .dashboard import DashboardSnapshot, forecast_section
+from .instrumentation import span
+from .routes import parse_forecast_params, shop_credentials
+from .versions import get_data_version
+
+api_bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+GZIP_MIN_BYTES = 1024  # Smaller bodies are not worth the CPU and the extra header
+GZIP_SUFFIX = "-gzip"  # Strong ETags differ per content-coding
+MAX_PAGE_SIZE = 1000
+EXPORT_PAGE_SIZE = 1000
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_payload(payload):
+    """Serialize a payload once into compact JSON and its gzip encoding (None if not worth compressing)."""
+    with span("serialize"):
+        body = json.dumps(payload, default=_json_default, separators=(",", ":")).encode()
+        compressed = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_BYTES else None
+    return body, compressed
+
+
+def make_etag(section, shop, version, **params):
+    """
+    Strong validator of a section: it changes with the shop's data version, the parameters and the day
+    (windows end today, so the same data version yields a different payload tomorrow).
+    """
+    key = "|".join([section, shop, str(version), date.today().isoformat()] +
+                   [f"{name}={params[name]}" for name in sorted(params)])
+    return hashlib.sha1(key.encode()).hexdigest()[:32]
+
+
+def _matching_etag(etag):
+    """The variant of `etag` (identity or gzip) named in If-None-Match, if any."""
+    for candidate in (etag, etag + GZIP_SUFFIX):
+        if request.if_none_match.contains_weak(candidate):
+            return candidate
+    return None
+
+
+def section_response(section, shop, compute, **params):
+    """
+    Serve a cached, pre-encoded section with a strong ETag: a matching If-None-Match gets a 304 without
+    computing (or even loading) anything beyond the shop's data version.
+    """
+    if not shop_credentials().get(shop):
+        return jsonify({"error": "Shop is not installed"}), 401
+    version = get_data_version(shop)
+    etag = make_etag(section, shop, version, **params)
+    matched = _matching_etag(etag)
+    if matched:
+        response = Response(status=304)
+        etag = matched
+    else:
+        body, compressed = app.extensions["dashboard_cache"].get_or_compute(
+            f"api.{section}", shop, version, lambda: encode_payload(compute()),
+            day=date.today().isoformat(), **params
+        )
+        if compressed is not None and request.accept_encodings["gzip"]:
+            response = Response(compressed, mimetype="application/json")
+            response.headers["Content-Encoding"] = "gzip"
+            etag += GZIP_SUFFIX
+        else:
+            response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"  # Always revalidate; unchanged data costs a 304
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+@api_bp.route("/shops/<shop>/sales")
+def sales(shop):
+    params, error = parse_forecast_params()
+    if error:
+        return error
+    top = request.args.get("top", 10, type=int)
+    if top < 1:
+        return jsonify({"error": "top must be positive"}), 400
+    window = params["window"]
+    return section_response(
+        "sales", shop, lambda: DashboardSnapshot(shop, window=window).sales_summary(top), window=window, top=top
+    )
+
+
+def parse_inventory_filters():
+    """
+    Read the location/max_stock filters of the inventory endpoints.
+    Returns:
+        tuple: (filters dict, None) or (None, 400 error response)
+    """
+    max_stock = request.args.get("max_stock", type=int)
+    if "max_stock" in request.args and max_stock is None:
+        return None, (jsonify({"error": "max_stock must be an integer"}), 400)
+    return {"location": request.args.get("location") or None, "max_stock": max_stock}, None
+
+
+@api_bp.route("/shops/<shop>/inventory")
+def inventory(shop):
+    """
+    A page of the shop's inventory, ordered by product ID. Pass the response's next_cursor as `cursor`
+    to get the following page; it is null on the last page.
+    """
+    filters, error = parse_inventory_filters()
+    if error:
+        return error
+    limit = request.args.get("limit", 100, type=int)
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return jsonify({"error": f"limit must be between 1 and {MAX_PAGE_SIZE}"}), 400
+    cursor = request.args.get("cursor") or None
+
+    def page():
+        # One extra row tells whether another page follows
+        rows = get_inventory_page(shop, limit + 1, cursor, **filters)
+        return {
+            "items": [{"product_id": product_id, "product": title, "stock": stock}
+                      for product_id, title, stock in rows[:limit]],
+            "next_cursor": rows[limit - 1][0] if len(rows) > limit else None,
+        }
+    return section_response("inventory", shop, page, limit=limit, cursor=cursor, **filters)
+
+
+def _ndjson_lines(rows):
+    for product_id, title, stock in rows:
+        yield json.dumps({"product_id": product_id, "product": title, "stock": stock}, separators=(",", ":")) + "\n"
+
+
+def _csv_lines(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["product_id", "product", "stock"])
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+@api_bp.route("/shops/<shop>/inventory/export")
+def inventory_export(shop):
+    """
+    The shop's whole inventory as NDJSON (default) or CSV (`format=csv`), streamed page by page so memory
+    stays constant whatever the catalog size. Accepts the same filters as the inventory endpoint.
+    """
+    if not shop_credentials().get(shop):
+        return jsonify({"error": "Shop is not installed"}), 401
+    filters, error = parse_inventory_filters()
+    if error:
+        return error
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in ("ndjson", "csv"):
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+
+    rows = iter_inventory(shop, EXPORT_PAGE_SIZE, **filters)
+    if export_format == "csv":
+        body, mimetype = _csv_lines(rows), "text/csv"
+    else:
+        body, mimetype = _ndjson_lines(rows), "application/x-ndjson"
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f'attachment; filename="inventory-{shop}.{export_format}"'
+    return response
+
+
+@api_bp.route("/shops/<shop>/alerts")
+def alerts(shop):
+    params, error = parse_forecast_params()
+    if error:
+        return error
+    return section_response(
+        "alerts", shop, lambda: {"alerts": forecast_section("alerts", shop, **params)}, **params
+    )
+
+
+@api_bp.route("/shops/<shop>/predictions")
+def predictions(shop):
+    params, error = parse_forecast_params()
+    if error:
+        return error
+    return section_response(
+        "predictions", shop, lambda: {"predictions": forecast_section("predictions", shop, **params)}, **params
+    )
+
+
+@api_bp.route("/shops/<shop>/locations")
+def locations(shop):
+    """
+    Stock and days of cover per location, rolled up across the network, with the `limit` (default 100) most
+    urgent product/location alerts. Accepts the forecast parameters of alerts and predictions.
+    """
+    params, error = parse_forecast_params()
+    if error:
+        return error
+    limit = request.args.get("limit", 100, type=int)
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return jsonify({"error": f"limit must be between 1 and {MAX_PAGE_SIZE}"}), 400
+    return section_response(
+        "locations", shop, lambda: DashboardSnapshot(shop, **params).location_summary(limit), limit=limit, **params
+    )
+
+
+MAX_GRID_CELLS = 400
+
+
+def _float_list(name):
+    try:
+        return [float(value) for value in request.args[name].split(",") if value.strip()]
+    except ValueError:
+        return None
+
+
+def parse_replenishment_params():
+    """
+    Read the service_level/order_cost/holding_cost query parameters, defaulting to the REPLENISHMENT_* settings.
+    Returns:
+        tuple: (params dict, None) or (None, 400 error response)
+    """
+    service_level = request.args.get("service_level", app.config["REPLENISHMENT_SERVICE_LEVEL"], type=float)
+    order_cost = request.args.get("order_cost", app.config["REPLENISHMENT_ORDER_COST"], type=float)
+    holding_cost = request.args.get("holding_cost", app.config["REPLENISHMENT_HOLDING_COST"], type=float)
+    if not 0 < service_level < 1 or not 0 <= order_cost < math.inf or not 0 < holding_cost < math.inf:
+        return None, (jsonify({
+            "error": "service_level must be between 0 and 1 (exclusive), order_cost finite and non-negative and "
+                     "holding_cost finite and positive"
+        }), 400)
+    return {"service_level": service_level, "order_cost": order_cost, "holding_cost": holding_cost}, None
+
+
+@api_bp.route("/shops/<shop>/replenishment")
+def replenishment(shop):
+    """
+    Safety stock, reorder point and EOQ-based order quantity per product at `lead_time`: catalog totals and the
+    `limit` (default 100) products to reorder first.
+    """
+    params, error = parse_forecast_params()
+    if error:
+        return error
+    costs, error = parse_replenishment_params()
+    if error:
+        return error
+    limit = request.args.get("limit", 100, type=int)
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return jsonify({"error": f"limit must be between 1 and {MAX_PAGE_SIZE}"}), 400
+    return section_response(
+        "replenishment", shop, lambda: DashboardSnapshot(shop, **params).replenishment(limit=limit, **costs),
+        limit=limit, **params, **costs
+    )
+
+
+@api_bp.route("/shops/<shop>/replenishment/grid")
+def replenishment_grid(shop):
+    """
+    What-if grid: replenishment totals of the whole shop for every combination of `lead_times` and
+    `service_levels` (comma-separated lists), computed in one pass over the catalog.
+    """
+    params, error = parse_forecast_params()
+    if error:
+        return error
+    costs, error = parse_replenishment_params()
+    if error:
+        return error
+    lead_times = _float_list("lead_times") if "lead_times" in request.args else [params["lead_time"]]
+    service_levels = _float_list("service_levels") if "service_levels" in request.args else [costs["service_level"]]
+    valid = (
+        lead_times and service_levels
+        and all(0 <= lead_time < math.inf for lead_time in lead_times)
+        and all(0 < level < 1 for level in service_levels)
+    )
+    if not valid:
+        return jsonify({
+            "error": "lead_times must be finite non-negative numbers and service_levels between 0 and 1"
+        }), 400
+    if len(lead_times) * len(service_levels) > MAX_GRID_CELLS:
+        return jsonify({"error": f"At most {MAX_GRID_CELLS} lead time x service level combinations"}), 400
+    del costs["service_level"]
+    return section_response(
+        "replenishment_grid", shop,
+        lambda: {"grid": DashboardSnapshot(shop, params["window"]).replenishment_grid(lead_times, service_levels, **costs)},
+        window=params["window"], lead_times=",".join(map(str, lead_times)),
+        service_levels=",".join(map(str, service_levels)), **costs
+    )
@@ -0,0 +1,147 @@
+# app/batch.py
+import json
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+from .dashboard import DashboardSnapshot
+from .forecasts import store_forecast
+from .models import db
+from .versions import get_data_version
+
+logger = logging.getLogger(__name__)
+
+_worker_app = None
+
+
+def _init_worker(config):
+    # Each pool process gets its own app, engine and connection pool; the parent has already set up the schema
+    global _worker_app
+    from . import create_app
+    _worker_app = create_app(dict(config, BOOT_MODE="production"))
+    logging.disable(logging.INFO)  # Per-request dashboard logs would drown the batch's progress
+
+
+def shop_report(shop, window=30, days_of_cover=30, lead_time=7, store=False):
+    """
+    Compute the alerts and predictions of one shop from a single DashboardSnapshot, optionally storing the
+    forecast in the `forecasts` table as the scheduler would. Runs in the current app context.
+    Returns:
+        dict: Shop, data version, products, alerts, predictions and elapsed seconds
+    """
+    started = time.perf_counter()
+    version = get_data_version(shop)
+    snapshot = DashboardSnapshot(shop, window, days_of_cover, lead_time)
+    alerts = snapshot.low_stock_alerts()
+    predictions = snapshot.stock_predictions()
+    seconds = time.perf_counter() - started
+    if store:
+        with db.engine.begin() as connection:
+            store_forecast(connection, shop, snapshot.forecast, version, seconds)
+    return {
+        "shop": shop,
+        "data_version": version,
+        "products": len(snapshot.forecast.product_ids),
+        "alerts": alerts,
+        "predictions": predictions,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def _report_in_worker(report, shop, params, store):
+    with _worker_app.app_context():
+        return report(shop, store=store, **params)
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class BatchRunner:
+    """
+    Runs shop_report() for many shops on a pool of `workers` processes, each with its own app and database
+    connections. Results stream to `sink` (a text file, one JSON line per shop) in completion order. A shop
+    that raises is recorded as failed and the others carry on. A dead worker breaks the whole pool, and there is
+    no telling which of the shops in flight killed it, so those shops are retried one at a time on a pool of
+    their own, where a crash is charged to its shop: each gets up to `max_attempts` such runs.
+    `progress(completed, total, record, elapsed)` is called after every shop. `report` is called in the workers
+    as report(shop, store=store, **params); it must be a module-level function, as spawned workers import it.
+    """
+
+    def __init__(self, config, params, workers=4, store=False, sink=None, progress=None, max_attempts=2,
+                 report=shop_report):
+        self.config = config
+        self.params = params
+        self.workers = workers
+        self.store = store
+        self.sink = sink
+        self.progress = progress
+        self.max_attempts = max_attempts
+        self.report = report
+
+    def run(self, shops):
+        """
+        Returns:
+            dict: Shops done and failed ({shop: error}), wall seconds, summed per-shop seconds and throughput
+        """
+        started = time.perf_counter()
+        done, failed, busy = [], {}, 0.0
+        attempts = dict.fromkeys(shops, 0)
+        batches = [list(shops)] if shops else []
+        while batches:
+            batch = batches.pop(0)
+            alone = len(batch) == 1  # Only then is a dead worker the shop's own doing
+            with self._executor(min(self.workers, len(batch))) as executor:
+                futures = {
+                    executor.submit(_report_in_worker, self.report, shop, self.params, self.store): shop
+                    for shop in batch
+                }
+                for future in as_completed(futures):
+                    shop = futures[future]
+                    try:
+                        record = future.result()
+                    except BrokenProcessPool as e:
+                        if not alone:
+                            batches.append([shop])
+                            continue
+                        attempts[shop] += 1
+                        if attempts[shop] < self.max_attempts:
+                            batches.append([shop])
+                            continue
+                        record = {"shop": shop, "error": f"Worker died: {e}"}
+                    except Exception as e:
+                        logger.error("Batch report for %s failed", shop, exc_info=True)
+                        record = {"shop": shop, "error": f"{type(e).__name__}: {e}"}
+                    if "error" in record:
+                        failed[shop] = record["error"]
+                    else:
+                        done.append(shop)
+                        busy += record["seconds"]
+                    self._write(record)
+                    if self.progress:
+                        self.progress(len(done) + len(failed), len(shops), record, time.perf_counter() - started)
+        seconds = time.perf_counter() - started
+        return {
+            "done": done,
+            "failed": failed,
+            "seconds": seconds,
+            "busy_seconds": busy,
+            "shops_per_second": len(shops) / seconds if seconds else 0.0,
+        }
+
+    def _write(self, record):
+        if self.sink is not None:
+            self.sink.write(json.dumps(record, default=_json_default, separators=(",", ":")) + "\n")
+            self.sink.flush()
+
+    def _executor(self, workers):
+        return ProcessPoolExecutor(
+            workers,
+            mp_context=multiprocessing.get_context("spawn"),  # Never fork a process that runs threads
+            initializer=_init_worker,
+            initargs=(self.config,)
+        )
@@ -0,0 +1,175 @@
+# app/cache.py
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class MemoryCache:
+    """
+    In-process LRU cache with a per-entry TTL. Only shared by the threads of one worker.
+    """
+    name = "memory"
+
+    def __init__(self, max_entries=256, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """
+    File-backed LRU cache with a per-entry TTL, shared by every worker process on the host.
+    Values are pickled; each thread keeps its own connection.
+    """
+    name = "sqlite"
+
+    def __init__(self, path, max_entries=1024, ttl=300):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_accessed_at ON cache (accessed_at)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return _MISSING
+        value, expires_at = row
+        if expires_at <= now:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            return _MISSING
+        conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return pickle.loads(value)
+
+    def set(self, key, value):
+        conn = self._connect()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), now + self.ttl, now)
+        )
+        conn.execute(
+            "DELETE FROM cache WHERE expires_at <= ? OR key IN ("
+            "SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (now, self.max_entries)
+        )
+
+    def delete(self, key):
+        self._connect().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self):
+        self._connect().execute("DELETE FROM cache")
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+class DashboardCache:
+    """
+    Caches dashboard sections per shop, parameters and shop data version.
+    A bumped data version changes the key, so stale entries are never served and age out through TTL/LRU.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(section, shop, version, **params):
+        return "|".join([section, shop, f"v{version}"] + [f"{name}={params[name]}" for name in sorted(params)])
+
+    def get_or_compute(self, section, shop, version, compute, **params):
+        """
+        Return the cached value of a section, calling compute() and storing its result on a miss.
+        """
+        key = self.make_key(section, shop, version, **params)
+        value = self.backend.get(key)
+        if value is not _MISSING:
+            with self._lock:
+                self.hits += 1
+            return value
+        with self._lock:
+            self.misses += 1
+        value = compute()
+        self.backend.set(key, value)
+        return value
+
+    def stats(self):
+        """Hit/miss counters of this worker plus the backend's current size."""
+        return {
+            "backend": self.backend.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self.backend)
+        }
+
+
+def init_cache(app):
+    """Create the dashboard cache configured by DASHBOARD_CACHE_* settings and attach it to the app."""
+    backend_name = app.config["DASHBOARD_CACHE_BACKEND"]
+    max_entries = app.config["DASHBOARD_CACHE_MAX_ENTRIES"]
+    ttl = app.config["DASHBOARD_CACHE_TTL"]
+    if backend_name == "sqlite":
+        backend = SQLiteCache(app.config["DASHBOARD_CACHE_PATH"], max_entries, ttl)
+    elif backend_name == "memory":
+        backend = MemoryCache(max_entries, ttl)
+    else:
+        raise ValueError(f"Unknown DASHBOARD_CACHE_BACKEND: {backend_name}")
+    app.extensions["dashboard_cache"] = DashboardCache(backend)
+    return app.extensions["dashboard_cache"]
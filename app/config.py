@@ -9,6 +9,68 @@ class Config:
     REDIRECT_URI = config('REDIRECT_URI')
     API_VERSION = config('API_VERSION')
     SCOPES = config('SCOPES', default='read_orders').split(',')
+    # Replaces https://<shop> in the OAuth token exchange, e.g. to point at a local stand-in under load tests
+    SHOPIFY_BASE_URL = config('SHOPIFY_BASE_URL', default='')
     SECRET_KEY = os.environ.get("SECRET_KEY", "your-secret-key-here")
-    SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(BASE_DIR, '..', 'mock_orders.db')}"
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_DATABASE_URI = config('DATABASE_URL', default=f"sqlite:///{os.path.join(BASE_DIR, '..', 'mock_orders.db')}")
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # "development" creates the schema and seeds mock data in create_app(); "production" boots without touching
+    # the database and expects `python scripts/init_db.py` to have run at deploy time
+    BOOT_MODE = config('BOOT_MODE', default='development')
+
+    # SQLite tuning, applied to every pooled connection (see app/engines.py)
+    SQLITE_JOURNAL_MODE = config('SQLITE_JOURNAL_MODE', default='WAL')  # Readers no longer block behind writers
+    SQLITE_SYNCHRONOUS = config('SQLITE_SYNCHRONOUS', default='NORMAL')  # Safe with WAL; fsyncs only at checkpoints
+    SQLITE_BUSY_TIMEOUT = config('SQLITE_BUSY_TIMEOUT', default=5000, cast=int)  # ms to wait for a lock
+    SQLITE_CACHE_SIZE_KIB = config('SQLITE_CACHE_SIZE_KIB', default=65536, cast=int)  # Page cache per connection
+    SQLITE_MMAP_SIZE = config('SQLITE_MMAP_SIZE', default=268435456, cast=int)  # Bytes of the file to memory-map
+    DB_POOL_SIZE = config('DB_POOL_SIZE', default=5, cast=int)
+    DB_MAX_OVERFLOW = config('DB_MAX_OVERFLOW', default=10, cast=int)
+    DB_POOL_TIMEOUT = config('DB_POOL_TIMEOUT', default=30, cast=int)
+    # Serve dashboard reads from a separate engine of read-only (mode=ro, query_only) connections
+    DB_READONLY_ENGINE = config('DB_READONLY_ENGINE', default=False, cast=bool)
+
+    # Dashboard result cache: "memory" (per worker) or "sqlite" (shared by all workers on the host)
+    DASHBOARD_CACHE_BACKEND = config('DASHBOARD_CACHE_BACKEND', default='memory')
+    DASHBOARD_CACHE_PATH = config('DASHBOARD_CACHE_PATH', default=os.path.join(BASE_DIR, '..', 'dashboard_cache.db'))
+    DASHBOARD_CACHE_TTL = config('DASHBOARD_CACHE_TTL', default=300, cast=int)
+    DASHBOARD_CACHE_MAX_ENTRIES = config('DASHBOARD_CACHE_MAX_ENTRIES', default=1024, cast=int)
+
+    # Installed shops are read from the shop_credentials table through a per-worker cache; a token rotated by a
+    # reinstall on another worker is picked up within this many seconds
+    SHOP_CACHE_TTL = config('SHOP_CACHE_TTL', default=60, cast=int)
+    SHOP_CACHE_MAX_ENTRIES = config('SHOP_CACHE_MAX_ENTRIES', default=10000, cast=int)
+
+    # Per-process ring buffers of daily sales serving forecasts and velocities from memory (see app/timeseries.py)
+    TIMESERIES_DAYS = config('TIMESERIES_DAYS', default=90, cast=int)  # Longest window served from memory
+    TIMESERIES_MAX_SHOPS = config('TIMESERIES_MAX_SHOPS', default=256, cast=int)  # Least recently read shops are dropped
+
+    # Columnar order history snapshots written by scripts/export_history.py; forecasts and sales summaries over
+    # windows of at least HISTORY_MIN_WINDOW days read them through memory maps instead of the rollup
+    HISTORY_DIR = config('HISTORY_DIR', default=os.path.join(BASE_DIR, '..', 'history'))
+    HISTORY_MIN_WINDOW = config('HISTORY_MIN_WINDOW', default=90, cast=int)
+
+    # Log a warning (and count it in /metrics) when one statement runs this many times in a request
+    N_PLUS_ONE_THRESHOLD = config('N_PLUS_ONE_THRESHOLD', default=10, cast=int)
+
+    # Webhook deliveries are written by a background thread, in one transaction per batch
+    WEBHOOK_BATCH_SIZE = config('WEBHOOK_BATCH_SIZE', default=500, cast=int)  # Max deliveries per transaction
+    WEBHOOK_FLUSH_INTERVAL_MS = config('WEBHOOK_FLUSH_INTERVAL_MS', default=200, cast=int)  # Max wait to fill a batch
+    WEBHOOK_QUEUE_SIZE = config('WEBHOOK_QUEUE_SIZE', default=10000, cast=int)  # Beyond this, answer 503 so Shopify retries
+
+    # Background forecasts (see app/scheduler.py): the default dashboard parameters are precomputed per shop
+    FORECAST_SCHEDULER = config('FORECAST_SCHEDULER', default=True, cast=bool)
+    FORECAST_WINDOW = config('FORECAST_WINDOW', default=30, cast=int)
+    FORECAST_DAYS_OF_COVER = config('FORECAST_DAYS_OF_COVER', default=30, cast=int)
+    FORECAST_LEAD_TIME = config('FORECAST_LEAD_TIME', default=7, cast=int)
+    FORECAST_MAX_AGE = config('FORECAST_MAX_AGE', default=900, cast=int)  # Seconds before an unchanged shop is recomputed
+    FORECAST_POLL_INTERVAL_MS = config('FORECAST_POLL_INTERVAL_MS', default=2000, cast=int)  # How often data versions are checked
+    FORECAST_WORKERS = config('FORECAST_WORKERS', default=2, cast=int)
+    FORECAST_EXECUTOR = config('FORECAST_EXECUTOR', default='thread')  # "thread" or "process"
+    # Only the worker holding this lock schedules, so a gunicorn fleet computes each forecast once
+    FORECAST_LOCK_PATH = config('FORECAST_LOCK_PATH', default=os.path.join(BASE_DIR, '..', 'forecast_scheduler.lock'))
+
+    # Replenishment defaults: cycle service level, fixed cost per order and cost of holding one unit for a year
+    REPLENISHMENT_SERVICE_LEVEL = config('REPLENISHMENT_SERVICE_LEVEL', default=0.95, cast=float)
+    REPLENISHMENT_ORDER_COST = config('REPLENISHMENT_ORDER_COST', default=50.0, cast=float)
+    REPLENISHMENT_HOLDING_COST = config('REPLENISHMENT_HOLDING_COST', default=2.0, cast=float)
@@ -1,8 +1,256 @@
-from .models import Order, Product, InventoryLevel, InventoryItem, Variant, LineItem
-from datetime import datetime, timedelta
+import heapq
+from .aggregates import get_sales_velocities, get_catalog_stock, get_location_stock, get_product_titles, get_sales_rows
+from .forecasting import CatalogForecast, LocationForecast, build_sales_matrix, build_stock_matrix, load_sales_matrix
+from .history import shop_history
+from .forecasts import stored_alerts, stored_predictions
+from .instrumentation import Abbreviated, span
+from .replenishment import ReplenishmentPlan, what_if_grid
+from datetime import date, datetime, timedelta
 from flask import current_app as app
 
 
+class DashboardSnapshot:
+    """
+    Everything one dashboard render needs for a shop, loaded lazily and at most once:
+    the catalog with stock (one query) and the windowed daily sales (one query).
+    All four dashboard sections are derived from this shared in-memory data.
+    """
+
+    def __init__(self, shop, window=30, days_of_cover=30, lead_time=7, today=None):
+        self.shop = shop
+        self.window = window
+        self.days_of_cover = days_of_cover
+        self.lead_time = lead_time
+        self.today = today or date.today()
+        self._catalog = None
+        self._sales_rows = None
+        self._forecast = None
+        self._location_stock = None
+        self._location_forecast = None
+        self._history = False  # Not looked up yet
+
+    @property
+    def catalog(self):
+        """(product_id, title, stock) rows ordered by product ID."""
+        if self._catalog is None:
+            with span("query.catalog"):
+                self._catalog = get_catalog_stock(self.shop)
+        return self._catalog
+
+    @property
+    def sales_rows(self):
+        """(product_id, date, quantity) rollup rows of the window."""
+        if self._sales_rows is None:
+            with span("query.sales"):
+                self._sales_rows = get_sales_rows(self.shop, self.window, self.today)
+        return self._sales_rows
+
+    @property
+    def history(self):
+        """The shop's order history snapshot when the window is long enough to read it (see app/history.py)."""
+        if self._history is False:
+            snapshot = shop_history(self.shop, self.window)
+            self._history = snapshot if snapshot is not None and snapshot.end <= self.today else None
+        return self._history
+
+    def sales_matrix(self, product_ids):
+        """
+        Product x day sales of the window: from the history snapshot for long windows, from this worker's sales
+        series (app/timeseries.py) for windows it covers, else from the rollup rows.
+        """
+        if self.history is not None:
+            with span("query.history"):
+                return load_sales_matrix(self.shop, product_ids, self.window, self.today)
+        series = app.extensions.get("sales_series")
+        usable = series is not None and self.window <= series.days and self.today == series.clock()
+        if usable and self._sales_rows is None:  # Rows already loaded for the orders section are as good
+            with span("query.sales_series"):
+                return series.sales_matrix(self.shop, product_ids, self.window)
+        sales_rows = self.sales_rows
+        with span("compute.sales_matrix"):
+            return build_sales_matrix(sales_rows, product_ids, self.window, self.today)
+
+    @property
+    def forecast(self):
+        if self._forecast is None:
+            catalog = self.catalog
+            product_ids = [row[0] for row in catalog]
+            sales = self.sales_matrix(product_ids)
+            with span("compute.forecast"):
+                self._forecast = CatalogForecast(
+                    product_ids,
+                    [row[1] for row in catalog],
+                    [row[2] for row in catalog],
+                    sales,
+                    self.days_of_cover,
+                    self.lead_time,
+                    today=self.today
+                )
+        return self._forecast
+
+    @property
+    def location_stock(self):
+        """(product_id, title, location_id, stock) rows ordered by product ID (one grouped query)."""
+        if self._location_stock is None:
+            with span("query.location_stock"):
+                self._location_stock = get_location_stock(self.shop)
+        return self._location_stock
+
+    @property
+    def location_forecast(self):
+        if self._location_forecast is None:
+            product_ids, titles, location_ids, stock, carried = build_stock_matrix(self.location_stock)
+            sales = self.sales_matrix(product_ids)
+            with span("compute.location_forecast"):
+                self._location_forecast = LocationForecast(
+                    product_ids, titles, location_ids, stock, carried, sales, self.days_of_cover, self.lead_time,
+                    today=self.today
+                )
+        return self._location_forecast
+
+    def orders_data(self):
+        """Daily sales with per-product line items, in chronological order."""
+        catalog, sales_rows = self.catalog, self.sales_rows
+        with span("compute.orders"):
+            return self._bucket_orders(catalog, sales_rows)
+
+    @staticmethod
+    def _bucket_orders(catalog, sales_rows):
+        titles = {product_id: title for product_id, title, _ in catalog}
+        days = {}
+        for product_id, day, quantity in sales_rows:
+            products = days.setdefault(day, {})
+            title = titles.get(product_id, product_id)
+            products[title] = products.get(title, 0) + quantity
+        return [
+            {
+                'date': day.isoformat(),
+                'sales': sum(products.values()),
+                'line_items': [
+                    {'product_title': title, 'quantity': quantity}
+                    for title, quantity in sorted(products.items())
+                ]
+            }
+            for day, products in sorted(days.items())
+        ]
+
+    def sales_summary(self, top=10):
+        """
+        Compact sales payload: units sold per day over the whole window (zero-filled, oldest first) as parallel
+        `dates`/`sales` lists, and the `top` best-selling products of the window.
+        """
+        start = self.today - timedelta(days=self.window - 1)
+        history = self.history
+        if history is not None:
+            # Days before the snapshot ends are summed over its memory-mapped columns; the rest come from the rollup
+            with span("query.history"):
+                last = min(history.end - timedelta(days=1), self.today)
+                daily = history.daily_totals(start, last).tolist() if last >= start else []
+                by_product = history.product_totals(start, last) if last >= start else {}
+                daily += [0] * (self.window - len(daily))
+                sales_rows = get_sales_rows(self.shop, (self.today - max(history.end, start)).days + 1, self.today)
+        else:
+            daily = [0] * self.window
+            by_product = {}
+            sales_rows = self.sales_rows
+        with span("compute.sales"):
+            for product_id, day, quantity in sales_rows:
+                daily[(day - start).days] += quantity
+                by_product[product_id] = by_product.get(product_id, 0) + quantity
+            best = heapq.nlargest(top, sorted(by_product.items()), key=lambda item: item[1])
+        # Only the top products need titles; reuse the catalog if this snapshot already loaded it
+        if self._catalog is not None:
+            titles = {product_id: title for product_id, title, _ in self._catalog}
+        else:
+            titles = get_product_titles(product_id for product_id, _ in best)
+        return {
+            'dates': [(start + timedelta(days=offset)).isoformat() for offset in range(self.window)],
+            'sales': daily,
+            'top_products': [
+                {'product': titles.get(product_id, product_id), 'quantity': quantity}
+                for product_id, quantity in best
+            ]
+        }
+
+    def inventory_data(self):
+        catalog = self.catalog
+        with span("compute.inventory"):
+            return [{'product': title, 'stock': stock} for _, title, stock in catalog]
+
+    def low_stock_alerts(self):
+        forecast = self.forecast
+        with span("compute.alerts"):
+            return forecast.alerts()
+
+    def stock_predictions(self):
+        forecast = self.forecast
+        with span("compute.predictions"):
+            return forecast.predictions()
+
+    def replenishment(self, service_level=0.95, order_cost=50.0, holding_cost=2.0, limit=100):
+        """Safety stock, reorder point and order quantity at this snapshot's lead time: totals and the `limit` most urgent products."""
+        forecast = self.forecast
+        with span("compute.replenishment"):
+            plan = ReplenishmentPlan(
+                forecast.product_ids, forecast.titles, forecast.stock, forecast.sales, self.lead_time, service_level,
+                order_cost, holding_cost
+            )
+            return {'summary': plan.summary(), 'items': plan.items(limit)}
+
+    def replenishment_grid(self, lead_times, service_levels, order_cost=50.0, holding_cost=2.0):
+        """Replenishment totals for every lead time x service level combination (see what_if_grid)."""
+        forecast = self.forecast
+        with span("compute.replenishment_grid"):
+            return what_if_grid(forecast.stock, forecast.sales, lead_times, service_levels, order_cost, holding_cost)
+
+    def location_summary(self, limit=100):
+        """
+        Stock and depletion per location: the network-wide rollup, one entry per location and the `limit` most
+        urgent product/location alerts.
+        """
+        forecast = self.location_forecast
+        with span("compute.locations"):
+            catalog = forecast.catalog
+            low = catalog.days_remaining < (catalog.days_of_cover + catalog.lead_time)
+            return {
+                'rollup': {
+                    'stock': int(catalog.stock.sum()),
+                    'products': len(catalog.product_ids),
+                    'locations': len(forecast.location_ids),
+                    'low_stock': int(low.sum()),
+                    'low_stock_at_locations': int(forecast.low.sum())
+                },
+                'locations': forecast.locations(),
+                'alerts': forecast.alerts(limit)
+            }
+
+
+def forecast_section(section, shop, window=30, days_of_cover=30, lead_time=7):
+    """
+    Low stock alerts ("alerts") or stock predictions ("predictions") of a shop. Reads the rows precomputed by the
+    forecast scheduler when they are current for these parameters, and otherwise computes them on the request
+    (asking the scheduler to catch up).
+    """
+    scheduler = app.extensions.get("forecast_scheduler")
+    if scheduler is not None and scheduler.serves(window, days_of_cover, lead_time):
+        stored = (stored_alerts if section == "alerts" else stored_predictions)(shop, window, days_of_cover, lead_time)
+        if stored is not None:
+            return stored
+        scheduler.notify()
+    snapshot = DashboardSnapshot(shop, window, days_of_cover, lead_time)
+    return snapshot.low_stock_alerts() if section == "alerts" else snapshot.stock_predictions()
+
+
+def get_location_summary(shop, window=30, days_of_cover=30, lead_time=7, limit=100):
+    app.logger.debug("Starting get_location_summary for shop: %s, window: %s", shop, window)
+    try:
+        summary = DashboardSnapshot(shop, window, days_of_cover, lead_time).location_summary(limit)
+        app.logger.debug("Location summary computed: %s", Abbreviated(summary))
+        return summary
+    except Exception as e:
+        app.logger.error("Error in get_location_summary for shop %s: %s", shop, e, exc_info=True)
+        raise
+
 def calculate_avg_daily_sales(product, shop, period_days=30):
     """
     Calculate the average daily sales for a product over a specified period.
@@ -13,125 +261,62 @@ def calculate_avg_daily_sales(product, shop, period_days=30):
     Returns:
         float: Average daily sales (quantity sold per day)
     """
-    app.logger.info(f"Starting calculate_avg_daily_sales for product: {product.id}, shop: {shop}")
+    app.logger.debug("Starting calculate_avg_daily_sales for product: %s, shop: %s", product.id, shop)
     try:
-        start_date = datetime.now() - timedelta(days=period_days)
-        line_items = LineItem.query.join(Order).filter(
-            LineItem.product_id == product.id,
-            Order.shop == shop,
-            Order.created_at >= start_date
-        ).all()
-
-        total_quantity = sum(item.quantity for item in line_items)
-        days_with_sales = (datetime.now() - start_date).days or 1
-        avg_daily_sales = total_quantity / days_with_sales
-        app.logger.info(f"Average daily sales for product {product.id}: {avg_daily_sales}")
+        series = app.extensions.get("sales_series")
+        if series is not None and period_days <= series.days:
+            avg_daily_sales = series.velocity(shop, product.id, period_days)
+        else:
+            avg_daily_sales = get_sales_velocities(shop, period_days, product_ids=[product.id]).get(product.id, 0.0)
+        app.logger.debug("Average daily sales for product %s: %s", product.id, avg_daily_sales)
         return avg_daily_sales
     except Exception as e:
-        app.logger.error(f"Error in calculate_avg_daily_sales for product {product.id}, shop {shop}: {str(e)}", exc_info=True)
+        app.logger.error("Error in calculate_avg_daily_sales for product %s, shop %s: %s", product.id, shop, e, exc_info=True)
         raise
 
 def get_orders_data(shop, since_days=30):
-    app.logger.info(f"Starting get_orders_data for shop: {shop}, since_days: {since_days} (type: {type(since_days)})")
+    app.logger.debug("Starting get_orders_data for shop: %s, since_days: %s", shop, since_days)
     try:
         since_days = int(since_days)
-        app.logger.info(f"Converted since_days to: {since_days} (type: {type(since_days)})")
-
-        since_date = (datetime.now() - timedelta(days=since_days)).isoformat() + "Z"
-        app.logger.info(f"Calculated since_date: {since_date}")
-
-        orders = Order.query.filter(
-            Order.shop == shop,
-            Order.created_at >= datetime.now() - timedelta(days=since_days)
-        ).all()
-
-        daily_sales = {}
-        for order in orders:
-            for line_item in order.line_items:
-                date_str = order.created_at.strftime('%Y-%m-%d')
-                daily_sales[date_str] = daily_sales.get(date_str, 0) + line_item.quantity
-
-        orders_data = [
-            {
-                'date': date,
-                'sales': sales,
-                'line_items': [
-                    {'product_title': li.product_title, 'quantity': li.quantity}
-                    for order in orders
-                    for li in order.line_items
-                    if order.created_at.strftime('%Y-%m-%d') == date
-                ]
-            }
-            for date, sales in daily_sales.items()
-        ]
-        app.logger.info(f"Orders data processed: {orders_data}")
+        orders_data = DashboardSnapshot(shop, window=since_days).orders_data()
+        app.logger.debug("Orders data processed: %s", Abbreviated(orders_data))
         return orders_data
     except Exception as e:
-        app.logger.error(f"Error in get_orders_data for shop {shop}: {str(e)}", exc_info=True)
+        app.logger.error("Error in get_orders_data for shop %s: %s", shop, e, exc_info=True)
         raise
 
 def get_inventory_data(shop):
-    app.logger.info(f"Starting get_inventory_data for shop: {shop}")
+    app.logger.debug("Starting get_inventory_data for shop: %s", shop)
     try:
-        inventory_data = []
-        for product in Product.query.all():
-            inventory_data.append({
-                'product': product.title,
-                'stock': product.total_stock
-            })
-        app.logger.info(f"Inventory data processed: {inventory_data}")
+        inventory_data = DashboardSnapshot(shop).inventory_data()
+        app.logger.debug("Inventory data processed: %s", Abbreviated(inventory_data))
         return inventory_data
     except Exception as e:
-        app.logger.error(f"Error in get_inventory_data for shop {shop}: {str(e)}", exc_info=True)
+        app.logger.error("Error in get_inventory_data for shop %s: %s", shop, e, exc_info=True)
         raise
 
-def get_stock_predictions(shop):
-    app.logger.info(f"Starting get_stock_predictions for shop: {shop}")
+def get_stock_predictions(shop, window=30, days_of_cover=30, lead_time=7):
+    app.logger.debug(
+        "Starting get_stock_predictions for shop: %s, window: %s, days of cover: %s, lead time: %s",
+        shop, window, days_of_cover, lead_time
+    )
     try:
-        days_of_cover = 30
-        lead_time = 7
-
-        app.logger.info(f"Days of cover: {days_of_cover} (type: {type(days_of_cover)})")
-        app.logger.info(f"Lead time: {lead_time} (type: {type(lead_time)})")
-
-        predictions = []
-        for product in Product.query.all():
-            avg_daily_sales = calculate_avg_daily_sales(product, shop)
-            predicted_stock = product.total_stock - (avg_daily_sales * days_of_cover)  # Use total_stock
-            restock_date = datetime.now() + timedelta(days=lead_time)
-            predictions.append({
-                'product': product.title,
-                'predicted_stock': predicted_stock if predicted_stock > 0 else 0,
-                'restock_date': restock_date
-            })
-        app.logger.info(f"Stock predictions fetched: {predictions}")
+        predictions = forecast_section("predictions", shop, window, days_of_cover, lead_time)
+        app.logger.debug("Stock predictions fetched: %s", Abbreviated(predictions))
         return predictions
     except Exception as e:
-        app.logger.error(f"Error in get_stock_predictions for shop {shop}: {str(e)}", exc_info=True)
+        app.logger.error("Error in get_stock_predictions for shop %s: %s", shop, e, exc_info=True)
         raise
 
-def get_low_stock_alerts(shop):
-    app.logger.info(f"Starting get_low_stock_alerts for shop: {shop}")
+def get_low_stock_alerts(shop, window=30, days_of_cover=30, lead_time=7):
+    app.logger.debug(
+        "Starting get_low_stock_alerts for shop: %s, window: %s, days of cover: %s, lead time: %s",
+        shop, window, days_of_cover, lead_time
+    )
     try:
-
-        days_of_cover = 30
-        lead_time = 7
-
-        app.logger.info(f"Days of cover: {days_of_cover} (type: {type(days_of_cover)})")
-        app.logger.info(f"Lead time: {lead_time} (type: {type(lead_time)})")
-
-        alerts = []
-        for product in Product.query.all():
-            stock = product.total_stock  # Use total_stock instead of quantity
-            avg_daily_sales = calculate_avg_daily_sales(product, shop)
-            days_remaining = stock / avg_daily_sales if avg_daily_sales > 0 else float('inf')
-            if days_remaining < (days_of_cover + lead_time):
-                alerts.append({
-                    'product': product.title,
-                    'days_remaining': days_remaining
-                })
-        app.logger.info(f"Low stock alerts fetched: {alerts}")
+        alerts = forecast_section("alerts", shop, window, days_of_cover, lead_time)
+        app.logger.debug("Low stock alerts fetched: %s", Abbreviated(alerts))
         return alerts
     except Exception as e:
-        app.logger.error(f"Error in get_low_stock_alerts for shop {shop}: {str(e)}", exc_info=True)
+        app.logger.error("Error in get_low_stock_alerts for shop %s: %s", shop, e, exc_info=True)
         raise
\ No newline at end of file
@@ -2,8 +2,11 @@
 import logging
 from random import randint, choice
 from flask import Flask
-from .models import db, Order, LineItem, Product, Variant, InventoryItem, InventoryLevel
-from .config import Config
+from .models import db, Order, LineItem, Product, Variant, InventoryItem, InventoryLevel, DailyProductSales, ShopDataVersion
+from .rollup import install_rollup_hooks, rebuild_daily_sales
+from .versions import install_version_hooks
+from .migrations import run_migrations
+from .engines import configure_engine_options, init_engines
 from datetime import datetime, timedelta
 
 
@@ -12,12 +15,22 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 def init_db(app: Flask):
-    """Initialize the database with the application configuration."""
-    app.config.from_object(Config)
+    """Bind the database to the application configuration. Opens no connection."""
+    configure_engine_options(app)
     db.init_app(app)
+    init_engines(app)
+    install_rollup_hooks()
+    install_version_hooks()
+
+def create_schema(app: Flask):
+    """Create missing tables, apply pending migrations and backfill the sales rollup."""
     with app.app_context():
         db.create_all()  # Create tables if they don't exist
+        run_migrations()  # Bring existing tables up to date; create_all never alters them
         logger.info("Database tables initialized.")
+        # Backfill the sales rollup for databases created before it existed
+        if DailyProductSales.query.first() is None and Order.query.first() is not None:
+            rebuild_daily_sales()
 
 def populate_inventory(app):
     with app.app_context():
@@ -38,13 +51,18 @@ def populate_inventory(app):
                 variant_id=variant.id,
                 tracked=True
             )
-            inventory_level = InventoryLevel(
-                inventory_item_id=inventory_item.id,
-                available=randint(10, 100),
-                updated_at=datetime.now()
-            )
+            # Every other product is also stocked at a second warehouse
+            inventory_levels = [
+                InventoryLevel(
+                    inventory_item_id=inventory_item.id,
+                    location_id=location_id,
+                    available=randint(10, 100),
+                    updated_at=datetime.now()
+                )
+                for location_id in MOCK_LOCATIONS[:1 + i % 2]
+            ]
             products.append(product)
-            db.session.add_all([product, variant, inventory_item, inventory_level])
+            db.session.add_all([product, variant, inventory_item, *inventory_levels])
         db.session.commit()
 
 def populate_orders(app, num_orders=500, shop="quickstart-c21ead54.myshopify.com"):
@@ -78,7 +96,7 @@ def populate_mock_data(app, session_data=None):
                 app.logger.info("Mock data populated successfully.")
             except Exception as e:
                 db.session.rollback()
-                app.logger.error(f"Failed to populate mock data: {e}")
+                app.logger.error("Failed to populate mock data: %s", e)
 
 
 def clear_database(app: Flask):
@@ -91,11 +109,15 @@ def clear_database(app: Flask):
             db.session.query(Product).delete()
             db.session.query(LineItem).delete()
             db.session.query(Order).delete()
+            db.session.query(DailyProductSales).delete()
+            db.session.query(ShopDataVersion).update({ShopDataVersion.version: ShopDataVersion.version + 1})
             db.session.commit()
             logger.info("Database cleared successfully.")
         except Exception as e:
             db.session.rollback()
-            logger.error(f"Failed to clear database: {e}")
+            logger.error("Failed to clear database: %s", e)
+
+MOCK_LOCATIONS = ["default_location_1", "default_location_2"]
 
 # Define PRODUCTS_DATA globally for use in populate_orders
 PRODUCTS_DATA = [
@@ -0,0 +1,186 @@
+# app/datagen.py
+import logging
+import time
+import numpy as np
+from datetime import datetime, timedelta
+from .models import db
+from .rollup import record_sales
+from .versions import bump_data_version
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHOP_TEMPLATE = "{prefix}-shop-{index}.myshopify.com"
+
+
+def _datetime_strings(start, seconds):
+    """Format offsets in seconds from `start` the way SQLAlchemy stores DateTime columns in SQLite."""
+    stamps = np.datetime64(start, "us") + (seconds * 1_000_000).astype("timedelta64[us]")
+    return np.char.replace(np.datetime_as_string(stamps, unit="us"), "T", " ").tolist()
+
+
+def day_weights(days, seasonality, end):
+    """
+    Relative order volume per day: weekly and yearly sine waves with `seasonality` as combined amplitude.
+    """
+    offsets = np.arange(days)
+    day_of_year = np.array([(end - timedelta(days=int(days - 1 - d))).timetuple().tm_yday for d in offsets])
+    weights = 1 + seasonality * (
+        0.5 * np.sin(2 * np.pi * offsets / 7) + 0.5 * np.sin(2 * np.pi * day_of_year / 365)
+    )
+    weights = np.clip(weights, 0.05, None)
+    return weights / weights.sum()
+
+
+def _drop_secondary_indexes(connection, tables):
+    """Drop the named (non-constraint) indexes of `tables` and return their DDL so they can be rebuilt."""
+    placeholders = ", ".join("?" for _ in tables)
+    indexes = connection.exec_driver_sql(
+        f"SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({placeholders})",
+        tuple(tables)
+    ).all()
+    for name, _ in indexes:
+        connection.exec_driver_sql(f"DROP INDEX {name}")
+    return [sql for _, sql in indexes]
+
+
+def generate_catalog(connection, skus, prefix="gen", rng=None, locations=1, max_stock=500):
+    """
+    Insert `skus` products, each with one variant, inventory item and an inventory level per location.
+    Returns:
+        list: (product_id, title) of the generated products
+    """
+    rng = rng or np.random.default_rng()
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
+    # Zero-padded IDs sort in generation order, so index inserts append instead of splitting pages
+    products = [(f"{prefix}_prod_{i:08d}", f"Product {i}") for i in range(skus)]
+    connection.exec_driver_sql("INSERT INTO products (id, title) VALUES (?, ?)", products)
+    connection.exec_driver_sql(
+        "INSERT INTO variants (id, product_id, title, sku, inventory_item_id) VALUES (?, ?, ?, ?, ?)",
+        [(f"{prefix}_var_{i}", product_id, f"Variant {i}", f"SKU-{i}", f"{prefix}_inv_item_{i}")
+         for i, (product_id, _) in enumerate(products)]
+    )
+    connection.exec_driver_sql(
+        "INSERT INTO inventory_items (id, variant_id, tracked) VALUES (?, ?, 1)",
+        [(f"{prefix}_inv_item_{i}", f"{prefix}_var_{i}") for i in range(skus)]
+    )
+    stock = rng.integers(0, max_stock, size=(locations, skus)).tolist()
+    for location in range(locations):
+        connection.exec_driver_sql(
+            "INSERT INTO inventory_levels (inventory_item_id, location_id, available, updated_at) VALUES (?, ?, ?, ?)",
+            [(f"{prefix}_inv_item_{i}", f"location_{location + 1}", stock[location][i], now) for i in range(skus)]
+        )
+    return products
+
+
+def generate_orders(connection, shop, products, orders, line_items_per_order=3, days=90, seasonality=0.3,
+                    prefix="gen", rng=None, batch_size=50000, end=None, popularity=None):
+    """
+    Insert `orders` orders for one shop in batches of executemany inserts and update the sales rollup.
+    Returns:
+        int: Number of line items written
+    """
+    rng = rng or np.random.default_rng()
+    end = end or datetime.now()
+    start = (end - timedelta(days=days - 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    weights = day_weights(days, seasonality, end)
+    if popularity is None:
+        popularity = rng.permutation(1 / np.arange(1, len(products) + 1) ** 0.8)
+        popularity /= popularity.sum()
+    product_ids = np.array([product_id for product_id, _ in products], dtype=object)
+    titles = np.array([title for _, title in products], dtype=object)
+    first_day = start.date()
+    totals = np.zeros(len(products) * days)
+
+    written = 0
+    for batch_start in range(0, orders, batch_size):
+        count = min(batch_size, orders - batch_start)
+        order_days = rng.choice(days, size=count, p=weights)
+        seconds = order_days * 86400 + rng.integers(0, 86400, size=count)
+        order_ids = [f"{prefix}_{shop}_{n:010d}" for n in range(batch_start, batch_start + count)]
+        created_at = _datetime_strings(start, seconds)
+        connection.exec_driver_sql(
+            "INSERT INTO orders (id, shop, created_at) VALUES (?, ?, ?)",
+            list(zip(order_ids, [shop] * count, created_at))
+        )
+
+        items_per_order = np.minimum(1 + rng.poisson(max(line_items_per_order - 1, 0), size=count), len(products))
+        order_index = np.repeat(np.arange(count), items_per_order)
+        product_index = rng.choice(len(products), size=len(order_index), p=popularity)
+        quantity = rng.integers(1, 6, size=len(order_index))
+        connection.exec_driver_sql(
+            "INSERT INTO line_items (order_id, product_id, product_title, quantity) VALUES (?, ?, ?, ?)",
+            list(zip(
+                [order_ids[i] for i in order_index.tolist()],
+                product_ids[product_index].tolist(),
+                titles[product_index].tolist(),
+                quantity.tolist()
+            ))
+        )
+
+        # Aggregate per (product, day) across batches; the rollup is written once per shop
+        totals += np.bincount(product_index * days + order_days[order_index], weights=quantity, minlength=len(totals))
+        written += len(order_index)
+
+    nonzero = np.flatnonzero(totals)
+    record_sales(connection, [
+        (shop, product_ids[key // days], first_day + timedelta(days=key % days), quantity)
+        for key, quantity in zip(nonzero.tolist(), totals[nonzero].astype(np.int64).tolist())
+    ])
+    return written
+
+
+def generate_dataset(shops=1, skus=1000, orders=10000, line_items_per_order=3, days=90, seasonality=0.3,
+                     seed=0, prefix="gen", locations=1, batch_size=50000, end=None):
+    """
+    Generate a synthetic catalog and order history with bulk Core inserts.
+    Args:
+        shops: Number of shops; orders are generated per shop
+        skus: Number of products (shared by all shops)
+        orders: Orders per shop
+        line_items_per_order: Mean line items per order (at least 1)
+        days: Days of history ending at `end`
+        seasonality: Amplitude of the weekly/yearly volume cycle (0 = flat)
+        seed: Random seed; the same arguments always generate the same data
+        prefix: Prefix for generated IDs and shop names, so datasets can coexist
+        locations: Inventory locations per product
+        batch_size: Orders per executemany batch
+    Returns:
+        dict: Counts of generated rows, the shop names and the elapsed seconds
+    """
+    rng = np.random.default_rng(seed)
+    started = time.perf_counter()
+    shop_names = [DEFAULT_SHOP_TEMPLATE.format(prefix=prefix, index=i + 1) for i in range(shops)]
+    line_items = 0
+    with db.engine.connect() as connection:
+        # Bulk load: skip fsyncs, then restore the connection's setting before it returns to the pool
+        synchronous = connection.exec_driver_sql("PRAGMA synchronous").scalar()
+        cache_size = connection.exec_driver_sql("PRAGMA cache_size").scalar()
+        connection.exec_driver_sql("PRAGMA synchronous=OFF")
+        connection.exec_driver_sql("PRAGMA cache_size=-262144")  # 256 MiB keeps the index pages hot
+        connection.commit()
+        try:
+            with connection.begin():
+                # Building indexes once after the load is far cheaper than maintaining them row by row
+                index_ddl = _drop_secondary_indexes(connection, ["orders", "line_items", "daily_product_sales"])
+                products = generate_catalog(connection, skus, prefix, rng, locations)
+                bump_data_version(connection)
+                for shop in shop_names:
+                    line_items += generate_orders(
+                        connection, shop, products, orders, line_items_per_order, days, seasonality,
+                        prefix, rng, batch_size, end
+                    )
+                    logger.info("Generated %d orders for %s", orders, shop)
+                for sql in index_ddl:
+                    connection.exec_driver_sql(sql)
+        finally:
+            connection.exec_driver_sql(f"PRAGMA synchronous={int(synchronous)}")
+            connection.exec_driver_sql(f"PRAGMA cache_size={int(cache_size)}")
+            connection.commit()
+    elapsed = time.perf_counter() - started
+    return {
+        "shops": shop_names,
+        "products": skus,
+        "orders": orders * shops,
+        "line_items": line_items,
+        "seconds": elapsed,
+    }
@@ -0,0 +1,112 @@
+# app/engines.py
+import logging
+from urllib.parse import quote
+from flask import current_app, g
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.orm import sessionmaker
+from .models import db
+
+logger = logging.getLogger(__name__)
+
+
+def _sqlite_file(uri):
+    """Path of a file-backed SQLite database URI, or None for other databases and in-memory SQLite."""
+    url = make_url(uri)
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return None
+    return url.database
+
+
+def sqlite_engine_options(app):
+    """
+    Engine options for a file-backed SQLite database, merged under any SQLALCHEMY_ENGINE_OPTIONS already set
+    (explicit settings win). Connections wait up to SQLITE_BUSY_TIMEOUT ms for a lock instead of failing with
+    "database is locked", and each worker keeps a bounded pool of them.
+    """
+    options = dict(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    connect_args = dict(options.get("connect_args") or {})
+    connect_args.setdefault("timeout", app.config["SQLITE_BUSY_TIMEOUT"] / 1000)
+    # Pooled connections move between the threads of a gunicorn worker
+    connect_args.setdefault("check_same_thread", False)
+    options["connect_args"] = connect_args
+    options.setdefault("pool_size", app.config["DB_POOL_SIZE"])
+    options.setdefault("max_overflow", app.config["DB_MAX_OVERFLOW"])
+    options.setdefault("pool_timeout", app.config["DB_POOL_TIMEOUT"])
+    return options
+
+
+def _pragma_listener(app, read_only=False):
+    statements = [
+        f"PRAGMA busy_timeout={int(app.config['SQLITE_BUSY_TIMEOUT'])}",
+        f"PRAGMA synchronous={app.config['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA cache_size=-{int(app.config['SQLITE_CACHE_SIZE_KIB'])}",
+        f"PRAGMA mmap_size={int(app.config['SQLITE_MMAP_SIZE'])}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+    if read_only:
+        statements.append("PRAGMA query_only=ON")
+    else:
+        # The journal mode is stored in the database file; read-only connections inherit it
+        statements.insert(0, f"PRAGMA journal_mode={app.config['SQLITE_JOURNAL_MODE']}")
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+    return set_pragmas
+
+
+def configure_engine_options(app):
+    """Apply the SQLite pool and timeout settings to app.config before Flask-SQLAlchemy creates its engine."""
+    if _sqlite_file(app.config["SQLALCHEMY_DATABASE_URI"]):
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = sqlite_engine_options(app)
+
+
+def init_engines(app):
+    """
+    Install the connect-time pragmas on the read-write engine and, with DB_READONLY_ENGINE set, create a
+    separate read-only engine for dashboard reads. Must run after db.init_app and before the first connection.
+    """
+    if _sqlite_file(app.config["SQLALCHEMY_DATABASE_URI"]) is None:
+        return
+    with app.app_context():
+        event.listen(db.engine, "connect", _pragma_listener(app))
+        path = db.engine.url.database  # Relative paths are already resolved against the instance folder
+    if not app.config["DB_READONLY_ENGINE"]:
+        return
+
+    # mode=ro connections can never take the write lock, so under WAL they only wait for checkpoints. SQLite
+    # percent-decodes file: URIs, and URL.create passes the quoted path through as is
+    read_engine = create_engine(
+        URL.create("sqlite", database=f"file:{quote(path)}", query={"mode": "ro", "uri": "true"}),
+        **sqlite_engine_options(app)
+    )
+    event.listen(read_engine, "connect", _pragma_listener(app, read_only=True))
+    app.extensions["read_engine"] = read_engine
+    app.extensions["read_session"] = sessionmaker(bind=read_engine)
+
+    @app.teardown_appcontext
+    def _close_read_session(exc):
+        session = g.pop("read_session", None)
+        if session is not None:
+            session.close()
+
+    logger.info("Read-only engine enabled for dashboard reads")
+
+
+def read_session():
+    """
+    Session for read-only queries: bound to the read-only engine when DB_READONLY_ENGINE is set, otherwise
+    db.session. One session per app context, closed when the context tears down. Reads through it only see
+    committed data.
+    """
+    sessions = current_app.extensions.get("read_session")
+    if sessions is None:
+        return db.session
+    if "read_session" not in g:
+        g.read_session = sessions()
+    return g.read_session
@@ -0,0 +1,274 @@
+# app/forecasting.py
+import numpy as np
+from datetime import date, timedelta
+from .aggregates import LOCATION_SEPARATOR, get_catalog_stock, get_location_stock, get_sales_rows
+from .history import shop_history
+
+STOCKOUT_HORIZON_DAYS = 100 * 365  # Products lasting longer than this have no stockout date
+
+
+def build_sales_matrix(sales_rows, product_ids, window=30, today=None):
+    """
+    Scatter (product_id, date, quantity) rows into a product x day matrix.
+    Args:
+        sales_rows: Rows as returned by app.aggregates.get_sales_rows
+        product_ids: Product IDs in row order; sales of other products are ignored
+        window: Number of days ending today (column window - 1 is today)
+        today: Override the current date (for tests)
+    Returns:
+        numpy.ndarray: float64 array of shape (len(product_ids), window)
+    """
+    today = today or date.today()
+    start = today - timedelta(days=window - 1)
+    index = {product_id: row for row, product_id in enumerate(product_ids)}
+    matrix = np.zeros((len(product_ids), window), dtype=np.float64)
+
+    rows, cols, quantities = [], [], []
+    for product_id, day, quantity in sales_rows:
+        row = index.get(product_id)
+        if row is not None:
+            rows.append(row)
+            cols.append((day - start).days)
+            quantities.append(quantity)
+    if rows:
+        np.add.at(matrix, (np.array(rows), np.array(cols)), np.array(quantities, dtype=np.float64))
+    return matrix
+
+
+def build_stock_matrix(location_rows):
+    """
+    Unpack per-product location stock into a product x location matrix.
+    Args:
+        location_rows: Rows as returned by app.aggregates.get_location_stock
+    Returns:
+        tuple: (product_ids, titles, location_ids, stock, carried) where stock is a float32 array of shape
+        (len(product_ids), len(location_ids)) and carried marks the cells that have an inventory level.
+        Location IDs are sorted.
+    """
+    product_ids = [row[0] for row in location_rows]
+    titles = [row[1] for row in location_rows]
+    columns = {}
+    layouts = {}  # Packed location list -> column indexes; products usually share a handful of layouts
+    rows, cols, available = [], [], []
+    for row, (_, _, location_ids, quantities) in enumerate(location_rows):
+        if quantities is None:
+            continue
+        layout = layouts.get(location_ids)
+        if layout is None:
+            layout = layouts[location_ids] = np.array(
+                [columns.setdefault(location_id, len(columns)) for location_id in location_ids.split(LOCATION_SEPARATOR)]
+            )
+        rows.append(row)
+        cols.append(layout)
+        available.append(quantities)
+
+    location_ids = sorted(columns)
+    order = np.empty(len(columns), dtype=np.int64)  # Insertion order -> sorted column
+    order[[columns[location_id] for location_id in location_ids]] = np.arange(len(columns))
+    shape = (len(product_ids), len(location_ids))
+    if not rows:
+        return product_ids, titles, location_ids, np.zeros(shape, dtype=np.float32), np.zeros(shape, dtype=bool)
+    rows = np.repeat(rows, [len(layout) for layout in cols])
+    cells = rows * len(location_ids) + order[np.concatenate(cols)]
+    # One C-level parse of every level's stock; bincount sums variants stocked at the same location
+    quantities = np.fromstring(",".join(available), dtype=np.int64, sep=",")
+    stock = np.bincount(cells, weights=quantities, minlength=shape[0] * shape[1]).astype(np.float32).reshape(shape)
+    carried = np.bincount(cells, minlength=shape[0] * shape[1]).astype(bool).reshape(shape)
+    return product_ids, titles, location_ids, stock, carried
+
+
+def load_sales_matrix(shop, product_ids, window=30, today=None):
+    """
+    Load a shop's daily sales as a product x day matrix (see build_sales_matrix). Long windows read the days
+    before the shop's order history snapshot ends from its memory-mapped columns (app/history.py) and only the
+    days after from the rollup.
+    """
+    today = today or date.today()
+    snapshot = shop_history(shop, window)
+    if snapshot is None or snapshot.end > today:
+        return build_sales_matrix(get_sales_rows(shop, window, today), product_ids, window, today)
+    matrix = snapshot.sales_matrix(product_ids, today - timedelta(days=window - 1), today)
+    recent = min((today - snapshot.end).days + 1, window)
+    matrix[:, window - recent:] += build_sales_matrix(get_sales_rows(shop, recent, today), product_ids, recent, today)
+    return matrix
+
+
+def exponential_smoothing(matrix, alpha=0.3):
+    """
+    Simple exponential smoothing along each row, seeded with the first day.
+    Returns the final smoothed level per row as one matrix-vector product.
+    """
+    days = matrix.shape[1]
+    if days == 0:
+        return np.zeros(matrix.shape[0])
+    weights = alpha * (1 - alpha) ** np.arange(days - 1, -1, -1, dtype=np.float64)
+    weights[0] = (1 - alpha) ** (days - 1)
+    return matrix @ weights
+
+
+class CatalogForecast:
+    """
+    Vectorized stock forecast for every product of a shop.
+    All per-product attributes are NumPy arrays aligned with product_ids.
+    """
+
+    def __init__(self, product_ids, titles, stock, sales, days_of_cover=30, lead_time=7, alpha=0.3,
+                 moving_average_days=7, today=None):
+        self.today = today or date.today()
+        self.days_of_cover = days_of_cover
+        self.lead_time = lead_time
+        self.product_ids = product_ids
+        self.titles = titles
+        self.stock = np.asarray(stock, dtype=np.float64)
+        self.sales = sales
+
+        window = sales.shape[1]
+        self.velocity = sales.sum(axis=1) / window if window else np.zeros(len(product_ids))
+        recent = sales[:, -moving_average_days:]
+        self.moving_average = recent.mean(axis=1) if recent.shape[1] else np.zeros(len(product_ids))
+        self.smoothed_velocity = exponential_smoothing(sales, alpha)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.days_remaining = np.where(self.velocity > 0, self.stock / self.velocity, np.inf)
+        self.predicted_stock = np.maximum(self.stock - self.velocity * days_of_cover, 0)
+        # Stock outlasting the horizon gets no date: numpy dates past year 9999 do not convert to `date`
+        dated = self.days_remaining < STOCKOUT_HORIZON_DAYS
+        self.stockout_dates = np.where(
+            dated,
+            np.datetime64(self.today, "D") + np.floor(np.where(dated, self.days_remaining, 0)).astype("timedelta64[D]"),
+            np.datetime64("NaT")
+        )
+
+    def predictions(self):
+        """Predicted stock after days_of_cover days for every product, in catalog order."""
+        restock_date = self.today + timedelta(days=self.lead_time)
+        predicted_stock = self.predicted_stock.tolist()
+        stockout_dates = self.stockout_dates.tolist()  # NaT becomes None
+        return [
+            {
+                'product': title,
+                'predicted_stock': predicted,
+                'restock_date': restock_date,
+                'stockout_date': stockout_date
+            }
+            for title, predicted, stockout_date in zip(self.titles, predicted_stock, stockout_dates)
+        ]
+
+    def alerts(self):
+        """Products whose stock runs out before days_of_cover + lead_time days, in catalog order."""
+        low = np.flatnonzero(self.days_remaining < (self.days_of_cover + self.lead_time))
+        days_remaining = self.days_remaining[low].tolist()
+        stockout_dates = self.stockout_dates[low].tolist()
+        return [
+            {
+                'product': self.titles[i],
+                'days_remaining': remaining,
+                'stockout_date': stockout_date
+            }
+            for i, remaining, stockout_date in zip(low.tolist(), days_remaining, stockout_dates)
+        ]
+
+
+class LocationForecast:
+    """
+    Stock forecast per product and location, plus the catalog-wide rollup (`catalog`, a CatalogForecast of the
+    per-product totals). Orders carry no location, so a product's sales velocity is split evenly across the
+    locations that carry it. Per-location arrays are float32 (products x locations) matrices: 100 locations
+    x 50k products is 20 MB each.
+    """
+
+    def __init__(self, product_ids, titles, location_ids, stock, carried, sales, days_of_cover=30, lead_time=7,
+                 alpha=0.3, today=None):
+        self.catalog = CatalogForecast(
+            product_ids, titles, stock.sum(axis=1, dtype=np.float64), sales, days_of_cover, lead_time, alpha, today=today
+        )
+        self.location_ids = location_ids
+        self.stock = stock
+        self.carried = carried
+
+        carriers = carried.sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.demand = np.where(carriers > 0, self.catalog.velocity / carriers, 0).astype(np.float32)  # Per location
+            # Cells with no demand (not carried, or a product without sales) never run out
+            self.days_remaining = np.where(
+                carried & (self.demand[:, None] > 0), stock / self.demand[:, None], np.float32(np.inf)
+            )
+        self.low = carried & (self.days_remaining < days_of_cover + lead_time)
+
+    def locations(self):
+        """Per-location rollup: total stock, products carried, low-stock products and days of cover."""
+        location_velocity = (self.carried * self.demand[:, None]).sum(axis=0, dtype=np.float64)
+        stock = self.stock.sum(axis=0, dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            days_of_cover = np.where(location_velocity > 0, stock / location_velocity, np.inf)
+        return [
+            {
+                'location': location_id,
+                'stock': int(total),
+                'products': products,
+                'low_stock': low,
+                'days_of_cover': days if np.isfinite(days) else None
+            }
+            for location_id, total, products, low, days in zip(
+                self.location_ids, stock.tolist(), self.carried.sum(axis=0).tolist(), self.low.sum(axis=0).tolist(),
+                days_of_cover.tolist()
+            )
+        ]
+
+    def alerts(self, limit=None):
+        """Product/location pairs that run out before days_of_cover + lead_time days, most urgent first."""
+        rows, cols = np.nonzero(self.low)
+        days = self.days_remaining[rows, cols]
+        if limit is not None and limit < len(days):
+            keep = np.argpartition(days, limit)[:limit]
+            rows, cols, days = rows[keep], cols[keep], days[keep]
+        order = np.lexsort((cols, rows, days))
+        rows, cols, days = rows[order], cols[order], days[order].astype(np.float64)
+        stockout_dates = (
+            np.datetime64(self.catalog.today, "D") + np.floor(days).astype("timedelta64[D]")
+        ).tolist()
+        return [
+            {
+                'product': self.catalog.titles[row],
+                'location': self.location_ids[col],
+                'stock': int(stock),
+                'days_remaining': remaining,
+                'stockout_date': stockout_date
+            }
+            for row, col, stock, remaining, stockout_date in zip(
+                rows.tolist(), cols.tolist(), self.stock[rows, cols].tolist(), days.tolist(), stockout_dates
+            )
+        ]
+
+
+def forecast_catalog(shop, window=30, days_of_cover=30, lead_time=7, alpha=0.3, today=None):
+    """
+    Forecast stock depletion for the whole catalog of a shop in one vectorized pass.
+    Args:
+        shop: Shopify shop domain (string)
+        window: Days of sales history used for the velocity (default: 30)
+        days_of_cover: Days of stock a product should cover (default: 30)
+        lead_time: Days between reordering and restocking (default: 7)
+        alpha: Exponential smoothing factor (default: 0.3)
+    Returns:
+        CatalogForecast
+    """
+    catalog = get_catalog_stock(shop)
+    product_ids = [row[0] for row in catalog]
+    titles = [row[1] for row in catalog]
+    stock = [row[2] for row in catalog]
+    sales = load_sales_matrix(shop, product_ids, window, today)
+    return CatalogForecast(product_ids, titles, stock, sales, days_of_cover, lead_time, alpha, today=today)
+
+
+def forecast_locations(shop, window=30, days_of_cover=30, lead_time=7, alpha=0.3, today=None):
+    """
+    Forecast stock depletion per product and location for a shop: one grouped stock query, one sales query and
+    vectorized math over the product x location matrix.
+    Returns:
+        LocationForecast
+    """
+    product_ids, titles, location_ids, stock, carried = build_stock_matrix(get_location_stock(shop))
+    sales = load_sales_matrix(shop, product_ids, window, today)
+    return LocationForecast(product_ids, titles, location_ids, stock, carried, sales, days_of_cover, lead_time, alpha,
+                            today=today)
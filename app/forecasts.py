@@ -0,0 +1,116 @@
+# app/forecasts.py
+import time
+from datetime import date, datetime, timedelta
+import numpy as np
+from sqlalchemy import select
+from .engines import read_session
+from .forecasting import forecast_catalog
+from .models import db, Forecast, ForecastRun
+from .versions import get_data_version
+
+FORECAST_INSERT_SQL = (
+    "INSERT INTO forecasts (shop, product_id, title, stock, velocity, smoothed_velocity, days_remaining, "
+    "predicted_stock, restock_date, stockout_date, low_stock, computed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+RUN_UPSERT_SQL = (
+    "INSERT INTO forecast_runs (shop, data_version, window, days_of_cover, lead_time, products, seconds, computed_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (shop) DO UPDATE SET data_version = excluded.data_version, "
+    "window = excluded.window, days_of_cover = excluded.days_of_cover, lead_time = excluded.lead_time, "
+    "products = excluded.products, seconds = excluded.seconds, computed_at = excluded.computed_at"
+)
+
+
+def store_forecast(connection, shop, forecast, data_version, seconds=0.0):
+    """Replace a shop's rows in `forecasts` with a CatalogForecast and record the run, in the caller's transaction."""
+    computed_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
+    restock_date = (forecast.today + timedelta(days=forecast.lead_time)).isoformat()
+    days_remaining = forecast.days_remaining
+    low_stock = (days_remaining < forecast.days_of_cover + forecast.lead_time).tolist()
+    stockout_dates = [day.isoformat() if day else None for day in forecast.stockout_dates.tolist()]
+
+    connection.exec_driver_sql("DELETE FROM forecasts WHERE shop = ?", (shop,))
+    if forecast.product_ids:
+        connection.exec_driver_sql(FORECAST_INSERT_SQL, list(zip(
+            [shop] * len(forecast.product_ids),
+            forecast.product_ids,
+            forecast.titles,
+            forecast.stock.astype(np.int64).tolist(),
+            forecast.velocity.tolist(),
+            forecast.smoothed_velocity.tolist(),
+            [remaining if np.isfinite(remaining) else None for remaining in days_remaining.tolist()],
+            forecast.predicted_stock.tolist(),
+            [restock_date] * len(forecast.product_ids),
+            stockout_dates,
+            low_stock,
+            [computed_at] * len(forecast.product_ids),
+        )))
+    connection.exec_driver_sql(RUN_UPSERT_SQL, (
+        shop, data_version, forecast.sales.shape[1], forecast.days_of_cover, forecast.lead_time,
+        len(forecast.product_ids), seconds, computed_at
+    ))
+
+
+def compute_shop_forecast(shop, window=30, days_of_cover=30, lead_time=7):
+    """
+    Recompute and store the forecast of one shop.
+    Returns:
+        dict: Shop, data version, number of products and elapsed seconds
+    """
+    started = time.perf_counter()
+    # Read the version before the data: a write during the run leaves the stored forecast stale, not wrong
+    version = get_data_version(shop)
+    forecast = forecast_catalog(shop, window, days_of_cover, lead_time)
+    seconds = time.perf_counter() - started
+    with db.engine.begin() as connection:
+        store_forecast(connection, shop, forecast, version, seconds)
+    return {"shop": shop, "data_version": version, "products": len(forecast.product_ids), "seconds": seconds}
+
+
+def is_fresh(shop, window, days_of_cover, lead_time):
+    """Whether the stored forecast of a shop matches its current data, these parameters and today's date."""
+    run = read_session().execute(
+        select(ForecastRun.data_version, ForecastRun.window, ForecastRun.days_of_cover, ForecastRun.lead_time,
+               ForecastRun.computed_at).where(ForecastRun.shop == shop)
+    ).first()
+    return (
+        run is not None
+        and (run.window, run.days_of_cover, run.lead_time) == (window, days_of_cover, lead_time)
+        and run.computed_at.date() == date.today()
+        and run.data_version == get_data_version(shop)
+    )
+
+
+def stored_alerts(shop, window=30, days_of_cover=30, lead_time=7):
+    """
+    Low stock alerts from the `forecasts` table in the format of CatalogForecast.alerts(), or None when the stored
+    forecast is missing or stale for these parameters.
+    """
+    if not is_fresh(shop, window, days_of_cover, lead_time):
+        return None
+    rows = read_session().execute(
+        select(Forecast.title, Forecast.days_remaining, Forecast.stockout_date)
+        .where(Forecast.shop == shop, Forecast.low_stock == True)  # noqa: E712 (IS would skip the index)
+        .order_by(Forecast.product_id)
+    )
+    return [
+        {'product': title, 'days_remaining': days_remaining, 'stockout_date': stockout_date}
+        for title, days_remaining, stockout_date in rows
+    ]
+
+
+def stored_predictions(shop, window=30, days_of_cover=30, lead_time=7):
+    """
+    Stock predictions from the `forecasts` table in the format of CatalogForecast.predictions(), or None when the
+    stored forecast is missing or stale for these parameters.
+    """
+    if not is_fresh(shop, window, days_of_cover, lead_time):
+        return None
+    rows = read_session().execute(
+        select(Forecast.title, Forecast.predicted_stock, Forecast.restock_date, Forecast.stockout_date)
+        .where(Forecast.shop == shop)
+        .order_by(Forecast.product_id)
+    )
+    return [
+        {'product': title, 'predicted_stock': predicted, 'restock_date': restock_date, 'stockout_date': stockout_date}
+        for title, predicted, restock_date, stockout_date in rows
+    ]
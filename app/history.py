@@ -0,0 +1,196 @@
+# app/history.py
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import date, datetime, timedelta
+import numpy as np
+from flask import current_app
+from .models import db
+from .versions import get_data_version, get_history_version
+
+# One fixed-width file per column; row i of every column is one (day, product, units) rollup entry, sorted by day
+COLUMNS = {
+    "day": np.int32,  # Days since 1970-01-01
+    "product": np.int32,  # Index into products.json
+    "quantity": np.int32,
+}
+EXPORT_SQL = (
+    "SELECT date, product_id, quantity FROM daily_product_sales "
+    "WHERE shop = ? AND date < ? AND quantity != 0 ORDER BY date, product_id"
+)
+FETCH_ROWS = 100_000
+SCAN_ROWS = 1 << 20  # Rows per chunk when reading, which bounds the temporaries whatever the history length
+
+_snapshots = {}  # (directory, shop) -> HistorySnapshot, shared by the threads of a worker
+_lock = threading.Lock()
+
+
+def _epoch_day(day):
+    return (day - date(1970, 1, 1)).days
+
+
+def shop_directory(root, shop):
+    if not shop or os.path.basename(shop) != shop or shop.startswith("."):
+        raise ValueError(f"Invalid shop name: {shop!r}")
+    return os.path.join(root, shop)
+
+
+def export_history(root, shop, end=None):
+    """
+    Write a shop's daily sales before `end` (default: today, whose sales are still coming in) as a columnar
+    snapshot under root/<shop>/, streaming from the rollup with constant memory. A new generation replaces the
+    previous one atomically; workers that still map the old files keep reading them until they reopen.
+    Returns:
+        dict: Shop, generation, rows, products, covered days and elapsed seconds
+    """
+    started = time.perf_counter()
+    end = end or date.today()
+    directory = shop_directory(root, shop)
+    generation = datetime.now().strftime("%Y%m%d%H%M%S%f")
+    target = os.path.join(directory, generation)
+    os.makedirs(target)
+
+    # Read the versions before the data: a write during the export leaves the snapshot stale, not wrong
+    version = get_data_version(shop)
+    history_version = get_history_version(shop)
+    products = {}
+    rows = 0
+    files = {name: open(os.path.join(target, f"{name}.bin"), "wb") for name in COLUMNS}
+    try:
+        with db.engine.connect() as connection:
+            cursor = connection.exec_driver_sql(EXPORT_SQL, (shop, end.isoformat()))
+            while True:
+                batch = cursor.fetchmany(FETCH_ROWS)
+                if not batch:
+                    break
+                days, product_ids, quantities = zip(*batch)
+                columns = {
+                    "day": np.array([str(day) for day in days], dtype="datetime64[D]").astype(np.int32),
+                    "product": np.array([products.setdefault(product_id, len(products)) for product_id in product_ids]),
+                    "quantity": np.array(quantities),
+                }
+                for name, dtype in COLUMNS.items():
+                    files[name].write(columns[name].astype(dtype).tobytes())
+                rows += len(batch)
+    finally:
+        for f in files.values():
+            f.close()
+
+    with open(os.path.join(target, "products.json"), "w") as f:
+        json.dump(list(products), f)
+    meta = {
+        "shop": shop, "generation": generation, "end": end.isoformat(), "data_version": version,
+        "history_version": history_version, "rows": rows,
+        "products": len(products), "columns": {name: np.dtype(dtype).str for name, dtype in COLUMNS.items()},
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    pointer = os.path.join(directory, "current.json")
+    with open(f"{pointer}.tmp", "w") as f:
+        json.dump(meta, f)
+    os.replace(f"{pointer}.tmp", pointer)
+
+    for name in os.listdir(directory):
+        if name not in (generation, "current.json") and os.path.isdir(os.path.join(directory, name)):
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+    return {"shop": shop, "generation": generation, "rows": rows, "products": len(products), "end": end,
+            "seconds": time.perf_counter() - started}
+
+
+class HistorySnapshot:
+    """
+    Read-only view of one snapshot generation. The columns are np.memmap arrays: slicing them is zero-copy and
+    their pages live in the OS page cache, shared by every worker on the host. Reads walk the day-sorted rows
+    in chunks of SCAN_ROWS, so memory grows with the result, not with the history.
+    """
+
+    def __init__(self, directory, meta):
+        self.shop = meta["shop"]
+        self.generation = meta["generation"]
+        self.end = date.fromisoformat(meta["end"])  # First day not covered
+        self.data_version = meta["data_version"]
+        self.history_version = meta.get("history_version")  # None: no version to check, never current
+        self.rows = meta["rows"]
+        path = os.path.join(directory, self.generation)
+        with open(os.path.join(path, "products.json")) as f:
+            self.product_ids = json.load(f)
+        self.columns = {
+            name: np.memmap(os.path.join(path, f"{name}.bin"), dtype=np.dtype(dtype), mode="r", shape=(self.rows,))
+            if self.rows else np.zeros(0, dtype=np.dtype(dtype))
+            for name, dtype in meta["columns"].items()
+        }
+        self.start = date(1970, 1, 1) + timedelta(days=int(self.columns["day"][0])) if self.rows else self.end
+
+    def _chunks(self, first, last):
+        """(day offset from `first`, product index, quantity) views of the rows from `first` to `last`."""
+        day = self.columns["day"]
+        lo = int(np.searchsorted(day, _epoch_day(first), "left"))
+        hi = int(np.searchsorted(day, _epoch_day(last), "right"))
+        for offset in range(lo, hi, SCAN_ROWS):
+            chunk = slice(offset, min(offset + SCAN_ROWS, hi))
+            yield day[chunk] - _epoch_day(first), self.columns["product"][chunk], self.columns["quantity"][chunk]
+
+    def daily_totals(self, first, last):
+        """Units sold per day from `first` to `last` (inclusive, zero-filled) as an int64 array."""
+        totals = np.zeros((last - first).days + 1, dtype=np.int64)
+        for days, _, quantities in self._chunks(first, last):
+            totals += np.bincount(days, weights=quantities, minlength=len(totals)).astype(np.int64)
+        return totals
+
+    def product_totals(self, first, last):
+        """Units sold per product from `first` to `last`, as {product_id: units} of the products that sold."""
+        totals = np.zeros(len(self.product_ids), dtype=np.int64)
+        for _, products, quantities in self._chunks(first, last):
+            totals += np.bincount(products, weights=quantities, minlength=len(totals)).astype(np.int64)
+        return {self.product_ids[i]: int(totals[i]) for i in np.flatnonzero(totals).tolist()}
+
+    def sales_matrix(self, product_ids, first, last):
+        """
+        Product x day matrix from `first` to `last` like app.forecasting.build_sales_matrix; days from `end` on
+        are left at zero. Filled day-major, so each chunk of day-sorted rows lands in one contiguous block.
+        """
+        days = (last - first).days + 1
+        index = {product_id: row for row, product_id in enumerate(product_ids)}
+        rows = np.array([index.get(product_id, -1) for product_id in self.product_ids], dtype=np.int64)
+        by_day = np.zeros((days, len(product_ids)), dtype=np.float64)
+        flat = by_day.reshape(-1)
+        width = len(product_ids)
+        for day_offsets, products, quantities in self._chunks(first, last):
+            chunk_rows = rows[products]
+            keep = chunk_rows >= 0
+            cells = day_offsets[keep].astype(np.int64) * width + chunk_rows[keep]
+            if len(cells):
+                low = int(cells[0]) // width * width  # Rows are sorted by day
+                block = np.bincount(cells - low, weights=quantities[keep])
+                flat[low:low + len(block)] += block
+        return by_day.T
+
+
+def open_history(root, shop):
+    """The current snapshot of a shop under `root`, reusing this worker's mapping until a new generation lands."""
+    key = (root, shop)
+    try:
+        with open(os.path.join(shop_directory(root, shop), "current.json")) as f:
+            meta = json.load(f)
+        with _lock:
+            snapshot = _snapshots.get(key)
+            if snapshot is None or snapshot.generation != meta["generation"]:
+                snapshot = _snapshots[key] = HistorySnapshot(shop_directory(root, shop), meta)
+            return snapshot
+    except FileNotFoundError:  # No snapshot, or an export replaced this generation since current.json was read
+        return None
+
+
+def shop_history(shop, window):
+    """
+    The snapshot to read a `window`-day history of the shop from, or None for windows shorter than
+    HISTORY_MIN_WINDOW (the rollup serves those with one indexed range query), shops without a snapshot and
+    snapshots that missed a later change to a past day's sales (see bump_history_version).
+    """
+    if window < current_app.config["HISTORY_MIN_WINDOW"]:
+        return None
+    snapshot = open_history(current_app.config["HISTORY_DIR"], shop)
+    if snapshot is None or snapshot.history_version is None or snapshot.history_version != get_history_version(shop):
+        return None
+    return snapshot
@@ -0,0 +1,304 @@
+# app/instrumentation.py
+import reprlib
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as StatementCounter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 1000)
+ROW_BUCKETS = (10, 100, 1000, 10000, 100000, 1000000)
+
+
+def _escape_label(value):
+    # The exposition format requires backslash, double quote and newline to be escaped in label values
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape_label(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    """Monotonic counter with optional labels, rendered in the Prometheus text format."""
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels, rendered in the Prometheus text format."""
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS, labels=()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.labels = tuple(labels)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    lines.append(
+                        f"{self.name}_bucket{_format_labels(self.labels + ('le',), key + (bound,))} {cumulative}"
+                    )
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels + ('le',), key + ('+Inf',))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {series[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {series[-1]}")
+        return lines
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency by route.", labels=("route", "method")
+)
+REQUESTS = Counter("http_requests_total", "Requests by route and status.", labels=("route", "method", "status"))
+STAGE_LATENCY = Histogram("stage_duration_seconds", "Duration of instrumented stages.", labels=("stage",))
+QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request", "SQL statements per request.", buckets=COUNT_BUCKETS, labels=("route",)
+)
+ROWS_PER_REQUEST = Histogram(
+    "db_rows_per_request", "Rows fetched per request.", buckets=ROW_BUCKETS, labels=("route",)
+)
+N_PLUS_ONE = Counter("db_n_plus_one_total", "Requests that repeated one statement suspiciously often.", labels=("route",))
+WEBHOOK_EVENTS = Counter(
+    "webhook_events_total", "Webhook deliveries by topic and outcome.", labels=("topic", "outcome")
+)
+WEBHOOK_BATCH_SIZE = Histogram(
+    "webhook_batch_size", "Deliveries written per webhook transaction.", buckets=COUNT_BUCKETS
+)
+METRICS = [
+    REQUEST_LATENCY, REQUESTS, STAGE_LATENCY, QUERIES_PER_REQUEST, ROWS_PER_REQUEST, N_PLUS_ONE,
+    WEBHOOK_EVENTS, WEBHOOK_BATCH_SIZE,
+]
+
+
+class QueryStats:
+    """SQL and stage accounting for one request (or one collect_stats() block)."""
+    __slots__ = ("queries", "rows", "query_seconds", "statements", "spans")
+
+    def __init__(self):
+        self.queries = 0
+        self.rows = 0
+        self.query_seconds = 0.0
+        self.statements = StatementCounter()
+        self.spans = []
+
+    def merge(self, other):
+        self.queries += other.queries
+        self.rows += other.rows
+        self.query_seconds += other.query_seconds
+        self.statements.update(other.statements)
+        self.spans.extend(other.spans)
+
+
+_current_stats = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def collect_stats():
+    """Account queries, rows and spans of the enclosed block (requests get this automatically)."""
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@contextmanager
+def span(stage):
+    """Time a stage, e.g. span("query.catalog"); recorded in /metrics and the request's Server-Timing header."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_LATENCY.observe(elapsed, stage=stage)
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.spans.append((stage, elapsed))
+
+
+class Abbreviated:
+    """
+    Log argument that renders a size-bounded repr, and only when the record is actually emitted:
+    app.logger.debug("Orders data: %s", Abbreviated(orders_data))
+    """
+    _repr = reprlib.Repr()
+    _repr.maxlist = _repr.maxdict = 5
+    _repr.maxstring = _repr.maxother = 80
+    _repr.maxlevel = 3
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        size = f" ({len(self.value)} items)" if isinstance(self.value, (list, tuple, dict, set)) else ""
+        return self._repr.repr(self.value) + size
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Counts fetched rows for the current QueryStats; SQLAlchemy fetches through these methods."""
+
+    def fetchone(self):
+        row = super().fetchone()
+        stats = _current_stats.get()
+        if stats is not None and row is not None:
+            stats.rows += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = super().fetchmany(*args, **kwargs)
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.rows += len(rows)
+        return rows
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    if stats is None:
+        return
+    started = conn.info.get("query_started")
+    if started:
+        stats.query_seconds += time.perf_counter() - started.pop()
+    stats.queries += 1
+    stats.statements[statement] += 1
+
+
+def _route():
+    return request.url_rule.rule if request.url_rule else "<unmatched>"
+
+
+def init_instrumentation(app):
+    """
+    Install request timing, SQL accounting and the sqlite3 row-counting cursor. Must run before init_db,
+    because the cursor is wired in through SQLALCHEMY_ENGINE_OPTIONS.
+    """
+    if app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+        options = dict(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+        options["connect_args"] = dict(options.get("connect_args") or {}, factory=InstrumentedConnection)
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+    @app.before_request
+    def _start_request_stats():
+        g.request_started = time.perf_counter()
+        g.query_stats = QueryStats()
+        g.query_stats_token = _current_stats.set(g.query_stats)
+
+    @app.teardown_request
+    def _stop_request_stats(exc):
+        token = g.pop("query_stats_token", None)
+        if token is not None:
+            _current_stats.reset(token)
+            # An enclosing collect_stats() (e.g. a benchmark driving the test client) sees the request too
+            outer = _current_stats.get()
+            if outer is not None:
+                outer.merge(g.pop("query_stats"))
+
+    @app.after_request
+    def _record_request_stats(response):
+        stats = g.get("query_stats")
+        if stats is None:
+            return response
+        elapsed = time.perf_counter() - g.pop("request_started")
+        route = _route()
+        REQUEST_LATENCY.observe(elapsed, route=route, method=request.method)
+        REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+        QUERIES_PER_REQUEST.observe(stats.queries, route=route)
+        ROWS_PER_REQUEST.observe(stats.rows, route=route)
+
+        statement, repeats = stats.statements.most_common(1)[0] if stats.statements else (None, 0)
+        if repeats >= app.config["N_PLUS_ONE_THRESHOLD"]:
+            N_PLUS_ONE.inc(route=route)
+            app.logger.warning(
+                "Possible N+1 query pattern on %s: statement executed %d times: %s",
+                route, repeats, Abbreviated(" ".join(statement.split()))
+            )
+
+        timings = [("db", stats.query_seconds)] + stats.spans
+        response.headers["Server-Timing"] = ", ".join(
+            f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings
+        )
+        app.logger.debug(
+            "%s %s %s in %.1fms: %d queries (%.1fms), %d rows",
+            request.method, route, response.status_code, elapsed * 1000,
+            stats.queries, stats.query_seconds * 1000, stats.rows
+        )
+        return response
+
+
+def render_metrics(cache=None):
+    """All metrics of this worker in the Prometheus text exposition format."""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    if cache is not None:
+        stats = cache.stats()
+        for name in ("hits", "misses"):
+            lines.append(f"# TYPE dashboard_cache_{name}_total counter")
+            lines.append(f'dashboard_cache_{name}_total{_format_labels(("backend",), (stats["backend"],))} {stats[name]}')
+    return "\n".join(lines) + "\n"
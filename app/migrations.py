@@ -0,0 +1,91 @@
+# app/migrations.py
+import logging
+from sqlalchemy import inspect, text
+from .models import db, SchemaMigration
+
+logger = logging.getLogger(__name__)
+
+# (version, description, upgrade(connection)). Append only; never renumber or edit an applied migration.
+# Upgrades must be idempotent: fresh databases already get the current schema from db.create_all().
+MIGRATIONS = []
+
+
+def migration(version, description):
+    def register(upgrade):
+        MIGRATIONS.append((version, description, upgrade))
+        return upgrade
+    return register
+
+
+def add_column_if_missing(connection, table, column_ddl):
+    """Add a column with the given DDL ("name TYPE ...") unless the table already has it."""
+    name = column_ddl.split()[0]
+    if name not in {column["name"] for column in inspect(connection).get_columns(table)}:
+        connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column_ddl}"))
+
+
+@migration(1, "Composite indexes for the dashboard's hot filters and join keys")
+def _add_hot_path_indexes(connection):
+    for statement in [
+        "CREATE INDEX IF NOT EXISTS ix_orders_shop_created_at ON orders (shop, created_at)",
+        "CREATE INDEX IF NOT EXISTS ix_line_items_order_id_product_id ON line_items (order_id, product_id, quantity)",
+        "CREATE INDEX IF NOT EXISTS ix_line_items_product_id ON line_items (product_id)",
+        "CREATE INDEX IF NOT EXISTS ix_variants_product_id ON variants (product_id)",
+        "CREATE INDEX IF NOT EXISTS ix_inventory_items_variant_id ON inventory_items (variant_id)",
+        "CREATE INDEX IF NOT EXISTS ix_inventory_levels_inventory_item_id "
+        "ON inventory_levels (inventory_item_id, location_id, available)",
+        "CREATE INDEX IF NOT EXISTS ix_daily_product_sales_shop_date "
+        "ON daily_product_sales (shop, date, product_id, quantity)",
+    ]:
+        connection.execute(text(statement))
+    connection.execute(text("ANALYZE"))
+
+
+@migration(2, "Shop ownership of products")
+def _add_product_shop(connection):
+    add_column_if_missing(connection, "products", "shop VARCHAR(255)")
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_products_shop_id ON products (shop, id)"))
+
+
+@migration(3, "Per-shop version of past days' sales")
+def _add_history_version(connection):
+    add_column_if_missing(connection, "shop_data_versions", "history_version INTEGER NOT NULL DEFAULT 0")
+
+
+@migration(4, "Per-shop version of the sales rollup")
+def _add_sales_version(connection):
+    add_column_if_missing(connection, "shop_data_versions", "sales_version INTEGER NOT NULL DEFAULT 0")
+
+
+@migration(5, "Shopify update time of orders")
+def _add_order_updated_at(connection):
+    add_column_if_missing(connection, "orders", "updated_at DATETIME")
+
+
+def get_schema_version():
+    """Return the highest applied migration version (0 for a database that was never migrated)."""
+    return db.session.query(db.func.max(SchemaMigration.version)).scalar() or 0
+
+
+def run_migrations():
+    """
+    Apply pending migrations in version order, each in its own transaction.
+    Returns:
+        list: Versions applied by this call
+    """
+    current = get_schema_version()
+    applied = []
+    for version, description, upgrade in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version <= current:
+            continue
+        try:
+            upgrade(db.session.connection())
+            db.session.add(SchemaMigration(version=version, description=description))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            logger.error("Schema migration %d (%s) failed", version, description, exc_info=True)
+            raise
+        logger.info("Applied schema migration %d: %s", version, description)
+        applied.append(version)
+    return applied
@@ -6,13 +6,21 @@ db = SQLAlchemy()
 # Order Models
 class Order(db.Model):
     __tablename__ = "orders"
+    __table_args__ = (
+        db.Index("ix_orders_shop_created_at", "shop", "created_at"),
+    )
     id = db.Column(db.String(50), primary_key=True)
     shop = db.Column(db.String(255), nullable=False)  # Add shop column
     created_at = db.Column(db.DateTime, nullable=False)  # Change to DateTime
+    updated_at = db.Column(db.DateTime, nullable=True)  # Shopify's updated_at in UTC; NULL for orders not synced
     line_items = db.relationship("LineItem", backref="order", lazy=True)
 
 class LineItem(db.Model):
     __tablename__ = "line_items"
+    __table_args__ = (
+        db.Index("ix_line_items_order_id_product_id", "order_id", "product_id", "quantity"),
+        db.Index("ix_line_items_product_id", "product_id"),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     order_id = db.Column(db.String(50), db.ForeignKey("orders.id"), nullable=False)
     product_id = db.Column(db.String(50), nullable=False)
@@ -24,7 +32,11 @@ class LineItem(db.Model):
 # Inventory Models
 class Product(db.Model):
     __tablename__ = "products"
+    __table_args__ = (
+        db.Index("ix_products_shop_id", "shop", "id"),
+    )
     id = db.Column(db.String(50), primary_key=True)  # Shopify Product ID
+    shop = db.Column(db.String(255), nullable=True)  # Owning shop; NULL for the shared (mock) catalog
     title = db.Column(db.String(100), nullable=False)
     variants = db.relationship("Variant", backref="product", lazy=True)
 
@@ -41,6 +53,9 @@ class Product(db.Model):
 
 class Variant(db.Model):
     __tablename__ = "variants"
+    __table_args__ = (
+        db.Index("ix_variants_product_id", "product_id"),
+    )
     id = db.Column(db.String(50), primary_key=True)  # Shopify Variant ID
     product_id = db.Column(db.String(50), db.ForeignKey("products.id"), nullable=False)
     title = db.Column(db.String(100), nullable=False)  # e.g., "Red, Large"
@@ -53,19 +68,115 @@ class Variant(db.Model):
         """
         Get all inventory levels for this variant.
         """
-        return [item.inventory_level for item in self.inventory_items if item.inventory_level]
+        return [level for item in self.inventory_items for level in item.inventory_levels]
 
 class InventoryItem(db.Model):
     __tablename__ = "inventory_items"
+    __table_args__ = (
+        db.Index("ix_inventory_items_variant_id", "variant_id"),
+    )
     id = db.Column(db.String(50), primary_key=True)  # Shopify Inventory Item ID
     variant_id = db.Column(db.String(50), db.ForeignKey("variants.id"), nullable=False)
     tracked = db.Column(db.Boolean, default=True)  # Whether inventory is tracked
-    inventory_level = db.relationship("InventoryLevel", backref="inventory_item", uselist=False, lazy=True)
+    inventory_levels = db.relationship("InventoryLevel", backref="inventory_item", lazy=True)  # One per location
 
 class InventoryLevel(db.Model):
     __tablename__ = "inventory_levels"
+    __table_args__ = (
+        db.Index("ix_inventory_levels_inventory_item_id", "inventory_item_id", "location_id", "available"),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     inventory_item_id = db.Column(db.String(50), db.ForeignKey("inventory_items.id"), nullable=False)
-    location_id = db.Column(db.String(50), default="default_location_1")  # Mock single location
+    location_id = db.Column(db.String(50), default="default_location_1")  # Shopify location holding the stock
     available = db.Column(db.Integer, nullable=False, default=0)  # Current stock level
-    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now)  # Change to DateTime
\ No newline at end of file
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now)  # Change to DateTime
+
+# Rollup Models
+class DailyProductSales(db.Model):
+    """
+    Units sold per shop, product and day. Maintained incrementally by app.rollup whenever line items are written.
+    """
+    __tablename__ = "daily_product_sales"
+    __table_args__ = (
+        db.Index("ix_daily_product_sales_shop_date", "shop", "date", "product_id", "quantity"),
+    )
+    shop = db.Column(db.String(255), primary_key=True)
+    product_id = db.Column(db.String(50), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+
+class ShopDataVersion(db.Model):
+    """
+    Per-shop counter bumped by app.versions on every order or inventory write; used to invalidate cached results.
+    """
+    __tablename__ = "shop_data_versions"
+    shop = db.Column(db.String(255), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    # Bumped only when sales of a day before today change: order history snapshots stay valid while it holds
+    history_version = db.Column(db.Integer, nullable=False, default=0)
+    # Bumped on every daily_product_sales write: in-memory sales series (app.timeseries) follow it
+    sales_version = db.Column(db.Integer, nullable=False, default=0)
+
+class ShopSyncState(db.Model):
+    """
+    Per-shop high-water mark of app.sync: the latest Shopify updated_at already stored, so runs only fetch deltas.
+    """
+    __tablename__ = "shop_sync_state"
+    shop = db.Column(db.String(255), primary_key=True)
+    orders_updated_at = db.Column(db.String(32), nullable=True)  # Shopify's ISO-8601 string, sent back verbatim
+    orders_synced_at = db.Column(db.DateTime, nullable=True)
+
+class Forecast(db.Model):
+    """
+    Per-shop, per-product stock forecast for the default forecast parameters, precomputed by app.scheduler.
+    """
+    __tablename__ = "forecasts"
+    __table_args__ = (
+        db.Index("ix_forecasts_shop_low_stock", "shop", "low_stock", "product_id"),
+    )
+    shop = db.Column(db.String(255), primary_key=True)
+    product_id = db.Column(db.String(50), primary_key=True)
+    title = db.Column(db.String(100), nullable=False)
+    stock = db.Column(db.Integer, nullable=False)
+    velocity = db.Column(db.Float, nullable=False)  # Units per day over the window
+    smoothed_velocity = db.Column(db.Float, nullable=False)
+    days_remaining = db.Column(db.Float, nullable=True)  # NULL when the product has no sales
+    predicted_stock = db.Column(db.Float, nullable=False)
+    restock_date = db.Column(db.Date, nullable=False)
+    stockout_date = db.Column(db.Date, nullable=True)
+    low_stock = db.Column(db.Boolean, nullable=False)
+    computed_at = db.Column(db.DateTime, nullable=False)
+
+class ForecastRun(db.Model):
+    """
+    The latest forecast computation per shop: the data version and parameters its rows in `forecasts` reflect.
+    """
+    __tablename__ = "forecast_runs"
+    shop = db.Column(db.String(255), primary_key=True)
+    data_version = db.Column(db.Integer, nullable=False)
+    window = db.Column(db.Integer, nullable=False)
+    days_of_cover = db.Column(db.Integer, nullable=False)
+    lead_time = db.Column(db.Integer, nullable=False)
+    products = db.Column(db.Integer, nullable=False)
+    seconds = db.Column(db.Float, nullable=False)
+    computed_at = db.Column(db.DateTime, nullable=False)
+
+class ShopCredential(db.Model):
+    """
+    Installed shops and their OAuth access tokens, shared by every worker (see app/shops.py).
+    """
+    __tablename__ = "shop_credentials"
+    shop = db.Column(db.String(255), primary_key=True)
+    access_token = db.Column(db.String(255), nullable=False)
+    scopes = db.Column(db.String(255), nullable=False, default="")  # Comma-separated, as granted by Shopify
+    installed_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.now)  # Last (re)install
+
+class SchemaMigration(db.Model):
+    """
+    Versions applied by app.migrations, so existing databases pick up schema changes create_all cannot make.
+    """
+    __tablename__ = "schema_migrations"
+    version = db.Column(db.Integer, primary_key=True)
+    description = db.Column(db.String(255), nullable=False)
+    applied_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
\ No newline at end of file
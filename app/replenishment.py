@@ -0,0 +1,145 @@
+# app/replenishment.py
+import numpy as np
+from statistics import NormalDist
+
+DAYS_PER_YEAR = 365
+
+
+def service_factor(service_levels):
+    """
+    Safety factor z of each cycle service level (the probability of not stocking out during a lead time).
+    Args:
+        service_levels: Probabilities strictly between 0 and 1
+    Returns:
+        numpy.ndarray: float64 array of z values
+    """
+    return np.array([NormalDist().inv_cdf(level) for level in np.atleast_1d(service_levels)], dtype=np.float64)
+
+
+def demand_stats(sales):
+    """
+    Mean and standard deviation of daily demand per product.
+    Args:
+        sales: Product x day matrix (see app.forecasting.build_sales_matrix)
+    Returns:
+        tuple: (mean, std) float64 arrays with one entry per product
+    """
+    days = sales.shape[1]
+    if days == 0:
+        zeros = np.zeros(sales.shape[0])
+        return zeros, zeros
+    return sales.mean(axis=1), sales.std(axis=1, ddof=1) if days > 1 else np.zeros(sales.shape[0])
+
+
+def economic_order_quantity(mean, order_cost, holding_cost):
+    """EOQ per product: sqrt(2 * annual demand * cost per order / annual holding cost per unit)."""
+    return np.sqrt(2 * mean * DAYS_PER_YEAR * order_cost / holding_cost)
+
+
+class ReplenishmentPlan:
+    """
+    Safety stock, reorder point and order quantity for every product of a catalog, as NumPy arrays aligned with
+    product_ids. Demand during the lead time is taken as normal with the daily mean and variance of the sales
+    history; a product is reordered when its stock is at or below the reorder point, by at least its EOQ and at
+    least enough to get back above the reorder point.
+    """
+
+    def __init__(self, product_ids, titles, stock, sales, lead_time=7, service_level=0.95, order_cost=50.0,
+                 holding_cost=2.0):
+        self.product_ids = product_ids
+        self.titles = titles
+        self.stock = np.asarray(stock, dtype=np.float64)
+        self.lead_time = lead_time
+        self.service_level = service_level
+
+        self.mean, self.std = demand_stats(sales)
+        self.safety_stock = np.ceil(service_factor(service_level)[0] * self.std * np.sqrt(lead_time))
+        self.reorder_point = np.ceil(self.mean * lead_time) + self.safety_stock
+        self.eoq = np.ceil(economic_order_quantity(self.mean, order_cost, holding_cost))
+        self.reorder = (self.stock <= self.reorder_point) & (self.mean > 0)
+        self.order_quantity = np.where(self.reorder, np.maximum(self.eoq, self.reorder_point - self.stock), 0)
+
+    def items(self, limit=None):
+        """
+        Products to reorder now, most urgent (lowest stock relative to the reorder point) first.
+        """
+        candidates = np.flatnonzero(self.reorder)
+        stock, reorder_point = self.stock[candidates], self.reorder_point[candidates]
+        # With no lead time the reorder point can be 0, which only products out of stock (or oversold) reach
+        urgency = np.divide(stock, reorder_point, out=np.where(stock < 0, -np.inf, 0.0), where=reorder_point > 0)
+        order = np.argsort(urgency, kind="stable")
+        if limit is not None:
+            order = order[:limit]
+        selected = candidates[order]
+        with np.errstate(divide="ignore"):
+            days_remaining = (self.stock[selected] / self.mean[selected]).tolist()
+        return [
+            {
+                'product_id': self.product_ids[i],
+                'product': self.titles[i],
+                'stock': int(stock),
+                'daily_demand': mean,
+                'demand_std': std,
+                'safety_stock': int(safety),
+                'reorder_point': int(reorder_point),
+                'order_quantity': int(quantity),
+                'days_remaining': remaining
+            }
+            for i, stock, mean, std, safety, reorder_point, quantity, remaining in zip(
+                selected.tolist(), self.stock[selected].tolist(), self.mean[selected].tolist(),
+                self.std[selected].tolist(), self.safety_stock[selected].tolist(),
+                self.reorder_point[selected].tolist(), self.order_quantity[selected].tolist(), days_remaining
+            )
+        ]
+
+    def summary(self):
+        """Catalog-wide totals of the plan."""
+        return {
+            'lead_time': self.lead_time,
+            'service_level': self.service_level,
+            'products': len(self.product_ids),
+            'reorder_products': int(self.reorder.sum()),
+            'order_units': int(self.order_quantity.sum()),
+            'safety_stock_units': int(self.safety_stock.sum())
+        }
+
+
+def what_if_grid(stock, sales, lead_times, service_levels, order_cost=50.0, holding_cost=2.0):
+    """
+    Evaluate the replenishment policy of a whole catalog for every combination of lead time and service level.
+    Demand statistics and EOQs are computed once; each lead time is one (products x service levels) array pass,
+    so memory stays at a few products x service levels arrays whatever the grid size.
+    Args:
+        stock: Stock per product
+        sales: Product x day matrix of the demand history
+        lead_times: Lead times in days (grid rows)
+        service_levels: Cycle service levels (grid columns)
+        order_cost: Fixed cost per order
+        holding_cost: Cost of holding one unit for a year
+    Returns:
+        list: One dict per (lead_time, service_level) with the products to reorder, the units to order, the
+        safety stock and its annual holding cost
+    """
+    stock = np.asarray(stock, dtype=np.float64)[:, None]
+    mean, std = demand_stats(sales)
+    eoq = np.ceil(economic_order_quantity(mean, order_cost, holding_cost))[:, None]
+    selling = (mean > 0)[:, None]
+    z = service_factor(service_levels)[None, :]
+
+    cells = []
+    for lead_time in lead_times:
+        safety_stock = np.ceil(std[:, None] * np.sqrt(lead_time) * z)
+        reorder_point = np.ceil(mean * lead_time)[:, None] + safety_stock
+        reorder = (stock <= reorder_point) & selling
+        order_units = np.where(reorder, np.maximum(eoq, reorder_point - stock), 0).sum(axis=0)
+        safety_units = safety_stock.sum(axis=0)
+        for column, service_level in enumerate(service_levels):
+            cells.append({
+                'lead_time': lead_time,
+                'service_level': service_level,
+                'reorder_products': int(reorder[:, column].sum()),
+                'order_units': int(order_units[column]),
+                'safety_stock_units': int(safety_units[column]),
+                'safety_stock_holding_cost': float(safety_units[column] * holding_cost)
+            })
+    return cells
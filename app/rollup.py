@@ -0,0 +1,186 @@
+# app/rollup.py
+import logging
+from collections import defaultdict
+from datetime import date
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+from .models import db, Order, LineItem, DailyProductSales
+from .timeseries import stage_sales
+from .versions import bump_data_version, bump_history_version, bump_sales_version
+
+logger = logging.getLogger(__name__)
+
+# Raw DBAPI upsert: this runs for every ingest batch, so skip per-row SQLAlchemy parameter processing
+UPSERT_SQL = (
+    "INSERT INTO daily_product_sales (shop, product_id, date, quantity) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT (shop, product_id, date) DO UPDATE SET quantity = quantity + excluded.quantity"
+)
+
+
+def record_sales(connection, rows):
+    """
+    Add sold quantities to the daily_product_sales rollup and bump the data version of the shops involved.
+    Args:
+        connection: SQLAlchemy connection to write through, inside the caller's transaction
+        rows: Iterable of (shop, product_id, date, quantity) tuples; negative quantities subtract
+    Returns:
+        int: Number of rollup rows touched
+    """
+    totals = defaultdict(int)
+    for shop, product_id, day, quantity in rows:
+        totals[(shop, product_id, day)] += quantity
+    totals = {key: quantity for key, quantity in totals.items() if quantity}
+    if not totals:
+        return 0
+
+    connection.exec_driver_sql(UPSERT_SQL, [
+        (shop, product_id, day.isoformat(), quantity)
+        for (shop, product_id, day), quantity in totals.items()
+    ])
+    bump_data_version(connection, {shop for shop, _, _ in totals})
+    # Late edits (cancellations, backfills) change days an order history snapshot may already hold
+    today = date.today()
+    bump_history_version(connection, {shop for shop, _, day in totals if day < today})
+    stage_sales(connection, totals, bump_sales_version(connection, {shop for shop, _, _ in totals}))
+    return len(totals)
+
+
+def rebuild_daily_sales(shop=None):
+    """
+    Recompute the rollup from the raw orders/line_items tables.
+    Args:
+        shop: Only rebuild this shop's rows (default: every shop)
+    Returns:
+        int: Number of rollup rows written
+    """
+    delete = DailyProductSales.__table__.delete()
+    day = func.date(Order.created_at)
+    source = select(
+        Order.shop,
+        LineItem.product_id,
+        day,
+        func.sum(LineItem.quantity)
+    ).join(Order, Order.id == LineItem.order_id)
+    if shop is not None:
+        delete = delete.where(DailyProductSales.shop == shop)
+        source = source.where(Order.shop == shop)
+    source = source.group_by(Order.shop, LineItem.product_id, day)
+
+    try:
+        db.session.execute(delete)
+        result = db.session.execute(DailyProductSales.__table__.insert().from_select(
+            ["shop", "product_id", "date", "quantity"], source
+        ))
+        bump_data_version(db.session, None if shop is None else [shop])
+        bump_history_version(db.session, None if shop is None else [shop])
+        bump_sales_version(db.session, None if shop is None else [shop])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    logger.info("Rebuilt daily_product_sales for shop %s: %d rows", shop or "all shops", result.rowcount)
+    return result.rowcount
+
+
+def _stored_values(session, obj, columns):
+    """The values of `columns` of a flushed object as they are in the database, before this flush writes it."""
+    state = inspect(obj)
+    values, unknown = {}, []
+    for column in columns:
+        history = state.attrs[column.key].history
+        if history.deleted:
+            values[column.key] = history.deleted[0]
+        elif history.added:
+            unknown.append(column)  # Assigning to an expired attribute does not load the old value
+        else:
+            values[column.key] = getattr(obj, column.key)
+    if unknown:
+        row = session.connection().execute(select(*unknown).where(type(obj).id == obj.id)).one()
+        values.update(zip((column.key for column in unknown), row))
+    return values
+
+
+def _changed(obj, columns):
+    state = inspect(obj)
+    return any(state.attrs[column.key].history.added for column in columns)
+
+
+LINE_ITEM_KEYS = (LineItem.order_id, LineItem.product_id, LineItem.quantity)
+ORDER_KEYS = (Order.shop, Order.created_at)
+
+
+def _collect_changes_before_flush(session, flush_context, instances):
+    # Old values are only readable before the flush, new rows only get their order_id during it,
+    # so capture deltas here and resolve them in _update_rollup_after_flush.
+    pending = session.info.setdefault("rollup_pending", [])
+    moved = session.info.setdefault("rollup_moved_orders", {})
+    for obj in session.new:
+        if isinstance(obj, LineItem):
+            pending.append(obj)
+    for obj in session.deleted:
+        if isinstance(obj, LineItem):
+            pending.append((obj.order_id, obj.product_id, -obj.quantity))
+    for obj in session.dirty:
+        if isinstance(obj, LineItem) and _changed(obj, LINE_ITEM_KEYS):
+            # Retract the line item from the key it was counted under, then count it again as it is now
+            old = _stored_values(session, obj, LINE_ITEM_KEYS)
+            pending.append((old["order_id"], old["product_id"], -old["quantity"]))
+            pending.append(obj)
+        elif isinstance(obj, Order) and _changed(obj, ORDER_KEYS):
+            # Its stored line items move to another shop or day: retract them from the old one now
+            old = _stored_values(session, obj, ORDER_KEYS)
+            moved[obj.id] = [
+                (old["shop"], product_id, old["created_at"].date(), -quantity)
+                for product_id, quantity in session.connection().execute(
+                    select(LineItem.product_id, LineItem.quantity).where(LineItem.order_id == obj.id)
+                )
+            ]
+
+
+def _update_rollup_after_flush(session, flush_context):
+    pending = session.info.pop("rollup_pending", None)
+    moved = session.info.pop("rollup_moved_orders", None)
+    if not pending and not moved:
+        return
+    moved = moved or {}
+    # Line items of a moved order are re-counted from the database below, whatever else changed about them
+    changes = [
+        change
+        for change in (
+            (change.order_id, change.product_id, change.quantity) if isinstance(change, LineItem) else change
+            for change in pending or []
+        )
+        if change[0] not in moved
+    ]
+
+    # Orders flushed in the same batch are still in the session; look up the rest in one query.
+    orders = {}
+    for obj in list(session.new) + list(session.identity_map.values()):
+        if isinstance(obj, Order):
+            orders[obj.id] = (obj.shop, obj.created_at)
+    missing = {order_id for order_id, _, _ in changes if order_id not in orders}
+    connection = session.connection()
+    if missing:
+        for order_id, shop, created_at in connection.execute(
+            select(Order.id, Order.shop, Order.created_at).where(Order.id.in_(missing))
+        ):
+            orders[order_id] = (shop, created_at)
+    if moved:
+        changes += connection.execute(
+            select(LineItem.order_id, LineItem.product_id, LineItem.quantity).where(LineItem.order_id.in_(moved))
+        ).all()
+
+    rows = [row for retracted in moved.values() for row in retracted]
+    for order_id, product_id, quantity in changes:
+        if order_id in orders:
+            shop, created_at = orders[order_id]
+            rows.append((shop, product_id, created_at.date(), quantity))
+    record_sales(connection, rows)
+
+
+def install_rollup_hooks():
+    """Keep daily_product_sales in sync with every ORM flush that writes line items or moves an order."""
+    if not event.contains(Session, "before_flush", _collect_changes_before_flush):
+        event.listen(Session, "before_flush", _collect_changes_before_flush)
+    if not event.contains(Session, "after_flush", _update_rollup_after_flush):
+        event.listen(Session, "after_flush", _update_rollup_after_flush)
@@ -1,22 +1,28 @@
-import shopify
-import requests
+import hashlib
+import json
 from .config import Config
 from datetime import datetime, timedelta
-from flask import Blueprint, jsonify, redirect, url_for, request, render_template, current_app as app
-from .dashboard import get_orders_data, get_inventory_data, get_low_stock_alerts, get_stock_predictions
+from flask import Blueprint, Response, jsonify, redirect, url_for, request, render_template, current_app as app
+from .instrumentation import render_metrics, span
 from .models import Order
+from .webhooks import TOPICS, WebhookDelivery, verify_webhook
 
 bp = Blueprint('main', __name__)
-session_data = {}  # In-memory storage for access tokens
+
+
+def shop_credentials():
+    """The shop credential store of the current app (see app/shops.py)."""
+    return app.extensions["shop_credentials"]
+
 
 # Root route
 @bp.route("/")
 def home():
     shop = request.args.get("shop")  # Check for shop in query string
-    if shop and shop in session_data:
+    if shop and shop_credentials().get(shop):
         return redirect(url_for('main.dashboard', shop=shop))
-    elif session_data and list(session_data.keys()):
-        default_shop = list(session_data.keys())[0]  # Use the last authenticated shop
+    default_shop = shop_credentials().latest()  # Use the last authenticated shop
+    if default_shop:
         return redirect(url_for('main.dashboard', shop=default_shop))
     else:
         return redirect(url_for('main.install', shop="quickstart-c21ead54.myshopify.com"))
@@ -27,11 +33,12 @@ def install():
     if not shop:
         return jsonify({"error": "Missing shop parameter"}), 400
 
-    if shop in session_data:
+    if shop_credentials().get(shop):
         return redirect(url_for('main.dashboard', shop=shop))
 
     shop = shop.replace("https://", "").replace("http://", "").rstrip("/")
     shop_url = f"https://{shop}"
+    import shopify  # The SDK is slow to import and only the OAuth routes need it
     shopify.Session.setup(api_key=Config.API_KEY, secret=Config.API_SECRET)
     session = shopify.Session(shop_url, Config.API_VERSION)
     # Hardcode redirect_uri to match Shopify settings
@@ -52,7 +59,9 @@ def callback():
     shop_url = f"https://{shop}"
 
     try:
-        token_url = f"{shop_url}/admin/oauth/access_token"
+        import requests
+        import shopify
+        token_url = f"{app.config['SHOPIFY_BASE_URL'] or shop_url}/admin/oauth/access_token"
         payload = {
             "client_id": Config.API_KEY,
             "client_secret": Config.API_SECRET,
@@ -71,79 +80,108 @@ def callback():
         associated_scopes = token_data.get("scope", "").split(",")
         expected_scopes = set(['read_orders', 'read_products', 'read_inventory'])
         if not all(scope in expected_scopes for scope in associated_scopes):
-            print(f"Warning: Unexpected scopes returned: {associated_scopes}")
+            app.logger.warning("Unexpected scopes returned: %s", associated_scopes)
 
         session = shopify.Session(shop_url, Config.API_VERSION, access_token)
-        session_data[shop] = {"access_token": access_token}
+        shop_credentials().save(shop, access_token, associated_scopes)
         return redirect(url_for('main.dashboard', shop=shop))
 
     except Exception as e:
         return jsonify({"error": "Internal server error", "details": str(e)}), 500
 
 
+def parse_forecast_params():
+    """
+    Read the window/days_of_cover/lead_time query parameters shared by the dashboard and the API, defaulting to
+    the FORECAST_* settings.
+    Returns:
+        tuple: (params dict, None) or (None, 400 error response)
+    """
+    window = request.args.get("window", app.config["FORECAST_WINDOW"], type=int)
+    days_of_cover = request.args.get("days_of_cover", app.config["FORECAST_DAYS_OF_COVER"], type=int)
+    lead_time = request.args.get("lead_time", app.config["FORECAST_LEAD_TIME"], type=int)
+    if window < 1 or days_of_cover < 0 or lead_time < 0:
+        return None, (jsonify({"error": "window must be positive, days_of_cover and lead_time non-negative"}), 400)
+    return {"window": window, "days_of_cover": days_of_cover, "lead_time": lead_time}, None
+
 @bp.route("/dashboard")
 def dashboard():
     shop = request.args.get("shop")
-    app.logger.info(f"Dashboard request received for shop: {shop}")
+    app.logger.info("Dashboard request received for shop: %s", shop)
 
     if not shop:
         app.logger.error("Missing shop parameter in dashboard request")
         return jsonify({"error": "Missing shop parameter"}), 400
 
-    if shop not in session_data:
-        app.logger.info(f"Shop {shop} not in session_data, redirecting to install")
+    if not shop_credentials().get(shop):
+        app.logger.info("Shop %s is not installed, redirecting to install", shop)
         return redirect(url_for('main.install', shop=shop))
 
-    orders_data = None
-    inventory_data = None
-    low_stock_alerts = None
-    stock_predictions = None
-
-    try:
-        app.logger.info(f"Fetching orders data for shop: {shop}")
-        orders_data = get_orders_data(shop)
-        app.logger.info(f"Orders data fetched: {orders_data}")
-    except Exception as e:
-        app.logger.error(f"Failed to fetch orders data for shop {shop}: {str(e)}", exc_info=True)
-        return jsonify({"error": "Failed to fetch orders data", "details": str(e)}), 500
-
-    try:
-        app.logger.info(f"Fetching inventory data for shop: {shop}")
-        inventory_data = get_inventory_data(shop)
-        app.logger.info(f"Inventory data fetched: {inventory_data}")
-    except Exception as e:
-        app.logger.error(f"Failed to fetch inventory data for shop {shop}: {str(e)}", exc_info=True)
-        return jsonify({"error": "Failed to fetch inventory data", "details": str(e)}), 500
+    forecast_params, error = parse_forecast_params()
+    if error:
+        return error
 
+    # The page is a static shell; its sections load from the JSON API (app/api.py)
     try:
-        app.logger.info(f"Fetching low stock alerts for shop: {shop}")
-        low_stock_alerts = get_low_stock_alerts(shop)
-        app.logger.info(f"Low stock alerts fetched: {low_stock_alerts}")
+        with span("render"):
+            return render_template(
+                "dashboard.html",
+                shop=shop,
+                api_urls={
+                    "sales": url_for("api.sales", shop=shop, window=forecast_params["window"]),
+                    "inventory": url_for("api.inventory", shop=shop),
+                    "inventory_export": url_for("api.inventory_export", shop=shop, format="csv"),
+                    "alerts": url_for("api.alerts", shop=shop, **forecast_params),
+                    "predictions": url_for("api.predictions", shop=shop, **forecast_params),
+                    "locations": url_for("api.locations", shop=shop, **forecast_params),
+                },
+                **forecast_params
+            )
     except Exception as e:
-        app.logger.error(f"Failed to fetch low stock alerts for shop {shop}: {str(e)}", exc_info=True)
-        return jsonify({"error": "Failed to fetch low stock alerts", "details": str(e)}), 500
+        app.logger.error("Failed to render dashboard for shop %s: %s", shop, e, exc_info=True)
+        return jsonify({"error": "Failed to render dashboard", "details": str(e)}), 500
 
+@bp.route("/cache/stats")
+def cache_stats():
+    return jsonify(app.extensions["dashboard_cache"].stats())
+
+@bp.route("/webhooks", methods=["POST"])
+def webhooks():
+    body = request.get_data()
+    if not verify_webhook(body, request.headers.get("X-Shopify-Hmac-Sha256"), Config.API_SECRET):
+        app.logger.warning("Rejected webhook with an invalid HMAC signature")
+        return jsonify({"error": "Invalid HMAC signature"}), 401
+
+    topic = request.headers.get("X-Shopify-Topic")
+    shop = request.headers.get("X-Shopify-Shop-Domain")
+    if topic not in TOPICS:
+        return jsonify({"error": f"Unsupported topic: {topic}"}), 400
+    if not shop:
+        return jsonify({"error": "Missing X-Shopify-Shop-Domain header"}), 400
     try:
-        app.logger.info(f"Fetching stock predictions for shop: {shop}")
-        stock_predictions = get_stock_predictions(shop)
-        app.logger.info(f"Stock predictions fetched: {stock_predictions}")
-    except Exception as e:
-        app.logger.error(f"Failed to fetch stock predictions for shop {shop}: {str(e)}", exc_info=True)
-        return jsonify({"error": "Failed to fetch stock predictions", "details": str(e)}), 500
+        payload = json.loads(body)
+    except ValueError:
+        return jsonify({"error": "Invalid JSON payload"}), 400
+
+    delivery = WebhookDelivery(
+        # Retries of a delivery carry the same webhook ID
+        id=request.headers.get("X-Shopify-Webhook-Id") or hashlib.sha256(body).hexdigest(),
+        topic=topic,
+        shop=shop,
+        payload=payload
+    )
+    # Acknowledge right away; the background writer stores the delivery with the next batch
+    if not app.extensions["webhook_writer"].submit(delivery):
+        return jsonify({"error": "Webhook queue full, retry later"}), 503
+    return "", 200
+
+@bp.route("/metrics")
+def metrics():
+    return Response(
+        render_metrics(app.extensions["dashboard_cache"]),
+        mimetype="text/plain; version=0.0.4"
+    )
 
-    try:
-        app.logger.info(f"Rendering dashboard for shop: {shop}")
-        return render_template(
-            "dashboard.html",
-            shop=shop,
-            orders_data=orders_data,
-            inventory_data=inventory_data,
-            low_stock_alerts=low_stock_alerts,
-            stock_predictions=stock_predictions
-        )
-    except Exception as e:
-        app.logger.error(f"Failed to render dashboard for shop {shop}: {str(e)}", exc_info=True)
-        return jsonify({"error": "Failed to render dashboard", "details": str(e)}), 500
 # def dashboard():
 #     shop = request.args.get("shop")
 #     if not shop or shop not in session_data:
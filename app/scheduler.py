@@ -0,0 +1,193 @@
+# app/scheduler.py
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from .forecasts import compute_shop_forecast
+from .models import db
+
+logger = logging.getLogger(__name__)
+
+# Shops whose stored forecast is missing, behind their data version, from another day or older than :max_age
+STALE_SHOPS_SQL = text(
+    "SELECT v.shop FROM shop_data_versions v LEFT JOIN forecast_runs r ON r.shop = v.shop "
+    "WHERE r.shop IS NULL OR r.data_version != v.version OR date(r.computed_at) != date(:now) "
+    "OR r.computed_at < :oldest OR r.window != :window OR r.days_of_cover != :days_of_cover "
+    "OR r.lead_time != :lead_time ORDER BY v.shop"
+)
+
+_worker_app = None
+
+
+def _init_process_worker(config):
+    # Each pool process gets its own app, engine and connection pool; the parent has already set up the schema
+    global _worker_app
+    from . import create_app
+    _worker_app = create_app(dict(config, BOOT_MODE="production", FORECAST_SCHEDULER=False))
+
+
+def _compute_in_process(shop, params):
+    with _worker_app.app_context():
+        return compute_shop_forecast(shop, **params)
+
+
+class ForecastScheduler:
+    """
+    Keeps the `forecasts` table current. A background thread polls every `poll_interval` seconds for shops whose
+    data version changed (or whose forecast is older than `max_age` seconds or from another day) and recomputes
+    them on a thread or process pool. Only one process per host runs the loop, elected with a lock file. A shop
+    whose computation fails is retried after a backoff that doubles with each consecutive failure, from
+    `poll_interval` up to `max_age`.
+    """
+
+    def __init__(self, app, params, max_age=900, poll_interval=2.0, workers=2, executor="thread", lock_path=None):
+        self.app = app
+        self.params = params
+        self.max_age = max_age
+        self.poll_interval = poll_interval
+        self.workers = workers
+        self.executor = executor
+        self.lock_path = lock_path
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._lock_file = None
+        self._lock = threading.Lock()
+        self._failures = {}  # shop -> (consecutive failures, monotonic time before which it is not retried)
+
+    def serves(self, window, days_of_cover, lead_time):
+        """Whether these forecast parameters are the ones the scheduler precomputes."""
+        return (window, days_of_cover, lead_time) == (
+            self.params["window"], self.params["days_of_cover"], self.params["lead_time"]
+        )
+
+    def start(self):
+        """Start the polling thread in this process, if it is not running yet."""
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="forecast-scheduler", daemon=True)
+                self._thread.start()
+
+    def notify(self):
+        """Wake the polling thread now, e.g. after a request found a stale forecast."""
+        self._wake.set()
+
+    def _acquire_leadership(self):
+        if self.lock_path is None:
+            return True
+        try:
+            import fcntl
+        except ImportError:  # No flock: every process schedules
+            return True
+        if self._lock_file is None:
+            self._lock_file = open(self.lock_path, "a")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def _run(self):
+        leader = False
+        while True:
+            # Followers retry every poll (a non-blocking flock), so another worker soon takes over from an exited leader
+            leader = leader or self._acquire_leadership()
+            if leader:
+                try:
+                    with self.app.app_context():
+                        shops = self.due(self.stale_shops())
+                    if shops:
+                        self.run(shops)
+                except Exception:
+                    logger.error("Forecast scheduler iteration failed", exc_info=True)
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def stale_shops(self):
+        now = datetime.now()
+        return list(db.session.execute(STALE_SHOPS_SQL, {
+            "now": now.strftime("%Y-%m-%d %H:%M:%S.%f"),
+            "oldest": (now - timedelta(seconds=self.max_age)).strftime("%Y-%m-%d %H:%M:%S.%f"),
+            **self.params
+        }).scalars())
+
+    def due(self, shops):
+        """The given shops minus those still backing off after a failure."""
+        now = time.monotonic()
+        return [shop for shop in shops if self._failures.get(shop, (0, now))[1] <= now]
+
+    def run(self, shops):
+        """
+        Recompute the given shops on the pool. A failing shop is logged and backs off before its next attempt.
+        Returns:
+            list: compute_shop_forecast() results of the shops that succeeded
+        """
+        results = []
+        with self._executor() as executor:
+            futures = {executor.submit(*self._task(shop)): shop for shop in shops}
+            for future in as_completed(futures):
+                shop = futures[future]
+                try:
+                    results.append(future.result())
+                    self._failures.pop(shop, None)
+                except Exception:
+                    failures = self._failures.get(shop, (0, 0))[0] + 1
+                    delay = min(self.poll_interval * 2 ** failures, self.max_age)
+                    self._failures[shop] = (failures, time.monotonic() + delay)
+                    logger.error("Forecast for %s failed (%d in a row, retrying in %.0fs)", shop, failures, delay,
+                                 exc_info=True)
+        for result in results:
+            logger.info("Forecast for %s: %d products in %.2fs", result["shop"], result["products"], result["seconds"])
+        return results
+
+    def _executor(self):
+        if self.executor == "process":
+            return ProcessPoolExecutor(
+                self.workers,
+                mp_context=multiprocessing.get_context("spawn"),  # Never fork a process that runs threads
+                initializer=_init_process_worker,
+                initargs=({"SQLALCHEMY_DATABASE_URI": self.app.config["SQLALCHEMY_DATABASE_URI"]},)
+            )
+        return ThreadPoolExecutor(self.workers, thread_name_prefix="forecast")
+
+    def _task(self, shop):
+        if self.executor == "process":
+            return _compute_in_process, shop, self.params
+
+        def compute():
+            with self.app.app_context():
+                return compute_shop_forecast(shop, **self.params)
+        return (compute,)
+
+
+def init_scheduler(app):
+    """
+    Create the forecast scheduler configured by FORECAST_* settings. With FORECAST_SCHEDULER enabled it starts
+    with the first request a worker serves, so CLI scripts never run it.
+    """
+    params = {
+        "window": app.config["FORECAST_WINDOW"],
+        "days_of_cover": app.config["FORECAST_DAYS_OF_COVER"],
+        "lead_time": app.config["FORECAST_LEAD_TIME"],
+    }
+    scheduler = ForecastScheduler(
+        app,
+        params,
+        max_age=app.config["FORECAST_MAX_AGE"],
+        poll_interval=app.config["FORECAST_POLL_INTERVAL_MS"] / 1000,
+        workers=app.config["FORECAST_WORKERS"],
+        executor=app.config["FORECAST_EXECUTOR"],
+        lock_path=app.config["FORECAST_LOCK_PATH"],
+    )
+    app.extensions["forecast_scheduler"] = scheduler
+
+    if app.config["FORECAST_SCHEDULER"]:
+        @app.before_request
+        def _start_forecast_scheduler():
+            scheduler.start()
+    return scheduler
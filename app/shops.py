@@ -0,0 +1,70 @@
+# app/shops.py
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from .cache import MemoryCache, _MISSING
+from .engines import read_session
+from .models import db, ShopCredential
+
+
+class ShopCredentials:
+    """
+    Installed shops and their access tokens. The `shop_credentials` table is the source of truth, so every worker
+    and instance sees the same shops; each worker reads it through an in-process TTL cache, making the token
+    lookup on the request hot path a dictionary hit.
+
+    Unknown shops are not cached: a shop installed through another worker is recognized on its next request.
+    """
+
+    def __init__(self, ttl=60, max_entries=10000):
+        self.cache = MemoryCache(max_entries, ttl)
+
+    def get(self, shop):
+        """
+        Returns:
+            dict: {"access_token": ..., "scopes": [...]}, or None if the shop is not installed
+        """
+        if not shop:
+            return None
+        credentials = self.cache.get(shop)
+        if credentials is not _MISSING:
+            return credentials
+        row = read_session().execute(
+            select(ShopCredential.access_token, ShopCredential.scopes).where(ShopCredential.shop == shop)
+        ).first()
+        if row is None:
+            return None
+        credentials = {"access_token": row.access_token, "scopes": row.scopes.split(",") if row.scopes else []}
+        self.cache.set(shop, credentials)
+        return credentials
+
+    def save(self, shop, access_token, scopes=()):
+        """Store the token of a newly installed (or reinstalled) shop and commit."""
+        now = datetime.now()
+        stmt = insert(ShopCredential).values(
+            shop=shop, access_token=access_token, scopes=",".join(scopes), installed_at=now, updated_at=now
+        )
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[ShopCredential.shop],
+            set_={"access_token": stmt.excluded.access_token, "scopes": stmt.excluded.scopes, "updated_at": now}
+        ))
+        db.session.commit()
+        self.cache.set(shop, {"access_token": access_token, "scopes": list(scopes)})
+
+    def delete(self, shop):
+        """Forget a shop, e.g. after it uninstalled the app. Other workers drop it within the cache TTL."""
+        db.session.query(ShopCredential).filter(ShopCredential.shop == shop).delete()
+        db.session.commit()
+        self.cache.delete(shop)
+
+    def latest(self):
+        """The most recently installed shop, or None."""
+        return read_session().execute(
+            select(ShopCredential.shop).order_by(ShopCredential.updated_at.desc()).limit(1)
+        ).scalar()
+
+
+def init_shops(app):
+    """Create the shop credential store configured by SHOP_CACHE_* settings and attach it to the app."""
+    app.extensions["shop_credentials"] = ShopCredentials(app.config["SHOP_CACHE_TTL"], app.config["SHOP_CACHE_MAX_ENTRIES"])
+    return app.extensions["shop_credentials"]
@@ -0,0 +1,215 @@
+# app/sync.py
+import logging
+import time
+from datetime import date, datetime, timezone
+from itertools import islice
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from .models import db, ShopSyncState
+from .rollup import record_sales
+
+logger = logging.getLogger(__name__)
+
+ORDER_FIELDS = "id,created_at,updated_at,cancelled_at,line_items"
+ORDER_UPSERT_SQL = (
+    "INSERT INTO orders (id, shop, created_at, updated_at) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT (id) DO UPDATE SET shop = excluded.shop, created_at = excluded.created_at, "
+    "updated_at = excluded.updated_at"
+)
+LINE_ITEM_INSERT_SQL = "INSERT INTO line_items (order_id, product_id, product_title, quantity) VALUES (?, ?, ?, ?)"
+
+
+class ShopifyClient:
+    """
+    Minimal Admin REST client: cursor pagination through Link headers and retries on rate limits and 5xx.
+    `base_url` replaces https://<shop>, e.g. to talk to a local stand-in server.
+    """
+
+    def __init__(self, shop, access_token, api_version, base_url=None, session=None, timeout=30, max_retries=5):
+        self.base_url = (base_url or f"https://{shop}").rstrip("/")
+        self.api_version = api_version
+        if session is None:
+            import requests  # Not needed by webhook workers, which only use normalize_order/upsert_orders
+            session = requests.Session()
+        self.session = session
+        self.session.headers["X-Shopify-Access-Token"] = access_token
+        self.timeout = timeout
+        self.max_retries = max_retries
+
+    def get(self, url, params=None):
+        for attempt in range(self.max_retries + 1):
+            response = self.session.get(url, params=params, timeout=self.timeout)
+            retryable = response.status_code == 429 or response.status_code >= 500
+            if not retryable or attempt == self.max_retries:
+                response.raise_for_status()
+                return response
+            delay = float(response.headers.get("Retry-After", 2 ** attempt))
+            logger.warning("Shopify returned %s for %s, retrying in %.1fs", response.status_code, url, delay)
+            time.sleep(delay)
+
+    def iter_pages(self, resource, key, params=None):
+        """Yield the `key` list of every page of a resource, following rel="next" cursors."""
+        url = f"{self.base_url}/admin/api/{self.api_version}/{resource}.json"
+        while url:
+            response = self.get(url, params)
+            yield response.json()[key]
+            url = response.links.get("next", {}).get("url")
+            params = None  # The next link carries the page_info cursor and every filter
+
+
+def fetch_orders(client, updated_at_min=None, page_size=250):
+    """
+    Stream orders updated at or after `updated_at_min`, oldest update first, one page in memory at a time.
+    """
+    params = {"status": "any", "limit": page_size, "order": "updated_at asc", "fields": ORDER_FIELDS}
+    if updated_at_min:
+        params["updated_at_min"] = updated_at_min
+    for page in client.iter_pages("orders", "orders", params):
+        yield from page
+
+
+def _wall_clock(timestamp):
+    # Keep the shop's local time: daily sales are bucketed by the merchant's calendar day
+    return datetime.fromisoformat(timestamp).replace(tzinfo=None)
+
+
+def updated_at_utc(timestamp):
+    """
+    Parse a Shopify updated_at into an aware UTC datetime, so updates sent with different offsets compare in
+    order. A timestamp without an offset is taken as UTC; a missing one sorts first.
+    """
+    if not timestamp:
+        return datetime.min.replace(tzinfo=timezone.utc)
+    parsed = datetime.fromisoformat(timestamp)
+    return parsed.replace(tzinfo=timezone.utc) if parsed.tzinfo is None else parsed.astimezone(timezone.utc)
+
+
+def normalize_order(order):
+    """
+    Map an Orders API record to (order_id, created_at, line item rows, updated_at).
+    Cancelled orders keep their row but no line items, so they drop out of sales. Custom line items
+    without a product are skipped.
+    """
+    order_id = str(order["id"])
+    line_items = [] if order.get("cancelled_at") else [
+        (order_id, str(item["product_id"]), (item.get("title") or "")[:100], int(item["quantity"]))
+        for item in order.get("line_items") or []
+        if item.get("product_id") is not None
+    ]
+    return order_id, _wall_clock(order["created_at"]), line_items, order["updated_at"]
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def upsert_orders(connection, shop, orders):
+    """
+    Upsert a batch of normalized orders and replace their line items, keeping the sales rollup in step.
+    Args:
+        connection: SQLAlchemy connection, inside the caller's transaction
+        shop: Shopify shop domain the orders belong to
+        orders: normalize_order() tuples; a later duplicate of an order wins. Orders whose updated_at is
+            older than the stored one are skipped, so a late or retried webhook never overwrites newer state.
+    Returns:
+        int: Line items written
+    """
+    orders = {order[0]: order for order in orders}
+    placeholders = ", ".join("?" for _ in orders)
+    stored = connection.exec_driver_sql(
+        f"SELECT id, updated_at FROM orders WHERE updated_at IS NOT NULL AND id IN ({placeholders})", tuple(orders)
+    ).all()
+    for order_id, updated_at in stored:
+        if updated_at_utc(orders[order_id][3]) < updated_at_utc(updated_at):
+            logger.debug("Skipping order %s: its update is older than the stored one", order_id)
+            del orders[order_id]
+    if not orders:
+        return 0
+    orders = list(orders.values())
+    order_ids = tuple(order[0] for order in orders)
+    placeholders = ", ".join("?" for _ in order_ids)
+
+    # Retract what earlier syncs recorded for these orders before writing their current state
+    previous = connection.exec_driver_sql(
+        "SELECT orders.shop, line_items.product_id, date(orders.created_at), line_items.quantity "
+        f"FROM line_items JOIN orders ON orders.id = line_items.order_id WHERE line_items.order_id IN ({placeholders})",
+        order_ids
+    ).all()
+    if previous:
+        connection.exec_driver_sql(f"DELETE FROM line_items WHERE order_id IN ({placeholders})", order_ids)
+
+    connection.exec_driver_sql(ORDER_UPSERT_SQL, [
+        (order_id, shop, created_at.strftime("%Y-%m-%d %H:%M:%S.%f"),
+         updated_at_utc(updated_at).strftime("%Y-%m-%d %H:%M:%S.%f") if updated_at else None)
+        for order_id, created_at, _, updated_at in orders
+    ])
+    line_items = [row for _, _, rows, _ in orders for row in rows]
+    if line_items:
+        connection.exec_driver_sql(LINE_ITEM_INSERT_SQL, line_items)
+
+    created = {order_id: created_at.date() for order_id, created_at, _, _ in orders}
+    record_sales(connection, [
+        (previous_shop, product_id, date.fromisoformat(day), -quantity)
+        for previous_shop, product_id, day, quantity in previous
+    ] + [
+        (shop, product_id, created[order_id], quantity)
+        for order_id, product_id, _, quantity in line_items
+    ])
+    return len(line_items)
+
+
+def get_high_water_mark(connection, shop):
+    return connection.execute(
+        select(ShopSyncState.orders_updated_at).where(ShopSyncState.shop == shop)
+    ).scalar()
+
+
+def _save_high_water_mark(connection, shop, updated_at):
+    stmt = insert(ShopSyncState).values(shop=shop, orders_updated_at=updated_at, orders_synced_at=datetime.now())
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=[ShopSyncState.shop],
+        set_={"orders_updated_at": stmt.excluded.orders_updated_at, "orders_synced_at": stmt.excluded.orders_synced_at}
+    ))
+
+
+def sync_orders(client, shop, full=False, batch_size=500, page_size=250):
+    """
+    Pull a shop's new and updated orders into the orders/line_items tables.
+
+    Orders stream page by page into batches of `batch_size`; each batch is upserted and committed together
+    with the advanced high-water mark, so memory stays bounded and an interrupted run resumes where it stopped.
+    The mark is inclusive: the orders updated at exactly that time are fetched again and upserted idempotently.
+    Args:
+        client: ShopifyClient for the shop
+        shop: Shopify shop domain
+        full: Ignore the high-water mark and re-read the whole order history
+        batch_size: Orders per write transaction
+        page_size: Orders per API page (Shopify allows at most 250)
+    Returns:
+        dict: Orders and line items written, the new high-water mark and the elapsed seconds
+    """
+    started = time.perf_counter()
+    orders = line_items = 0
+    with db.engine.connect() as connection:
+        mark = None if full else get_high_water_mark(connection, shop)
+        connection.commit()
+        since = mark
+        for batch in batched(map(normalize_order, fetch_orders(client, since, page_size)), batch_size):
+            with connection.begin():
+                line_items += upsert_orders(connection, shop, batch)
+                latest = max((order[3] for order in batch), key=datetime.fromisoformat)
+                if mark is None or datetime.fromisoformat(latest) > datetime.fromisoformat(mark):
+                    mark = latest
+                _save_high_water_mark(connection, shop, mark)
+            orders += len(batch)
+            logger.info("Synced %d orders for %s (high-water mark %s)", orders, shop, mark)
+    return {
+        "shop": shop,
+        "since": since,
+        "orders": orders,
+        "line_items": line_items,
+        "updated_at": mark,
+        "seconds": time.perf_counter() - started,
+    }
@@ -0,0 +1,240 @@
+# app/timeseries.py
+import threading
+import weakref
+from collections import OrderedDict
+from datetime import date, timedelta
+import numpy as np
+from sqlalchemy import event
+from .aggregates import get_sales_rows
+from .forecasting import build_sales_matrix
+from .models import db
+from .versions import get_sales_version
+
+WRAP = 2 ** 32
+
+# Engine -> SalesSeriesStore of the app that owns it
+_stores = weakref.WeakKeyDictionary()
+
+
+class SalesSeries:
+    """
+    The daily sold quantities of every product of one shop over the last `days` days, stored as running totals in
+    a uint32 ring buffer of days + 1 columns: cumulative[row, day % (days + 1)] is the product's total through that
+    day. Any window sum up to `days` days is the difference of two cells. The cells wrap around modulo 2**32, which
+    keeps the differences exact. Memory is 4 bytes x (days + 1) x products, with no Python object per row.
+    """
+
+    def __init__(self, days, product_ids, daily, today, version):
+        """
+        Args:
+            days: Number of days kept
+            product_ids: Products in row order
+            daily: Product x day matrix of the last `days` days, ending today (see build_sales_matrix)
+            today: Date of the last column of `daily`
+            version: Shop sales version the data was read at
+        """
+        self.days = days
+        self.slots = days + 1
+        self.today = today
+        self.version = version
+        self.index = {product_id: row for row, product_id in enumerate(product_ids)}
+        self.cumulative = np.zeros((max(len(product_ids), 16), self.slots), dtype=np.uint32)
+        if product_ids:
+            # The column before the window is the zero base
+            columns = [self._slot(today - timedelta(days=offset)) for offset in range(days - 1, -1, -1)]
+            totals = np.cumsum(daily, axis=1, dtype=np.int64) % WRAP
+            self.cumulative[:len(product_ids), columns] = totals.astype(np.uint32)
+
+    def _slot(self, day):
+        return day.toordinal() % self.slots
+
+    def roll(self, today):
+        """Advance to `today`: days without sales keep the running total of the day before."""
+        elapsed = (today - self.today).days
+        if elapsed <= 0:
+            return
+        current = self.cumulative[:, self._slot(self.today)].copy()
+        for offset in range(1, min(elapsed, self.slots) + 1):
+            self.cumulative[:, self._slot(self.today + timedelta(days=offset))] = current
+        self.today = today
+
+    def _row(self, product_id):
+        row = self.index.get(product_id)
+        if row is None:
+            row = self.index[product_id] = len(self.index)
+            if row == len(self.cumulative):
+                grown = np.zeros((2 * len(self.cumulative), self.slots), dtype=np.uint32)
+                grown[:row] = self.cumulative
+                self.cumulative = grown
+            # A new product has sold nothing yet: every column equals the base
+        return row
+
+    def add(self, product_id, day, quantity):
+        """Record `quantity` units (negative to retract) sold on `day`; days outside the window are ignored."""
+        offset = (self.today - day).days
+        if not 0 <= offset < self.days:
+            return
+        columns = [self._slot(day + timedelta(days=i)) for i in range(offset + 1)]
+        row = self._row(product_id)
+        self.cumulative[row, columns] += np.uint32(quantity % WRAP)
+
+    def window_sum(self, product_id, window):
+        """Units sold in the last `window` days, including today, in O(1)."""
+        row = self.index.get(product_id)
+        if row is None:
+            return 0
+        start = self.today - timedelta(days=window)
+        # Array (not scalar) arithmetic wraps around silently
+        cells = self.cumulative[row, [self._slot(self.today), self._slot(start)]]
+        return int((cells[:1] - cells[1:]).view(np.int32)[0])
+
+    def window_sums(self, window):
+        """
+        Units sold in the last `window` days by every product, as one vectorized difference of two columns.
+        Returns:
+            tuple: (product_ids, int32 array)
+        """
+        count = len(self.index)
+        start = self.today - timedelta(days=window)
+        difference = self.cumulative[:count, self._slot(self.today)] - self.cumulative[:count, self._slot(start)]
+        return list(self.index), difference.view(np.int32)
+
+    def matrix(self, product_ids, window):
+        """
+        Product x day sales of the last `window` days ending today, like build_sales_matrix: the differences of
+        consecutive running totals. Products without sales in the series get a row of zeros.
+        """
+        slots = [self._slot(self.today - timedelta(days=offset)) for offset in range(window, -1, -1)]
+        rows = np.array([self.index.get(product_id, -1) for product_id in product_ids], dtype=np.int64)
+        cumulative = self.cumulative[np.maximum(rows, 0)][:, slots]
+        daily = np.diff(cumulative, axis=1).view(np.int32).astype(np.float64)  # uint32 differences wrap around
+        daily[rows < 0] = 0
+        return daily
+
+
+class SalesSeriesStore:
+    """
+    Per-process SalesSeries of the `max_shops` shops read most recently. A series is warmed from the rollup on first
+    use and takes the sales this process commits in place (see stage_sales). Every read compares it with the shop's
+    sales version, so a write it did not see, such as another worker's, reloads it: reads are never older than the
+    data version a caller read before them.
+    """
+
+    def __init__(self, days=90, max_shops=256, clock=date.today):
+        self.days = days
+        self.max_shops = max_shops
+        self.clock = clock
+        self._series = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _current(self, shop):
+        # Called with the lock held
+        version = get_sales_version(shop)
+        series = self._series.get(shop)
+        if series is None or series.version != version:
+            series = self._series[shop] = self._warm(shop, version)
+            while len(self._series) > self.max_shops:
+                self._series.popitem(last=False)
+        self._series.move_to_end(shop)
+        series.roll(self.clock())
+        return series
+
+    def _warm(self, shop, version):
+        today = self.clock()
+        rows = get_sales_rows(shop, self.days, today)
+        product_ids = sorted({product_id for product_id, _, _ in rows})
+        return SalesSeries(self.days, product_ids, build_sales_matrix(rows, product_ids, self.days, today), today, version)
+
+    def _check_window(self, window):
+        if not 1 <= window <= self.days:
+            raise ValueError(f"window must be between 1 and {self.days}")
+
+    def velocity(self, shop, product_id, window=30):
+        """Average daily units sold by a product over the last `window` days (at most `days`)."""
+        self._check_window(window)
+        with self._lock:
+            return self._current(shop).window_sum(product_id, window) / window
+
+    def velocities(self, shop, window=30):
+        """Average daily units sold over the last `window` days by every product with sales in the series."""
+        self._check_window(window)
+        with self._lock:
+            product_ids, sums = self._current(shop).window_sums(window)
+        return dict(zip(product_ids, (sums / window).tolist()))
+
+    def sales_matrix(self, shop, product_ids, window=30):
+        """Product x day sales of the last `window` days ending today, like load_sales_matrix."""
+        self._check_window(window)
+        with self._lock:
+            return self._current(shop).matrix(product_ids, window)
+
+    def loaded(self, shops):
+        """The given shops that have a series in this process."""
+        return {shop for shop in shops if shop in self._series}
+
+    def apply(self, shop, rows, base, version):
+        """
+        Add the rollup deltas of a committed transaction that moved the shop from sales version `base` to `version`.
+        A series that missed an intermediate write is dropped and rebuilt on its next read.
+        """
+        with self._lock:
+            series = self._series.get(shop)
+            if series is None:
+                return
+            if series.version != base:
+                del self._series[shop]
+                return
+            series.roll(self.clock())
+            for product_id, day, quantity in rows:
+                series.add(product_id, day, quantity)
+            series.version = version
+
+
+def stage_sales(connection, totals, versions):
+    """
+    Hold the rollup deltas written in the connection's transaction until it commits (see record_sales). Only shops
+    with a series in this process are kept, so bulk loads stage nothing.
+    Args:
+        connection: SQLAlchemy connection of the write
+        totals: {(shop, product_id, date): quantity}
+        versions: {shop: sales version} the write moved each shop to
+    """
+    store = _stores.get(connection.engine)
+    if store is None:
+        return
+    shops = store.loaded(versions)
+    if not shops:
+        return
+    pending = connection.info.setdefault("sales_series_pending", {})
+    for shop in shops:
+        # [version before the transaction, version after it, deltas]; a later write in the transaction extends it
+        pending.setdefault(shop, [versions[shop] - 1, None, []])[1] = versions[shop]
+    for (shop, product_id, day), quantity in totals.items():
+        if shop in shops:
+            pending[shop][2].append((product_id, day, quantity))
+
+
+def _apply_on_commit(connection):
+    pending = connection.info.pop("sales_series_pending", None)
+    store = _stores.get(connection.engine)
+    if not pending or store is None:
+        return
+    for shop, (base, version, rows) in pending.items():
+        store.apply(shop, rows, base, version)
+
+
+def _discard_on_rollback(connection):
+    connection.info.pop("sales_series_pending", None)
+
+
+def init_timeseries(app):
+    """Create the in-memory sales series store configured by TIMESERIES_* settings and attach it to the app."""
+    store = SalesSeriesStore(app.config["TIMESERIES_DAYS"], app.config["TIMESERIES_MAX_SHOPS"])
+    with app.app_context():
+        engine = db.engine  # Creating the engine opens no connection
+    _stores[engine] = store
+    if not event.contains(engine, "commit", _apply_on_commit):
+        event.listen(engine, "commit", _apply_on_commit)
+        event.listen(engine, "rollback", _discard_on_rollback)
+    app.extensions["sales_series"] = store
+    return store
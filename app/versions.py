@@ -0,0 +1,140 @@
+# app/versions.py
+from sqlalchemy import event, inspect, literal, select, true, union
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from .engines import read_session
+from .models import db, Product, Variant, InventoryItem, InventoryLevel, ShopCredential, ShopDataVersion
+
+INVENTORY_MODELS = (Product, Variant, InventoryItem, InventoryLevel)
+
+
+def get_data_version(shop):
+    """Return the current data version of a shop (0 if nothing has been written for it yet)."""
+    return read_session().execute(
+        select(ShopDataVersion.version).where(ShopDataVersion.shop == shop)
+    ).scalar() or 0
+
+
+def bump_data_version(connection, shops=None):
+    """
+    Invalidate cached results by incrementing data versions.
+    Args:
+        connection: SQLAlchemy connection (or session) to write through, inside the caller's transaction
+        shops: Iterable of shop domains; None bumps every known shop (changes to the shared catalog)
+    """
+    _bump(connection, ShopDataVersion.version, shops)
+
+
+def get_history_version(shop):
+    """Return the version of a shop's sales before today, or None if nothing has been written for it yet."""
+    return read_session().execute(
+        select(ShopDataVersion.history_version).where(ShopDataVersion.shop == shop)
+    ).scalar()
+
+
+def bump_history_version(connection, shops=None):
+    """
+    Invalidate order history snapshots (app/history.py) after sales of a past day changed.
+    Args:
+        connection: SQLAlchemy connection (or session) to write through, inside the caller's transaction
+        shops: Iterable of shop domains; None bumps every known shop
+    """
+    _bump(connection, ShopDataVersion.history_version, shops)
+
+
+def get_sales_version(shop):
+    """Return the version of a shop's sales rollup (0 if nothing has been written for it yet)."""
+    return read_session().execute(
+        select(ShopDataVersion.sales_version).where(ShopDataVersion.shop == shop)
+    ).scalar() or 0
+
+
+def bump_sales_version(connection, shops=None):
+    """
+    Mark a shop's daily_product_sales rows as changed, for the in-memory sales series (app/timeseries.py).
+    Args:
+        connection: SQLAlchemy connection (or session) to write through, inside the caller's transaction
+        shops: Iterable of shop domains; None bumps every known shop
+    Returns:
+        dict: {shop: new sales version} of the given shops (empty for None)
+    """
+    return _bump(connection, ShopDataVersion.sales_version, shops)
+
+
+VERSION_COLUMNS = ("version", "history_version", "sales_version")
+
+
+def _bump(connection, column, shops):
+    first = dict(dict.fromkeys(VERSION_COLUMNS, 0), **{column.key: 1})  # A shop's row starts out already bumped
+    if shops is None:
+        # Upsert rather than update, so installed shops and catalog owners nothing has bumped yet get a row too
+        known = union(
+            select(ShopDataVersion.shop),
+            select(ShopCredential.shop),
+            select(Product.shop).where(Product.shop.is_not(None)),
+        ).subquery()
+        rows = select(known.c.shop, *(literal(first[name]) for name in VERSION_COLUMNS))
+        # SQLite reads ON CONFLICT after a bare INSERT ... SELECT as a join constraint
+        stmt = insert(ShopDataVersion).from_select(["shop", *VERSION_COLUMNS], rows.where(true()))
+        stmt = stmt.on_conflict_do_update(index_elements=[ShopDataVersion.shop], set_={column.key: column + 1})
+        connection.execute(stmt)
+        return {}
+    shops = set(shops)
+    if not shops:
+        return {}
+    stmt = insert(ShopDataVersion)
+    stmt = stmt.on_conflict_do_update(index_elements=[ShopDataVersion.shop], set_={column.key: column + 1})
+    rows = connection.execute(
+        stmt.returning(ShopDataVersion.shop, column), [dict(first, shop=shop) for shop in shops]
+    ).all()
+    return dict(rows)
+
+
+def owning_shops(connection, product_ids=(), variant_ids=(), item_ids=()):
+    """
+    Shops owning the given catalog rows, following inventory items to their variant and variants to their
+    product. Rows that no longer exist are skipped.
+    Returns:
+        set: Shop domains, or None if any of the products is in the shared catalog (Product.shop IS NULL)
+    """
+    product_ids, variant_ids = set(product_ids), set(variant_ids)
+    if item_ids:
+        variant_ids.update(connection.execute(
+            select(InventoryItem.variant_id).where(InventoryItem.id.in_(set(item_ids)))
+        ).scalars())
+    if variant_ids:
+        product_ids.update(connection.execute(
+            select(Variant.product_id).where(Variant.id.in_(variant_ids))
+        ).scalars())
+    if not product_ids:
+        return set()
+    shops = set(connection.execute(select(Product.shop).where(Product.id.in_(product_ids))).scalars())
+    return None if None in shops else shops
+
+
+def _bump_after_inventory_flush(session, flush_context):
+    # Each written row invalidates its owning shop; the shared catalog belongs to every shop
+    shops, products, variants, items = set(), set(), set(), set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Product):
+            owners = {obj.shop, *inspect(obj).attrs.shop.history.deleted}  # Before and after a move
+            if None in owners:
+                bump_data_version(session.connection())
+                return
+            shops.update(owners)
+        elif isinstance(obj, Variant):
+            products.add(obj.product_id)
+        elif isinstance(obj, InventoryItem):
+            variants.add(obj.variant_id)
+        elif isinstance(obj, InventoryLevel):
+            items.add(obj.inventory_item_id)
+    if not (shops or products or variants or items):
+        return
+    owners = owning_shops(session.connection(), products, variants, items)
+    bump_data_version(session.connection(), None if owners is None else shops | owners)
+
+
+def install_version_hooks():
+    """Bump the owning shop's data version whenever an ORM flush writes catalog or inventory rows."""
+    if not event.contains(Session, "after_flush", _bump_after_inventory_flush):
+        event.listen(Session, "after_flush", _bump_after_inventory_flush)
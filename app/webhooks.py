@@ -0,0 +1,191 @@
+# app/webhooks.py
+import base64
+import hashlib
+import hmac
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+from .instrumentation import WEBHOOK_BATCH_SIZE, WEBHOOK_EVENTS
+from .models import db
+from .sync import normalize_order, updated_at_utc, upsert_orders
+from .versions import bump_data_version, owning_shops
+
+logger = logging.getLogger(__name__)
+
+ORDER_TOPICS = ("orders/create", "orders/updated")
+INVENTORY_TOPIC = "inventory_levels/update"
+TOPICS = ORDER_TOPICS + (INVENTORY_TOPIC,)
+
+WebhookDelivery = namedtuple("WebhookDelivery", ["id", "topic", "shop", "payload"])
+
+
+def verify_webhook(body, signature, secret):
+    """Check the X-Shopify-Hmac-Sha256 header: base64 HMAC-SHA256 of the raw body keyed with the app secret."""
+    if not signature or not secret:
+        return False
+    digest = base64.b64encode(hmac.new(secret.encode(), body, hashlib.sha256).digest()).decode()
+    return hmac.compare_digest(digest, signature)
+
+
+def _set_inventory_levels(connection, levels):
+    """
+    Write the latest `available` per (inventory_item_id, location_id). Returns the number of levels written.
+    """
+    written = 0
+    for (inventory_item_id, location_id), available in levels.items():
+        updated = connection.exec_driver_sql(
+            "UPDATE inventory_levels SET available = ?, updated_at = ? WHERE inventory_item_id = ? AND location_id = ?",
+            (available, datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f"), inventory_item_id, location_id)
+        ).rowcount
+        if not updated:
+            # Only track levels of inventory items we know, i.e. of catalog products
+            updated = connection.exec_driver_sql(
+                "INSERT INTO inventory_levels (inventory_item_id, location_id, available, updated_at) "
+                "SELECT id, ?, ?, ? FROM inventory_items WHERE id = ?",
+                (location_id, available, datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f"), inventory_item_id)
+            ).rowcount
+        written += updated
+    return written
+
+
+def write_deliveries(connection, deliveries):
+    """
+    Apply a batch of webhook deliveries in the caller's transaction. Order payloads are upserted through
+    app.sync, newest updated_at (compared in UTC) last and never over a newer stored update; inventory updates
+    are coalesced to the newest level per item and location.
+    """
+    orders = {}
+    levels = {}
+    for delivery in sorted(deliveries, key=lambda d: updated_at_utc(d.payload.get("updated_at"))):
+        if delivery.topic in ORDER_TOPICS:
+            orders.setdefault(delivery.shop, []).append(normalize_order(delivery.payload))
+        elif delivery.topic == INVENTORY_TOPIC:
+            payload = delivery.payload
+            levels[(str(payload["inventory_item_id"]), str(payload["location_id"]))] = int(payload["available"] or 0)
+    for shop, shop_orders in orders.items():
+        upsert_orders(connection, shop, shop_orders)
+    if levels and _set_inventory_levels(connection, levels):
+        # Levels of the shared catalog (products without a shop) invalidate every shop
+        bump_data_version(connection, owning_shops(connection, item_ids={item for item, _ in levels}))
+
+
+class WebhookWriter:
+    """
+    Queue webhook deliveries in memory and write them from one background thread, coalescing up to
+    `batch_size` deliveries or `flush_interval` seconds worth into a single transaction. Deliveries whose
+    webhook ID was already written (Shopify retries) are dropped. The seen IDs live in this process only, so
+    a retry served by another gunicorn worker is written again; that is harmless, since order upserts skip
+    updates older than the stored order and inventory levels are absolute.
+    """
+
+    def __init__(self, app, batch_size=500, flush_interval=0.2, max_queue=10000, remember=100000):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.remember = remember
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._seen = OrderedDict()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.batches = 0
+
+    def submit(self, delivery):
+        """Queue a delivery; returns False when the queue is full so the caller can ask Shopify to retry."""
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(delivery)
+        except queue.Full:
+            WEBHOOK_EVENTS.inc(topic=delivery.topic, outcome="rejected")
+            return False
+        return True
+
+    def flush(self):
+        """Block until every queued delivery has been written (tests and shutdown)."""
+        self._queue.join()
+
+    def _ensure_thread(self):
+        # Started lazily, so every gunicorn worker forked after create_app gets its own writer
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="webhook-writer", daemon=True)
+                self._thread.start()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self._write(batch)
+            except Exception:
+                logger.error("Webhook writer failed on a batch of %d deliveries", len(batch), exc_info=True)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch):
+        unique = OrderedDict()
+        for delivery in batch:
+            if delivery.id in self._seen or delivery.id in unique:
+                WEBHOOK_EVENTS.inc(topic=delivery.topic, outcome="duplicate")
+                continue
+            unique[delivery.id] = delivery
+        if not unique:
+            return
+
+        with self.app.app_context():
+            try:
+                with db.engine.begin() as connection:
+                    write_deliveries(connection, list(unique.values()))
+                written = list(unique.values())
+            except Exception:
+                # Isolate the poison delivery: retry one transaction per delivery
+                logger.warning("Batched webhook write failed, retrying %d deliveries one by one", len(unique),
+                               exc_info=True)
+                written = []
+                for delivery in unique.values():
+                    try:
+                        with db.engine.begin() as connection:
+                            write_deliveries(connection, [delivery])
+                        written.append(delivery)
+                    except Exception:
+                        WEBHOOK_EVENTS.inc(topic=delivery.topic, outcome="failed")
+                        logger.error("Dropping webhook %s (%s) for %s", delivery.id, delivery.topic, delivery.shop,
+                                     exc_info=True)
+
+        self.batches += 1
+        WEBHOOK_BATCH_SIZE.observe(len(written))
+        for delivery in written:
+            WEBHOOK_EVENTS.inc(topic=delivery.topic, outcome="written")
+            self._seen[delivery.id] = None
+        while len(self._seen) > self.remember:
+            self._seen.popitem(last=False)
+        logger.debug("Wrote %d webhook deliveries in one batch", len(written))
+
+
+def init_webhooks(app):
+    """Create the background webhook writer configured by WEBHOOK_* settings and attach it to the app."""
+    app.extensions["webhook_writer"] = WebhookWriter(
+        app,
+        batch_size=app.config["WEBHOOK_BATCH_SIZE"],
+        flush_interval=app.config["WEBHOOK_FLUSH_INTERVAL_MS"] / 1000,
+        max_queue=app.config["WEBHOOK_QUEUE_SIZE"],
+    )
+    return app.extensions["webhook_writer"]
@@ -0,0 +1,242 @@
+# benchmarks/bench_dashboard.py
+"""
+Benchmark the dashboard hot paths at several dataset scales.
+
+Each scale gets its own generated SQLite database under benchmarks/data/ (reused between runs).
+For every function in app/dashboard.py, the /dashboard shell and the four JSON API sections (cold,
+cached and revalidated with If-None-Match) through the Flask test client, the suite records wall
+time, SQL query count, rows fetched and peak Python memory, and writes everything to a JSON file
+that --compare can diff against a previous run.
+
+    python benchmarks/bench_dashboard.py --scales 1k,100k --output bench.json
+    python benchmarks/bench_dashboard.py --output new.json --compare bench.json
+"""
+import os
+import sys
+import argparse
+import json
+import logging
+import platform
+import sqlite3
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+# Add the project root to the sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app import create_app
+from app.database import create_schema
+from app.datagen import generate_dataset
+from app.instrumentation import collect_stats
+from app.models import db, Product
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# name -> generate_dataset arguments
+SCALES = {
+    "1k": {"orders": 1_000, "skus": 200},
+    "100k": {"orders": 100_000, "skus": 5_000},
+    "1m": {"orders": 1_000_000, "skus": 20_000},
+}
+DATASET_DEFAULTS = {"shops": 1, "line_items_per_order": 3, "days": 90, "seasonality": 0.3, "seed": 42, "prefix": "bench"}
+
+
+def build_database(scale, rebuild=False):
+    """Create (or reuse) the database of a scale and return the app bound to it and the shop name."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f"dashboard_{scale}.db")
+    meta_path = f"{path}.json"
+    params = dict(DATASET_DEFAULTS, **SCALES[scale])
+    meta = json.load(open(meta_path)) if os.path.exists(meta_path) else {}
+    # Databases from before "boot_mode" was recorded also hold the mock data development boots seed
+    if rebuild or meta.get("params") != params or meta.get("boot_mode") != "production":
+        for stale in (path, meta_path):
+            if os.path.exists(stale):
+                os.remove(stale)
+
+    # No mock data and no background scheduler competing with the timed sections
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}", "BOOT_MODE": "production", "FORECAST_SCHEDULER": False
+    })
+    app.logger.setLevel(logging.WARNING)
+    create_schema(app)
+    if not os.path.exists(meta_path):
+        with app.app_context():
+            print(f"Generating {scale} dataset ...", file=sys.stderr)
+            result = generate_dataset(**params)
+        with open(meta_path, "w") as f:
+            json.dump({"params": params, "boot_mode": "production", "line_items": result["line_items"]}, f)
+    return app, f"{params['prefix']}-shop-1.myshopify.com"
+
+
+def measure(fn, repeats):
+    """
+    Run fn() `repeats` times for wall time, then once more under tracemalloc (which slows allocation-heavy
+    code down) for peak memory. Queries and rows are those of a single run.
+    """
+    fn()  # Warm-up: imports, statement caches, SQLite page cache
+    timings = []
+    for _ in range(repeats):
+        with collect_stats() as stats:
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+    queries, rows = stats.queries, stats.rows
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "wall_ms_median": round(statistics.median(timings) * 1000, 3),
+        "wall_ms_min": round(min(timings) * 1000, 3),
+        "queries": queries,
+        "rows": rows,
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def benchmarks(app, shop):
+    """name -> zero-argument callable, each run inside an app context."""
+    from app.dashboard import (DashboardSnapshot, calculate_avg_daily_sales, get_orders_data, get_inventory_data,
+                               get_location_summary, get_low_stock_alerts, get_stock_predictions)
+
+    with app.app_context():
+        product = db.session.query(Product).filter(Product.id.like("bench_prod_%")).first()
+    client = app.test_client()
+    cache = app.extensions["dashboard_cache"]
+
+    def in_context(fn):
+        def run():
+            with app.app_context():
+                fn()
+        return run
+
+    def snapshot():
+        sections = DashboardSnapshot(shop)
+        sections.orders_data()
+        sections.inventory_data()
+        sections.low_stock_alerts()
+        sections.stock_predictions()
+
+    sections = [f"/api/v1/shops/{shop}/{section}" for section in ("sales", "inventory", "alerts", "predictions")]
+    etags = {}
+
+    def api(cold=False, revalidate=False):
+        def run():
+            if cold:
+                cache.backend.clear()
+            for url in sections:
+                headers = {"Accept-Encoding": "gzip"}
+                if revalidate and url in etags:
+                    headers["If-None-Match"] = etags[url]
+                response = client.get(url, headers=headers)
+                assert response.status_code in (200, 304), response.status_code
+                etags[url] = response.headers["ETag"]
+        return run
+
+    def render():
+        assert client.get(f"/dashboard?shop={shop}").status_code == 200
+
+    return {
+        "calculate_avg_daily_sales": in_context(lambda: calculate_avg_daily_sales(product, shop)),
+        "sales_series_velocities": in_context(lambda: app.extensions["sales_series"].velocities(shop, 30)),
+        "get_orders_data": in_context(lambda: get_orders_data(shop)),
+        "get_inventory_data": in_context(lambda: get_inventory_data(shop)),
+        "get_low_stock_alerts": in_context(lambda: get_low_stock_alerts(shop)),
+        "get_stock_predictions": in_context(lambda: get_stock_predictions(shop)),
+        "get_location_summary": in_context(lambda: get_location_summary(shop)),
+        "replenishment_grid": in_context(lambda: DashboardSnapshot(shop).replenishment_grid(
+            list(range(1, 31, 3)), [0.5, 0.8, 0.85, 0.9, 0.925, 0.95, 0.975, 0.99, 0.995, 0.999]
+        )),
+        "dashboard_snapshot": in_context(snapshot),
+        "dashboard_shell": render,
+        "api_sections_cold": api(cold=True),
+        "api_sections_cached": api(),
+        "api_sections_304": api(revalidate=True),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print per-benchmark deltas against a previous run; return the regressions beyond `threshold`."""
+    regressions = []
+    for scale, benches in results["results"].items():
+        for name, current in benches.items():
+            previous = baseline.get("results", {}).get(scale, {}).get(name)
+            if not previous:
+                continue
+            ratio = current["wall_ms_median"] / previous["wall_ms_median"] if previous["wall_ms_median"] else 1
+            flag = ""
+            if ratio > 1 + threshold or current["queries"] > previous["queries"]:
+                flag = "  REGRESSION"
+                regressions.append(f"{scale}/{name}")
+            print(
+                f"{scale:>5} {name:<28} {previous['wall_ms_median']:>10.2f} -> {current['wall_ms_median']:>10.2f} ms "
+                f"({ratio - 1:+.0%})  queries {previous['queries']} -> {current['queries']}{flag}"
+            )
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard hot paths.")
+    parser.add_argument("--scales", default=",".join(SCALES), help=f"Comma-separated subset of {', '.join(SCALES)}")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed runs per benchmark (default: 5)")
+    parser.add_argument("--only", help="Comma-separated benchmark names to run")
+    parser.add_argument("--output", default="bench_output.json", help="JSON results file (default: bench_output.json)")
+    parser.add_argument("--compare", help="Previous JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown before flagging (default: 0.2)")
+    parser.add_argument("--rebuild", action="store_true", help="Regenerate the datasets")
+    args = parser.parse_args()
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "repeats": args.repeats,
+        },
+        "results": {},
+    }
+    only = set(args.only.split(",")) if args.only else None
+    for scale in args.scales.split(","):
+        app, shop = build_database(scale, args.rebuild)
+        with app.app_context():
+            app.extensions["shop_credentials"].save(shop, "benchmark")
+        results["results"][scale] = {}
+        for name, fn in benchmarks(app, shop).items():
+            if only and name not in only:
+                continue
+            result = measure(fn, args.repeats)
+            results["results"][scale][name] = result
+            print(
+                f"{scale:>5} {name:<28} {result['wall_ms_median']:>10.2f} ms  {result['queries']:>6} queries  "
+                f"{result['rows']:>9} rows  {result['peak_kib']:>10.1f} KiB peak"
+            )
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"Regressions: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
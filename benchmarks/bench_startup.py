@@ -0,0 +1,102 @@
+# benchmarks/bench_startup.py
+"""
+Benchmark worker boot and the first request a fresh worker serves, per BOOT_MODE.
+
+Every run is a new Python process (as a freshly scaled-out gunicorn worker would be), timing the import of the
+app package, create_app() and the first GET of each JSON API section, plus the queries create_app() issued.
+
+    python benchmarks/bench_startup.py --runs 10 --output startup.json
+"""
+import os
+import sys
+import argparse
+import json
+import statistics
+import subprocess
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Runs inside the child process; prints one JSON line of timings in ms
+CHILD = r"""
+import json, logging, sys, time
+started = time.perf_counter()
+import app as package
+imported = time.perf_counter()
+from app.instrumentation import collect_stats
+with collect_stats() as stats:
+    flask_app = package.create_app({"BOOT_MODE": sys.argv[1], "SQLALCHEMY_DATABASE_URI": sys.argv[2]})
+booted = time.perf_counter()
+logging.disable(logging.INFO)
+with flask_app.app_context():
+    flask_app.extensions["shop_credentials"].save(sys.argv[3], "benchmark")
+client = flask_app.test_client()
+first = {}
+for section in ("sales", "inventory", "alerts", "predictions"):
+    request_started = time.perf_counter()
+    assert client.get(f"/api/v1/shops/{sys.argv[3]}/{section}").status_code == 200
+    first[section] = (time.perf_counter() - request_started) * 1000
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "create_app_ms": (booted - imported) * 1000,
+    "boot_queries": stats.queries,
+    "first_request_ms": first,
+    "shopify_imported": "shopify" in sys.modules,
+}))
+"""
+
+
+def run_child(mode, uri, shop):
+    env = dict(os.environ, FORECAST_SCHEDULER="False")
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, mode, uri, shop], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(runs):
+    median = lambda values: round(statistics.median(values), 2)
+    return {
+        "import_ms": median([run["import_ms"] for run in runs]),
+        "create_app_ms": median([run["create_app_ms"] for run in runs]),
+        "boot_ms": median([run["import_ms"] + run["create_app_ms"] for run in runs]),
+        "boot_queries": max(run["boot_queries"] for run in runs),
+        "first_request_ms": {
+            section: median([run["first_request_ms"][section] for run in runs]) for section in runs[0]["first_request_ms"]
+        },
+        "shopify_imported": any(run["shopify_imported"] for run in runs),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark worker startup and cold-request latency.")
+    parser.add_argument("--database", default=os.path.join(ROOT, "benchmarks", "data", "dashboard_1k.db"),
+                        help="SQLite database, initialized beforehand (default: the 1k benchmark dataset)")
+    parser.add_argument("--shop", default="bench-shop-1.myshopify.com")
+    parser.add_argument("--modes", default="development,production", help="Comma-separated BOOT_MODE values")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per mode (default: 5)")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.database):
+        sys.exit(f"{args.database} does not exist; run benchmarks/bench_dashboard.py --scales 1k first")
+    uri = f"sqlite:///{os.path.abspath(args.database)}"
+    results = {"meta": {"timestamp": datetime.now().isoformat(timespec="seconds"), "runs": args.runs}, "results": {}}
+    for mode in args.modes.split(","):
+        result = summarize([run_child(mode, uri, args.shop) for _ in range(args.runs)])
+        results["results"][mode] = result
+        first = "  ".join(f"{section} {ms:.1f}" for section, ms in result["first_request_ms"].items())
+        print(
+            f"{mode:<12} import {result['import_ms']:>7.1f} ms  create_app {result['create_app_ms']:>7.1f} ms  "
+            f"{result['boot_queries']:>3} boot queries  first requests (ms): {first}"
+            f"{'  [shopify imported]' if result['shopify_imported'] else ''}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# benchmarks/fake_shopify.py
+"""
+Local stand-in for the Shopify endpoints the app calls, for load tests: the OAuth authorize redirect and token
+exchange, and an empty Admin API orders.json. Point the app at it with SHOPIFY_BASE_URL (and sync clients with
+their base_url). `latency` delays every response to mimic the round trip to Shopify.
+"""
+import json
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+SCOPES = "read_orders,read_products,read_inventory"
+
+
+class FakeShopify:
+    """
+    Serves on 127.0.0.1 from a background thread while used as a context manager. Issued tokens are kept in
+    `tokens` (code -> access token); a code is exchanged once, like Shopify's.
+    """
+
+    def __init__(self, latency=0.0, port=0):
+        self.latency = latency
+        self.tokens = {}
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                fake._handle(self, "GET")
+
+            def do_POST(self):
+                fake._handle(self, "POST")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, name="fake-shopify", daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handle(self, handler, method):
+        if self.latency:
+            time.sleep(self.latency)
+        url = urlparse(handler.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+
+        if method == "GET" and url.path == "/admin/oauth/authorize":
+            # Approve right away and send the merchant back with a one-time code
+            code = secrets.token_hex(8)
+            location = f"{params['redirect_uri']}?{urlencode({'shop': params.get('shop', ''), 'code': code})}"
+            handler.send_response(302)
+            handler.send_header("Location", location)
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+
+        if method == "POST" and url.path == "/admin/oauth/access_token":
+            length = int(handler.headers.get("Content-Length", 0))
+            form = {key: values[0] for key, values in parse_qs(handler.rfile.read(length).decode()).items()}
+            with self._lock:
+                if not form.get("code") or form["code"] in self.tokens:
+                    self._send_json(handler, 400, {"error": "invalid_request", "error_description": "Bad code"})
+                    return
+                token = self.tokens[form["code"]] = f"shpat_{secrets.token_hex(16)}"
+            self._send_json(handler, 200, {"access_token": token, "scope": SCOPES})
+            return
+
+        if method == "GET" and url.path.endswith("/orders.json"):
+            self._send_json(handler, 200, {"orders": []})
+            return
+
+        handler.send_error(404)
+
+    @staticmethod
+    def _send_json(handler, status, body):
+        data = json.dumps(body).encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
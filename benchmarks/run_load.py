@@ -0,0 +1,304 @@
+# benchmarks/run_load.py
+"""
+Load-test the full request path: the app runs under gunicorn against a generated multi-shop database, with
+OAuth pointed at a local Shopify stand-in (benchmarks/fake_shopify.py). Every shop is installed through the
+authorize redirect and token exchange first; then `--concurrency` clients send a weighted mix of dashboard and
+JSON API requests to random shops for `--duration` seconds. Throughput and p50/p95/p99 latency per route are
+printed and written to a JSON file that --compare can diff against a previous run.
+
+    python benchmarks/run_load.py --shops 20 --workers 4 --concurrency 32 --output load.json
+    python benchmarks/run_load.py --mix dashboard=1,alerts=4 --output new.json --compare load.json
+"""
+import os
+import sys
+import argparse
+import json
+import logging
+import math
+import random
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+# Add the project root to the sys.path
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+import requests
+from app import create_app
+from app.database import create_schema
+from app.datagen import DEFAULT_SHOP_TEMPLATE, generate_dataset
+from bench_dashboard import DATA_DIR, git_revision
+from fake_shopify import FakeShopify
+
+ROUTES = {
+    "dashboard": "/dashboard?shop={shop}",
+    "sales": "/api/v1/shops/{shop}/sales",
+    "inventory": "/api/v1/shops/{shop}/inventory",
+    "alerts": "/api/v1/shops/{shop}/alerts",
+    "predictions": "/api/v1/shops/{shop}/predictions",
+    "locations": "/api/v1/shops/{shop}/locations",
+    "replenishment": "/api/v1/shops/{shop}/replenishment",
+}
+DEFAULT_MIX = "dashboard=1,sales=2,inventory=2,alerts=2,predictions=2,locations=1"
+
+
+def parse_mix(mix):
+    """'route=weight,...' -> {route: weight}"""
+    weights = {}
+    for part in mix.split(","):
+        route, _, weight = part.partition("=")
+        if route not in ROUTES:
+            raise argparse.ArgumentTypeError(f"Unknown route {route!r}; choose from {', '.join(ROUTES)}")
+        weights[route] = float(weight or 1)
+    return weights
+
+
+def build_database(shops, orders, skus, rebuild=False):
+    """Create (or reuse) the load-test database and return its path and shop names."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    params = {"shops": shops, "orders": orders, "skus": skus, "locations": 2, "seed": 7, "prefix": "load"}
+    path = os.path.join(DATA_DIR, f"load_{shops}x{orders}.db")
+    meta_path = f"{path}.json"
+    meta = json.load(open(meta_path)) if os.path.exists(meta_path) else {}
+    # Databases from before "boot_mode" was recorded also hold the mock data development boots seed
+    if rebuild or meta.get("params") != params or meta.get("boot_mode") != "production":
+        for stale in (path, meta_path):
+            if os.path.exists(stale):
+                os.remove(stale)
+    if not os.path.exists(meta_path):
+        app = create_app({
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}", "BOOT_MODE": "production", "FORECAST_SCHEDULER": False
+        })
+        app.logger.setLevel(logging.WARNING)
+        create_schema(app)
+        with app.app_context():
+            print(f"Generating {shops} shops x {orders} orders ...", file=sys.stderr)
+            generate_dataset(**params)
+        with open(meta_path, "w") as f:
+            json.dump({"params": params, "boot_mode": "production"}, f)
+    return path, [DEFAULT_SHOP_TEMPLATE.format(prefix="load", index=i + 1) for i in range(shops)]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(database, shopify_url, workers, threads, scheduler, log_dir):
+    """Start gunicorn on a free port in production boot mode and wait until it answers."""
+    port = free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{database}",
+        BOOT_MODE="production",
+        SHOPIFY_BASE_URL=shopify_url,
+        FORECAST_SCHEDULER=str(scheduler),
+        FORECAST_LOCK_PATH=os.path.join(log_dir, "forecast_scheduler.lock"),
+    )
+    log = open(os.path.join(log_dir, "gunicorn.log"), "w")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--workers", str(workers), "--threads", str(threads),
+         "--bind", f"127.0.0.1:{port}", "--log-level", "warning", "application:application"],
+        cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with {process.returncode}, see {log.name}")
+        try:
+            requests.get(f"{url}/metrics", timeout=5)
+            return process, url
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"gunicorn did not start within 60s, see {log.name}")
+
+
+def install_shops(app_url, shopify_url, shops):
+    """Install every shop the way a merchant would: authorize redirect, then the app's OAuth callback."""
+    with requests.Session() as session:
+        for shop in shops:
+            authorize = session.get(f"{shopify_url}/admin/oauth/authorize", allow_redirects=False, params={
+                "shop": shop, "redirect_uri": f"{app_url}/auth/callback"
+            })
+            callback = session.get(authorize.headers["Location"], allow_redirects=False)
+            if callback.status_code != 302 or "/dashboard" not in callback.headers.get("Location", ""):
+                raise RuntimeError(f"Installing {shop} failed: {callback.status_code} {callback.text[:200]}")
+
+
+def drive(app_url, shops, mix, concurrency, duration, warmup, revalidate, seed):
+    """
+    Run `concurrency` client threads for warmup + duration seconds.
+    Returns:
+        dict: route -> list of (latency seconds, status) of requests started after the warm-up
+    """
+    routes, weights = list(mix), list(mix.values())
+    samples = {route: [] for route in routes}
+    lock = threading.Lock()
+    started = time.monotonic()
+    measure_from, stop_at = started + warmup, started + warmup + duration
+
+    def client(index):
+        rng = random.Random(seed + index)
+        etags = {}
+        local = {route: [] for route in routes}
+        with requests.Session() as session:
+            while True:
+                now = time.monotonic()
+                if now >= stop_at:
+                    break
+                route = rng.choices(routes, weights)[0]
+                url = app_url + ROUTES[route].format(shop=rng.choice(shops))
+                headers = {"If-None-Match": etags[url]} if revalidate and url in etags else {}
+                request_started = time.perf_counter()
+                try:
+                    response = session.get(url, headers=headers, allow_redirects=False, timeout=60)
+                    status = response.status_code
+                    if "ETag" in response.headers:
+                        etags[url] = response.headers["ETag"]
+                except requests.RequestException:
+                    status = None
+                if now >= measure_from:
+                    local[route].append((time.perf_counter() - request_started, status))
+        with lock:
+            for route, values in local.items():
+                samples[route].extend(values)
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list."""
+    return sorted_values[max(math.ceil(p / 100 * len(sorted_values)) - 1, 0)]
+
+
+def summarize(samples, duration):
+    """Per-route and overall request counts, errors, throughput and latency percentiles in ms."""
+    report = {}
+    everything = []
+    for route, values in list(samples.items()) + [("all", None)]:
+        values = everything if values is None else values
+        if route != "all":
+            everything.extend(values)
+        if not values:
+            continue
+        latencies = sorted(latency * 1000 for latency, _ in values)
+        report[route] = {
+            "requests": len(values),
+            "errors": sum(1 for _, status in values if status is None or status >= 400),
+            "rps": round(len(values) / duration, 1),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "max_ms": round(latencies[-1], 2),
+        }
+    return report
+
+
+def compare(report, baseline, threshold):
+    """Print per-route p95 deltas against a previous run; return the routes that regressed beyond `threshold`."""
+    regressions = []
+    for route, current in report.items():
+        previous = baseline.get("routes", {}).get(route)
+        if not previous:
+            continue
+        ratio = current["p95_ms"] / previous["p95_ms"] if previous["p95_ms"] else 1
+        flag = ""
+        if ratio > 1 + threshold or (current["errors"] and not previous["errors"]):
+            flag = "  REGRESSION"
+            regressions.append(route)
+        print(
+            f"{route:<14} p95 {previous['p95_ms']:>9.2f} -> {current['p95_ms']:>9.2f} ms ({ratio - 1:+.0%})  "
+            f"rps {previous['rps']:>8.1f} -> {current['rps']:>8.1f}  errors {previous['errors']} -> {current['errors']}{flag}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the app under gunicorn against a fake Shopify.")
+    parser.add_argument("--shops", type=int, default=10, help="Shops to generate and install (default: 10)")
+    parser.add_argument("--orders", type=int, default=5000, help="Orders per shop (default: 5000)")
+    parser.add_argument("--skus", type=int, default=2000, help="Products in the shared catalog (default: 2000)")
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn worker processes (default: 4)")
+    parser.add_argument("--threads", type=int, default=4, help="Threads per gunicorn worker (default: 4)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients (default: 16)")
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds (default: 30)")
+    parser.add_argument("--warmup", type=float, default=5, help="Unmeasured seconds first (default: 5)")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help=f"Weighted routes, from {', '.join(ROUTES)} (default: {DEFAULT_MIX})")
+    parser.add_argument("--revalidate", action="store_true", help="Send If-None-Match like a polling dashboard")
+    parser.add_argument("--scheduler", action="store_true", help="Run the background forecast scheduler")
+    parser.add_argument("--shopify-latency-ms", type=float, default=0, help="Delay of every fake Shopify response")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the request sequence")
+    parser.add_argument("--output", default="load_output.json", help="JSON results file (default: load_output.json)")
+    parser.add_argument("--compare", help="Previous JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed p95 slowdown before flagging (default: 0.2)")
+    parser.add_argument("--rebuild", action="store_true", help="Regenerate the database")
+    args = parser.parse_args()
+    mix = args.mix
+
+    database, shops = build_database(args.shops, args.orders, args.skus, args.rebuild)
+    log_dir = tempfile.mkdtemp(prefix="run_load_")
+    with FakeShopify(latency=args.shopify_latency_ms / 1000) as shopify:
+        process, app_url = start_gunicorn(database, shopify.url, args.workers, args.threads, args.scheduler, log_dir)
+        try:
+            install_shops(app_url, shopify.url, shops)
+            print(f"Installed {len(shops)} shops; {args.concurrency} clients for {args.duration:g}s "
+                  f"against {args.workers} workers x {args.threads} threads", file=sys.stderr)
+            samples = drive(app_url, shops, mix, args.concurrency, args.duration, args.warmup, args.revalidate,
+                            args.seed)
+        finally:
+            process.terminate()
+            process.wait(30)
+
+    report = summarize(samples, args.duration)
+    print(f"{'route':<14} {'requests':>9} {'errors':>7} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for route, row in report.items():
+        print(f"{route:<14} {row['requests']:>9} {row['errors']:>7} {row['rps']:>8.1f} {row['p50_ms']:>9.2f} "
+              f"{row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['max_ms']:>9.2f}")
+
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "shops": args.shops,
+            "orders_per_shop": args.orders,
+            "skus": args.skus,
+            "workers": args.workers,
+            "threads": args.threads,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "mix": mix,
+            "revalidate": args.revalidate,
+            "scheduler": args.scheduler,
+            "gunicorn_log": os.path.join(log_dir, "gunicorn.log"),
+        },
+        "routes": report,
+    }
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"Regressions: {', '.join(regressions)}")
+            sys.exit(1)
+    if report.get("all", {}).get("errors"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# scripts/explain_queries.py
+import os
+import sys
+import argparse
+from sqlalchemy import event
+
+# Add the project root to the sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app import create_app
+from app.models import db
+from app.aggregates import get_sales_velocities
+from app.dashboard import DashboardSnapshot
+
+def main():
+    """Print the EXPLAIN QUERY PLAN of every query a dashboard render issues."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--shop", default="quickstart-c21ead54.myshopify.com")
+    parser.add_argument("--window", type=int, default=30)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        captured = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            captured.append((statement, parameters))
+
+        event.listen(db.engine, "before_cursor_execute", capture)
+        try:
+            snapshot = DashboardSnapshot(args.shop, window=args.window)
+            snapshot.orders_data()
+            snapshot.inventory_data()
+            snapshot.low_stock_alerts()
+            snapshot.stock_predictions()
+            snapshot.location_summary()
+            get_sales_velocities(args.shop, args.window)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", capture)
+
+        with db.engine.connect() as conn:
+            for statement, parameters in captured:
+                print(" ".join(statement.split()))
+                for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters):
+                    print(f"    {row[-1]}")
+                print()
+
+if __name__ == "__main__":
+    main()
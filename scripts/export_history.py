@@ -0,0 +1,29 @@
+# scripts/export_history.py
+import os
+import sys
+import argparse
+
+# Add the project root to the sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app import create_app
+from app.history import export_history
+from app.models import db, ShopDataVersion
+
+def main():
+    """Compact each shop's order history into a memory-mapped columnar snapshot, e.g. nightly from cron."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--shop", action="append", help="Shop to export; repeatable (default: every shop)")
+    parser.add_argument("--directory", help="Snapshot root (default: HISTORY_DIR)")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        shops = args.shop or [row.shop for row in db.session.query(ShopDataVersion.shop).order_by(ShopDataVersion.shop)]
+        for shop in shops:
+            result = export_history(args.directory or app.config["HISTORY_DIR"], shop)
+            print(f"{shop}: {result['rows']} rows, {result['products']} products before {result['end']} "
+                  f"in {result['seconds']:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# scripts/generate_data.py
+import os
+import sys
+import argparse
+import logging
+
+# Add the project root to the sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app import create_app
+from app.datagen import generate_dataset
+
+def main():
+    """Generate a synthetic catalog and order history for scale testing."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--shops", type=int, default=1, help="Number of shops (default: 1)")
+    parser.add_argument("--skus", type=int, default=1000, help="Number of products (default: 1000)")
+    parser.add_argument("--orders", type=int, default=10000, help="Orders per shop (default: 10000)")
+    parser.add_argument("--line-items", type=float, default=3, help="Mean line items per order (default: 3)")
+    parser.add_argument("--days", type=int, default=90, help="Days of order history (default: 90)")
+    parser.add_argument("--seasonality", type=float, default=0.3, help="Weekly/yearly volume amplitude, 0-1 (default: 0.3)")
+    parser.add_argument("--locations", type=int, default=1, help="Inventory locations per product (default: 1)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--prefix", default="gen", help="Prefix for generated IDs and shop names (default: gen)")
+    parser.add_argument("--batch-size", type=int, default=50000, help="Orders per insert batch (default: 50000)")
+    args = parser.parse_args()
+
+    app = create_app()
+    app.logger.setLevel(logging.WARNING)
+    with app.app_context():
+        result = generate_dataset(
+            shops=args.shops,
+            skus=args.skus,
+            orders=args.orders,
+            line_items_per_order=args.line_items,
+            days=args.days,
+            seasonality=args.seasonality,
+            seed=args.seed,
+            prefix=args.prefix,
+            locations=args.locations,
+            batch_size=args.batch_size,
+        )
+    rate = result["line_items"] / result["seconds"] if result["seconds"] else 0
+    print(
+        f"Generated {result['products']} products, {result['orders']} orders and {result['line_items']} line items "
+        f"for {len(result['shops'])} shop(s) in {result['seconds']:.1f}s ({rate:,.0f} line items/s)."
+    )
+
+if __name__ == "__main__":
+    main()
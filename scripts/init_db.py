@@ -0,0 +1,25 @@
+# scripts/init_db.py
+import os
+import sys
+import argparse
+
+# Add the project root to the sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app import create_app
+from app.database import create_schema, populate_mock_data
+
+def main():
+    """Create the schema, apply migrations and optionally seed mock data; run once per deploy with BOOT_MODE=production."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--seed", action="store_true", help="Populate mock products and orders if the database is empty")
+    args = parser.parse_args()
+
+    app = create_app({"BOOT_MODE": "production"})  # Do the work below exactly once, whatever BOOT_MODE says
+    create_schema(app)
+    if args.seed:
+        populate_mock_data(app)
+    print("Database ready.")
+
+if __name__ == "__main__":
+    main()
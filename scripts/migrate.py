@@ -0,0 +1,29 @@
+# scripts/migrate.py
+import os
+import sys
+import argparse
+
+# Add the project root to the sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app import create_app
+from app.migrations import MIGRATIONS, get_schema_version, run_migrations
+
+def main():
+    """Show the schema version and apply pending migrations."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--status", action="store_true", help="Only list migrations, do not apply anything")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if not args.status:
+            applied = run_migrations()
+            print(f"Applied migrations: {applied or 'none'}")
+        current = get_schema_version()
+        for version, description, _ in sorted(MIGRATIONS, key=lambda m: m[0]):
+            state = "applied" if version <= current else "pending"
+            print(f"{version:>4}  {state:<8} {description}")
+
+if __name__ == "__main__":
+    main()
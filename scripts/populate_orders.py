@@ -8,7 +8,7 @@ from faker import Faker
 # Add the project root to the sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from app.models import Order, LineItem, db
+from app.models import Order, LineItem, DailyProductSales, db
 from app import create_app
 
 # Initialize Faker for random dates
@@ -28,20 +28,21 @@ PRODUCTS = [
     {"id": "8920988942627", "title": "Gloves"},
 ]
 
-def generate_random_date(start_date: datetime, end_date: datetime) -> str:
-    """Generate a random date between start_date and end_date in ISO format."""
+def generate_random_date(start_date: datetime, end_date: datetime) -> datetime:
+    """Generate a random date between start_date and end_date."""
     time_delta = end_date - start_date
     random_days = random.randint(0, time_delta.days)
-    random_date = start_date + timedelta(days=random_days)
-    return random_date.isoformat() + "Z"
+    return start_date + timedelta(days=random_days)
 
-def populate_orders(num_orders: int = 500):
+def populate_orders(num_orders: int = 500, shop: str = "quickstart-c21ead54.myshopify.com"):
     """Generate and insert mock orders into the database."""
     app = create_app()
     with app.app_context():
         # Clear existing data (optional, comment out if you want to append)
+        # Bulk deletes bypass the rollup hooks, so clear the daily_product_sales rollup alongside
         db.session.query(LineItem).delete()
         db.session.query(Order).delete()
+        db.session.query(DailyProductSales).delete()
         db.session.commit()
 
         # Define date range: last 3 months (Dec 9, 2024 to Mar 9, 2025)
@@ -54,7 +55,7 @@ def populate_orders(num_orders: int = 500):
             created_at = generate_random_date(start_date, end_date)
 
             # Create order
-            order = Order(id=order_id, created_at=created_at)
+            order = Order(id=order_id, shop=shop, created_at=created_at)
 
             # Generate 1 to 5 line items per order
             num_line_items = random.randint(1, 5)
@@ -72,7 +73,7 @@ def populate_orders(num_orders: int = 500):
 
             db.session.add(order)
 
-        # Commit all changes
+        # Commit all changes; the flush also updates the daily_product_sales rollup
         db.session.commit()
         print(f"Successfully populated {num_orders} mock orders.")
 
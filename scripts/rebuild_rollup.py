@@ -0,0 +1,24 @@
+# scripts/rebuild_rollup.py
+import os
+import sys
+import argparse
+
+# Add the project root to the sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app import create_app
+from app.rollup import rebuild_daily_sales
+
+def main():
+    """Rebuild (or backfill) the daily_product_sales rollup from the raw orders tables."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--shop", help="Only rebuild this shop (default: all shops)")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        rows = rebuild_daily_sales(args.shop)
+        print(f"Rebuilt daily_product_sales: {rows} rows.")
+
+if __name__ == "__main__":
+    main()
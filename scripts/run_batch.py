@@ -0,0 +1,75 @@
+# scripts/run_batch.py
+import os
+import sys
+import argparse
+
+# Add the project root to the sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app import create_app
+from app.batch import BatchRunner
+from app.models import db, ShopCredential, ShopDataVersion
+
+def print_progress(completed, total, record, elapsed):
+    rate = completed / elapsed if elapsed else 0.0
+    eta = (total - completed) / rate if rate else 0.0
+    if "error" in record:
+        outcome = f"FAILED {record['error']}"
+    else:
+        outcome = f"{record['seconds']:.2f}s, {record['products']} products, {len(record['alerts'])} alerts"
+    print(f"[{completed:>{len(str(total))}}/{total}] {record['shop']}: {outcome} "
+          f"({rate:.1f} shops/s, ETA {eta:.0f}s)", file=sys.stderr)
+
+def main():
+    """Compute alerts and predictions for many shops in parallel, e.g. for nightly reporting."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--shop", action="append", help="Shop to process; repeatable (default: every installed shop)")
+    parser.add_argument("--all", action="store_true", help="Every shop with data, installed or not")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes (default: CPU count)")
+    parser.add_argument("--output", help="Write one JSON line per shop to this file ('-' for stdout)")
+    parser.add_argument("--store", action="store_true", help="Store each forecast in the forecasts table")
+    parser.add_argument("--window", type=int, help="Days of sales history (default: FORECAST_WINDOW)")
+    parser.add_argument("--days-of-cover", type=int, help="Days of stock to cover (default: FORECAST_DAYS_OF_COVER)")
+    parser.add_argument("--lead-time", type=int, help="Restocking lead time in days (default: FORECAST_LEAD_TIME)")
+    parser.add_argument("--quiet", action="store_true", help="No per-shop progress lines")
+    args = parser.parse_args()
+
+    app = create_app()
+    params = {
+        "window": args.window or app.config["FORECAST_WINDOW"],
+        "days_of_cover": args.days_of_cover if args.days_of_cover is not None else app.config["FORECAST_DAYS_OF_COVER"],
+        "lead_time": args.lead_time if args.lead_time is not None else app.config["FORECAST_LEAD_TIME"],
+    }
+    with app.app_context():
+        if args.shop:
+            shops = args.shop
+        elif args.all:
+            shops = [row.shop for row in db.session.query(ShopDataVersion.shop).order_by(ShopDataVersion.shop)]
+        else:
+            shops = [row.shop for row in db.session.query(ShopCredential.shop).order_by(ShopCredential.shop)]
+
+    sink = None
+    if args.output == "-":
+        sink = sys.stdout
+    elif args.output:
+        sink = open(args.output, "w")
+    runner = BatchRunner(
+        {"SQLALCHEMY_DATABASE_URI": app.config["SQLALCHEMY_DATABASE_URI"]}, params, workers=args.workers,
+        store=args.store, sink=sink, progress=None if args.quiet else print_progress
+    )
+    try:
+        summary = runner.run(shops)
+    finally:
+        if sink not in (None, sys.stdout):
+            sink.close()
+
+    print(f"Processed {len(summary['done'])} of {len(shops)} shops in {summary['seconds']:.1f}s "
+          f"({summary['shops_per_second']:.1f} shops/s, {summary['busy_seconds']:.1f}s of per-shop work "
+          f"on {args.workers} workers).", file=sys.stderr)
+    for shop, error in summary["failed"].items():
+        print(f"Failed: {shop}: {error}", file=sys.stderr)
+    if summary["failed"]:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
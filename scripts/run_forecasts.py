@@ -0,0 +1,38 @@
+# scripts/run_forecasts.py
+import os
+import sys
+import argparse
+
+# Add the project root to the sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app import create_app
+from app.models import db, ShopDataVersion
+
+def main():
+    """Precompute the stored forecasts once, e.g. from cron when the in-process scheduler is disabled."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--shop", action="append", help="Shop to forecast; repeatable (default: every stale shop)")
+    parser.add_argument("--all", action="store_true", help="Recompute every shop, even if its forecast is current")
+    parser.add_argument("--workers", type=int, help="Pool size (default: FORECAST_WORKERS)")
+    parser.add_argument("--executor", choices=["thread", "process"], help="Pool type (default: FORECAST_EXECUTOR)")
+    args = parser.parse_args()
+
+    app = create_app()
+    scheduler = app.extensions["forecast_scheduler"]
+    scheduler.workers = args.workers or scheduler.workers
+    scheduler.executor = args.executor or scheduler.executor
+    with app.app_context():
+        if args.shop:
+            shops = args.shop
+        elif args.all:
+            shops = [row.shop for row in db.session.query(ShopDataVersion.shop).order_by(ShopDataVersion.shop)]
+        else:
+            shops = scheduler.stale_shops()
+    results = scheduler.run(shops)
+    print(f"Forecast {len(results)} of {len(shops)} shops.")
+    if len(results) < len(shops):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -6,12 +6,22 @@ from datetime import datetime, timedelta
 # Add the project root to sys.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
+SHOP = "test-shop.myshopify.com"
+
+# Tests compute forecasts explicitly instead of racing a background scheduler
+os.environ.setdefault("FORECAST_SCHEDULER", "False")
+
+def install_shop(flask_app, shop=SHOP, access_token="token"):
+    """Store credentials for a shop, as the OAuth callback would."""
+    with flask_app.app_context():
+        flask_app.extensions["shop_credentials"].save(shop, access_token, ["read_orders"])
+
 @pytest.fixture
 def app():
     from app import create_app
     app = create_app()
     with app.app_context():
-        from app.models import db, Order, LineItem, Product, Variant, InventoryItem, InventoryLevel
+        from app.models import db, Order, LineItem, Product, Variant, InventoryItem, InventoryLevel, DailyProductSales
 
         # Clear existing data before adding mock data
         db.session.query(InventoryLevel).delete()
@@ -20,6 +30,7 @@ def app():
         db.session.query(Product).delete()
         db.session.query(LineItem).delete()
         db.session.query(Order).delete()
+        db.session.query(DailyProductSales).delete()
         db.session.commit()
 
         db.create_all()
@@ -35,8 +46,8 @@ def app():
         )
         inventory_item.variant_id = variant.id
         inventory_level = InventoryLevel(inventory_item_id=inventory_item.id, available=5)
-        order = Order(id=f"order_{timestamp}", created_at=(datetime.now() - timedelta(days=1)).isoformat() + "Z")
-        line_item = LineItem(order_id=order.id, product_id=product.id, product_title="T-Shirt", quantity=2)
+        order = Order(id=f"order_{timestamp}", shop=SHOP, created_at=datetime.now() - timedelta(days=1))
+        line_item = LineItem(order_id=order.id, product_id=product.id, product_title="T-Shirt", quantity=10)
         db.session.add_all([product, inventory_item, variant, inventory_level, order, line_item])
         db.session.commit()
         yield app, product.id  # Yield app and product_id for tests
@@ -0,0 +1,77 @@
+import base64
+import json
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+
+class ShopifyStub:
+    """
+    Local stand-in for the Admin API's orders.json: replays fixture orders sorted by updated_at, honours
+    updated_at_min and limit, and paginates with opaque page_info cursors in Link headers like Shopify does.
+    Every request's query parameters are kept in `requests`; `fail_next` queues status codes to return first.
+    """
+
+    def __init__(self, orders=()):
+        self.orders = list(orders)
+        self.requests = []
+        self.fail_next = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handle(self, handler):
+        url = urlparse(handler.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        self.requests.append(params)
+        if self.fail_next:
+            handler.send_response(self.fail_next.pop(0))
+            handler.send_header("Retry-After", "0")
+            handler.end_headers()
+            return
+        if not url.path.endswith("/orders.json"):
+            handler.send_error(404)
+            return
+
+        if "page_info" in params:
+            cursor = json.loads(base64.urlsafe_b64decode(params["page_info"]))
+            updated_at_min, offset = cursor["updated_at_min"], cursor["offset"]
+        else:
+            updated_at_min, offset = params.get("updated_at_min"), 0
+        limit = int(params.get("limit", 50))
+        matching = sorted(
+            (order for order in self.orders
+             if not updated_at_min or datetime.fromisoformat(order["updated_at"]) >= datetime.fromisoformat(updated_at_min)),
+            key=lambda order: datetime.fromisoformat(order["updated_at"])
+        )
+        page = matching[offset:offset + limit]
+
+        body = json.dumps({"orders": page}).encode()
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(body)))
+        if offset + limit < len(matching):
+            cursor = base64.urlsafe_b64encode(
+                json.dumps({"updated_at_min": updated_at_min, "offset": offset + limit}).encode()
+            ).decode()
+            next_url = f"{self.url}{url.path}?{urlencode({'limit': limit, 'page_info': cursor})}"
+            handler.send_header("Link", f'<{next_url}>; rel="next"')
+        handler.end_headers()
+        handler.wfile.write(body)
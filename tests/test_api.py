@@ -0,0 +1,128 @@
+import gzip
+import json
+from datetime import datetime
+import pytest
+from conftest import SHOP, install_shop
+from app.models import db, Order, LineItem, Product, Variant, InventoryItem, InventoryLevel
+
+@pytest.fixture
+def client(app):
+    install_shop(app[0])
+    return app[0].test_client()
+
+def test_sales_payload_is_compact_with_server_side_top_products(app, client):
+    with app[0].app_context():
+        db.session.add_all([
+            Order(id="order_api", shop=SHOP, created_at=datetime.now()),
+            LineItem(order_id="order_api", product_id="unknown_product", product_title="Mystery", quantity=3),
+        ])
+        db.session.commit()
+
+    sales = client.get(f"/api/v1/shops/{SHOP}/sales?window=7&top=1").get_json()
+    assert len(sales["dates"]) == len(sales["sales"]) == 7
+    assert sales["dates"][-1] == datetime.now().date().isoformat()
+    assert sales["sales"][-2:] == [10, 3]
+    assert sales["top_products"] == [{"product": "T-Shirt", "quantity": 10}]
+
+def test_unchanged_sections_revalidate_with_304(app, client):
+    url = f"/api/v1/shops/{SHOP}/predictions"
+    first = client.get(url)
+    etag = first.headers["ETag"]
+    assert not first.headers["ETag"].startswith("W/")
+    assert first.get_json()["predictions"][0]["restock_date"]  # Dates are ISO strings
+
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(f"{url}?lead_time=3", headers={"If-None-Match": etag}).status_code == 200
+
+    with app[0].app_context():
+        db.session.add_all([
+            Order(id="order_etag", shop=SHOP, created_at=datetime.now()),
+            LineItem(order_id="order_etag", product_id=app[1], product_title="T-Shirt", quantity=1),
+        ])
+        db.session.commit()
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+
+def test_large_sections_are_gzipped(client):
+    url = f"/api/v1/shops/{SHOP}/sales?window=90"
+    plain = client.get(url)
+    compressed = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in compressed.headers["Vary"]
+    assert json.loads(gzip.decompress(compressed.data)) == plain.get_json()
+    assert compressed.headers["ETag"] != plain.headers["ETag"]
+    assert client.get(url, headers={"If-None-Match": compressed.headers["ETag"]}).status_code == 304
+
+def test_dashboard_is_a_shell_over_the_api(client):
+    response = client.get(f"/dashboard?shop={SHOP}&window=14")
+    assert response.status_code == 200
+    assert b"/api/v1/shops/test-shop.myshopify.com/sales?window=14" in response.data
+    assert client.get(f"/api/v1/shops/other.myshopify.com/inventory").status_code == 401
+    assert client.get(f"/api/v1/shops/{SHOP}/alerts?window=0").status_code == 400
+
+def test_inventory_is_keyset_paginated_and_shop_scoped(app, client):
+    with app[0].app_context():
+        for i in range(5):
+            db.session.add(Product(id=f"page_{i}", title=f"Paged {i}", shop=SHOP))
+        db.session.add(Product(id="page_other", title="Other shop's", shop="other.myshopify.com"))
+        db.session.commit()
+
+    seen, cursor = [], None
+    while True:
+        page = client.get(f"/api/v1/shops/{SHOP}/inventory?limit=2" + (f"&cursor={cursor}" if cursor else "")).get_json()
+        seen += [item["product_id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == sorted([f"page_{i}" for i in range(5)] + [app[1]])
+
+    in_stock = client.get(f"/api/v1/shops/{SHOP}/inventory?location=default_location_1").get_json()["items"]
+    assert in_stock == [{"product_id": app[1], "product": "T-Shirt", "stock": 5}]
+    low = client.get(f"/api/v1/shops/{SHOP}/inventory?max_stock=0").get_json()["items"]
+    assert [item["product_id"] for item in low] == [f"page_{i}" for i in range(5)]
+
+def test_inventory_export_streams_ndjson_and_csv(app, client, monkeypatch):
+    monkeypatch.setattr("app.api.EXPORT_PAGE_SIZE", 2)
+    with app[0].app_context():
+        for i in range(4):
+            db.session.add(Product(id=f"export_{i}", title=f"Export, {i}", shop=SHOP))
+        db.session.commit()
+
+    response = client.get(f"/api/v1/shops/{SHOP}/inventory/export")
+    assert response.is_streamed and response.mimetype == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [row["product_id"] for row in rows] == [f"export_{i}" for i in range(4)] + [app[1]]
+
+    csv_lines = client.get(f"/api/v1/shops/{SHOP}/inventory/export?format=csv").get_data(as_text=True).splitlines()
+    assert csv_lines[0] == "product_id,product,stock"
+    assert csv_lines[1] == 'export_0,"Export, 0",0'
+    assert len(csv_lines) == 6
+
+def test_locations_roll_up_stock_and_alerts_per_location(app, client):
+    with app[0].app_context():
+        level = InventoryLevel.query.one()
+        db.session.add(InventoryLevel(inventory_item_id=level.inventory_item_id, location_id="warehouse_2", available=1))
+        db.session.commit()
+
+    data = client.get(f"/api/v1/shops/{SHOP}/locations").get_json()
+    assert data["rollup"] == {"stock": 6, "products": 1, "locations": 2, "low_stock": 1, "low_stock_at_locations": 2}
+    assert [location["location"] for location in data["locations"]] == ["default_location_1", "warehouse_2"]
+    # 10 units sold over 30 days, split over two locations
+    assert [(alert["location"], alert["days_remaining"]) for alert in data["alerts"]] == [
+        ("warehouse_2", 6.0), ("default_location_1", 30.0)
+    ]
+    assert client.get(f"/api/v1/shops/{SHOP}/locations?limit=0").status_code == 400
+
+def test_locations_skip_variants_without_inventory_levels(app, client):
+    flask_app, product_id = app
+    with flask_app.app_context():
+        item = InventoryItem(id="inv_unstocked", variant_id="var_unstocked", tracked=True)
+        db.session.add_all([item, Variant(id="var_unstocked", product_id=product_id, title="T-Shirt - Blue",
+                                          inventory_item_id=item.id)])
+        db.session.commit()
+
+    response = client.get(f"/api/v1/shops/{SHOP}/locations")
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [location["location"] for location in data["locations"]] == ["default_location_1"]
+    assert data["rollup"]["stock"] == 5
@@ -0,0 +1,46 @@
+import io
+import json
+import os
+from conftest import SHOP
+from app.batch import BatchRunner, shop_report
+from app.forecasts import stored_alerts
+
+def crashing_report(shop, store=False, **params):
+    if shop == "crash.myshopify.com":
+        os._exit(1)  # Kills the worker, like a segfault or the OOM killer would
+    return shop_report(shop, store=store, **params)
+
+def test_shop_report_matches_the_dashboard_and_can_store(app):
+    report = shop_report(SHOP, window=30, days_of_cover=30, lead_time=7, store=True)
+    assert report["alerts"][0]["product"] == "T-Shirt"
+    assert report["products"] == len(report["predictions"])
+    assert stored_alerts(SHOP, 30, 30, 7) == report["alerts"]
+
+def test_runner_isolates_failing_shops(app):
+    flask_app, _ = app
+    sink, progress = io.StringIO(), []
+    runner = BatchRunner(
+        {"SQLALCHEMY_DATABASE_URI": flask_app.config["SQLALCHEMY_DATABASE_URI"]},
+        {"window": 120, "days_of_cover": 90, "lead_time": 7}, workers=2, sink=sink,
+        progress=lambda completed, total, record, elapsed: progress.append((completed, total, record["shop"]))
+    )
+    summary = runner.run([SHOP, "../not-a-shop"])  # Rejected when looking up its history snapshot
+    assert summary["done"] == [SHOP]
+    assert summary["failed"]["../not-a-shop"].startswith("ValueError")
+    records = {record["shop"]: record for record in map(json.loads, sink.getvalue().splitlines())}
+    assert records[SHOP]["alerts"][0]["product"] == "T-Shirt"
+    assert "error" in records["../not-a-shop"]
+    assert [(completed, total) for completed, total, _ in progress] == [(1, 2), (2, 2)]
+    assert {shop for _, _, shop in progress} == {SHOP, "../not-a-shop"}
+
+def test_dead_worker_only_fails_its_own_shop(app):
+    flask_app, _ = app
+    shops = [SHOP, "crash.myshopify.com", "a.myshopify.com", "b.myshopify.com"]
+    runner = BatchRunner(
+        {"SQLALCHEMY_DATABASE_URI": flask_app.config["SQLALCHEMY_DATABASE_URI"]},
+        {"window": 30, "days_of_cover": 30, "lead_time": 7}, workers=2, max_attempts=1, report=crashing_report
+    )
+    summary = runner.run(shops)
+    assert sorted(summary["done"]) == sorted(set(shops) - {"crash.myshopify.com"})
+    assert list(summary["failed"]) == ["crash.myshopify.com"]
+    assert summary["failed"]["crash.myshopify.com"].startswith("Worker died")
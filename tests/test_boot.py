@@ -0,0 +1,19 @@
+import os
+import subprocess
+import sys
+from app import create_app
+from app.instrumentation import collect_stats
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+def test_production_boot_touches_no_database(tmp_path):
+    with collect_stats() as stats:
+        app = create_app({"BOOT_MODE": "production", "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'boot.db'}"})
+    assert stats.queries == 0
+    assert not (tmp_path / "boot.db").exists()
+    assert app.extensions["forecast_scheduler"] is not None
+
+def test_shopify_sdk_is_imported_lazily():
+    code = "import sys, app; app.create_app({'BOOT_MODE': 'production'}); print('shopify' in sys.modules, 'requests' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    assert output.split() == ["False", "False"]
@@ -0,0 +1,84 @@
+import time
+from datetime import datetime
+from conftest import SHOP, install_shop
+from app.cache import MemoryCache, SQLiteCache, DashboardCache
+from app.models import db, Order, LineItem, InventoryLevel, Product
+from app.versions import get_data_version
+
+OWNER = "owner-shop.myshopify.com"
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = DashboardCache(MemoryCache(max_entries=2, ttl=60))
+    cache.get_or_compute("orders", SHOP, 1, lambda: "a", window=30)
+    cache.get_or_compute("orders", SHOP, 1, lambda: "b", window=7)
+    cache.get_or_compute("orders", SHOP, 1, lambda: "stale", window=30)  # hit, refreshes recency
+    cache.get_or_compute("orders", SHOP, 1, lambda: "c", window=90)  # evicts window=7
+    assert cache.get_or_compute("orders", SHOP, 1, lambda: "recomputed", window=7) == "recomputed"
+    assert cache.stats() == {"backend": "memory", "hits": 1, "misses": 4, "entries": 2}
+
+def test_sqlite_cache_expires_and_is_shared(tmp_path):
+    path = str(tmp_path / "cache.db")
+    SQLiteCache(path, ttl=60).set("key", {"value": [1, 2]})
+    assert SQLiteCache(path, ttl=60).get("key") == {"value": [1, 2]}
+
+    expiring = DashboardCache(SQLiteCache(path, ttl=0.01))
+    expiring.get_or_compute("alerts", SHOP, 1, lambda: "first")
+    time.sleep(0.02)
+    assert expiring.get_or_compute("alerts", SHOP, 1, lambda: "second") == "second"
+    assert expiring.misses == 2
+
+def test_data_version_bumps_on_writes(app):
+    with app[0].app_context():
+        version = get_data_version(SHOP)
+        db.session.add_all([
+            Order(id="order_bump", shop=SHOP, created_at=datetime.now()),
+            LineItem(order_id="order_bump", product_id=app[1], product_title="T-Shirt", quantity=1),
+        ])
+        db.session.commit()
+        assert get_data_version(SHOP) == version + 1
+
+        InventoryLevel.query.first().available = 50
+        db.session.commit()
+        assert get_data_version(SHOP) == version + 2
+
+def test_inventory_writes_bump_only_the_owning_shop(app):
+    flask_app, product_id = app
+    other = "other-shop.myshopify.com"
+    install_shop(flask_app, other)  # No write has given it a version row yet
+    with flask_app.app_context():
+        db.session.get(Product, product_id).shop = OWNER
+        db.session.commit()
+        versions = {shop: get_data_version(shop) for shop in (SHOP, OWNER, other)}
+        assert versions[other] == 1  # Leaving the shared catalog invalidated every known shop
+
+        InventoryLevel.query.first().available = 50
+        db.session.commit()
+        assert get_data_version(OWNER) == versions[OWNER] + 1
+        assert get_data_version(SHOP) == versions[SHOP]
+        assert get_data_version(other) == versions[other]
+
+        db.session.get(Product, product_id).shop = None  # Back to the shared catalog
+        db.session.commit()
+        assert get_data_version(other) == versions[other] + 1
+        assert get_data_version(SHOP) == versions[SHOP] + 1
+
+def test_dashboard_served_from_cache_until_data_changes(app):
+    flask_app = app[0]
+    install_shop(flask_app)
+    client = flask_app.test_client()
+    cache = flask_app.extensions["dashboard_cache"]
+    sections = [f"/api/v1/shops/{SHOP}/{section}" for section in ("sales", "inventory", "alerts", "predictions")]
+    for url in sections:
+        assert client.get(url).status_code == 200
+    assert cache.misses == 4
+    for url in sections:
+        assert client.get(url).status_code == 200
+    assert cache.hits == 4
+
+    with flask_app.app_context():
+        InventoryLevel.query.first().available = 1
+        db.session.commit()
+    response = client.get(sections[1])
+    assert {"product_id": app[1], "product": "T-Shirt", "stock": 1} in response.get_json()["items"]
+    assert cache.misses == 5
+    assert client.get("/cache/stats").get_json()["hits"] == 4
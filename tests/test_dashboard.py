@@ -1,24 +1,84 @@
-from app.dashboard import get_orders_data, get_inventory_data, get_low_stock_alerts, get_stock_prediction
+from datetime import datetime, timedelta
+from conftest import SHOP
+from sqlalchemy import event
+from app.dashboard import DashboardSnapshot, calculate_avg_daily_sales, get_orders_data, get_inventory_data, get_low_stock_alerts, get_stock_predictions
+from app.aggregates import get_sales_velocities, get_stock_levels, get_products_with_stock
+from app.models import db, Order, LineItem, Product
 
 def test_get_orders_data(app):
     with app[0].app_context():  # Use app[0] for the app instance
-        daily_sales, top_products = get_orders_data()
-        assert daily_sales is not None
-        assert len(top_products) <= 5
+        orders_data = get_orders_data(SHOP)
+        assert len(orders_data) == 1
+        assert orders_data[0]['sales'] == 10
+        assert orders_data[0]['line_items'] == [{'product_title': 'T-Shirt', 'quantity': 10}]
 
 def test_get_inventory_data(app):
     with app[0].app_context():  # Use app[0] for the app instance
-        result = get_inventory_data(app[1])  # Use app[1] for the product_id
-        assert "Total inventory: 5 units available" in result
+        result = get_inventory_data(SHOP)
+        assert {'product': 'T-Shirt', 'stock': 5} in result
 
 def test_get_low_stock_alerts(app):
     with app[0].app_context():  # Use app[0] for the app instance
-        result = get_low_stock_alerts()
-        assert "<h2>Low Stock Alerts</h2>" in result
-        assert "T-Shirt - Red" in result
+        result = get_low_stock_alerts(SHOP)
+        assert [alert['product'] for alert in result] == ['T-Shirt']
+        assert result[0]['days_remaining'] == 5 / (10 / 30)
 
-def test_get_stock_prediction(app):
+def test_get_stock_predictions(app):
     with app[0].app_context():  # Use app[0] for the app instance
-        _, top_products = get_orders_data()
-        result = get_stock_prediction(top_products)
-        assert "<h2>Stock Prediction</h2>" in result
\ No newline at end of file
+        result = get_stock_predictions(SHOP)
+        assert [prediction['product'] for prediction in result] == ['T-Shirt']
+        assert result[0]['predicted_stock'] == 0
+
+def test_get_sales_velocities(app):
+    with app[0].app_context():  # Use app[0] for the app instance
+        assert get_sales_velocities(SHOP) == {app[1]: 10 / 30}
+        assert get_sales_velocities("other-shop.myshopify.com") == {}
+        product = db.session.get(Product, app[1])
+        assert calculate_avg_daily_sales(product, SHOP) == 10 / 30
+
+def test_get_stock_levels(app):
+    with app[0].app_context():  # Use app[0] for the app instance
+        assert get_stock_levels() == {app[1]: 5}
+        assert get_stock_levels(by_location=True) == {(app[1], "default_location_1"): 5}
+        assert [(product.id, stock) for product, stock in get_products_with_stock()] == [(app[1], 5)]
+
+def test_get_orders_data_buckets_by_day(app):
+    with app[0].app_context():  # Use app[0] for the app instance
+        now = datetime.now()
+        db.session.add_all([
+            Product(id="prod_mug", title="Mug"),
+            Order(id="order_today", shop=SHOP, created_at=now),
+            LineItem(order_id="order_today", product_id=app[1], product_title="T-Shirt", quantity=1),
+            LineItem(order_id="order_today", product_id=app[1], product_title="T-Shirt", quantity=2),
+            LineItem(order_id="order_today", product_id="prod_mug", product_title="Mug", quantity=4),
+        ])
+        db.session.commit()
+        orders_data = get_orders_data(SHOP)
+        assert [day['date'] for day in orders_data] == [
+            (now - timedelta(days=1)).strftime('%Y-%m-%d'),
+            now.strftime('%Y-%m-%d'),
+        ]
+        assert orders_data[1]['sales'] == 7
+        assert orders_data[1]['line_items'] == [
+            {'product_title': 'Mug', 'quantity': 4},
+            {'product_title': 'T-Shirt', 'quantity': 3},
+        ]
+
+def test_dashboard_snapshot_loads_each_dataset_once(app):
+    with app[0].app_context():  # Use app[0] for the app instance
+        statements = []
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+        event.listen(db.engine, "before_cursor_execute", count)
+        try:
+            snapshot = DashboardSnapshot(SHOP)
+            assert snapshot.orders_data() == get_orders_data(SHOP)
+            statements.clear()
+            snapshot = DashboardSnapshot(SHOP)
+            snapshot.orders_data()
+            snapshot.inventory_data()
+            snapshot.low_stock_alerts()
+            snapshot.stock_predictions()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", count)
+        assert len(statements) == 2
@@ -0,0 +1,31 @@
+from datetime import datetime
+from sqlalchemy import func
+from app.models import db, Order, LineItem, Product, InventoryLevel, DailyProductSales
+from app.datagen import generate_dataset
+from app.rollup import rebuild_daily_sales
+
+def rollup_rows():
+    return sorted(
+        (row.shop, row.product_id, row.date, row.quantity)
+        for row in DailyProductSales.query.filter(DailyProductSales.shop.like("t-shop-%"))
+    )
+
+def test_generate_dataset(app):
+    with app[0].app_context():
+        result = generate_dataset(shops=2, skus=20, orders=300, line_items_per_order=2, days=14,
+                                  seed=1, prefix="t", locations=2, batch_size=128, end=datetime(2025, 3, 9, 12))
+        assert result["shops"] == ["t-shop-1.myshopify.com", "t-shop-2.myshopify.com"]
+        assert Order.query.filter(Order.shop.like("t-shop-%")).count() == 600
+        assert LineItem.query.filter(LineItem.order_id.like("t_%")).count() == result["line_items"]
+        assert Product.query.filter(Product.id.like("t_prod_%")).count() == 20
+        assert InventoryLevel.query.filter(InventoryLevel.inventory_item_id.like("t_inv_item_%")).count() == 40
+
+        created = db.session.query(func.min(Order.created_at), func.max(Order.created_at)).filter(
+            Order.shop == "t-shop-1.myshopify.com").one()
+        assert datetime(2025, 2, 24) <= created[0] and created[1] < datetime(2025, 3, 10)
+
+        # The incrementally written rollup matches one rebuilt from the raw rows
+        generated = rollup_rows()
+        for shop in result["shops"]:
+            rebuild_daily_sales(shop)
+        assert rollup_rows() == generated
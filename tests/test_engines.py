@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from app import create_app
+from app.aggregates import get_catalog_stock
+from app.engines import read_session
+from app.models import db, InventoryLevel
+
+@pytest.fixture
+def split_app(tmp_path):
+    # Characters that need quoting in a file: URI
+    (tmp_path / "data #1?").mkdir()
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'data #1?' / 'orders.db'}",
+        "DB_READONLY_ENGINE": True,
+    })
+    yield app
+    app.extensions["read_engine"].dispose()
+    with app.app_context():
+        db.engine.dispose()
+
+def test_connections_use_wal_and_tuned_pragmas(app):
+    with app[0].app_context():
+        connection = db.session.connection()
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert connection.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+        assert connection.exec_driver_sql("PRAGMA busy_timeout").scalar() == 5000
+        assert connection.exec_driver_sql("PRAGMA cache_size").scalar() == -65536
+        assert db.engine.pool.size() == 5
+
+def test_readonly_engine_serves_reads_and_rejects_writes(split_app):
+    with split_app.app_context():
+        assert read_session() is not db.session
+        with pytest.raises(OperationalError):
+            read_session().execute(text("DELETE FROM products"))
+        read_session().rollback()
+
+def test_readonly_session_lives_for_one_app_context(split_app):
+    with split_app.app_context():
+        session = read_session()
+        assert read_session() is session
+        assert session.execute(text("SELECT count(*) FROM products")).scalar() == 10
+    assert not session.in_transaction()  # Closed on teardown
+    with split_app.app_context():
+        assert read_session() is not session
+
+def test_reads_are_not_blocked_by_an_open_write_transaction(split_app):
+    with split_app.app_context():
+        stock = dict((product_id, stock) for product_id, _, stock in get_catalog_stock())
+        read_session().rollback()
+
+        # Hold the write lock with an uncommitted change, as a long ingest batch would
+        writer = db.engine.connect()
+        writer.exec_driver_sql("BEGIN IMMEDIATE")
+        writer.exec_driver_sql("UPDATE inventory_levels SET available = available + 1000")
+        try:
+            # Under WAL the reader sees the last committed snapshot instead of waiting for the lock
+            assert dict((product_id, stock) for product_id, _, stock in get_catalog_stock()) == stock
+        finally:
+            writer.rollback()
+            writer.close()
+        assert db.session.query(InventoryLevel).count() == 15  # 10 mock products, half of them at two locations
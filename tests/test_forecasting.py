@@ -0,0 +1,67 @@
+import numpy as np
+from datetime import date, timedelta
+from app.forecasting import CatalogForecast, LocationForecast, build_stock_matrix, exponential_smoothing
+
+TODAY = date(2025, 3, 9)
+
+def make_forecast(**kwargs):
+    sales = np.array([
+        [1.0, 1.0, 1.0, 1.0],  # steady seller
+        [0.0, 0.0, 0.0, 8.0],  # recent spike
+        [0.0, 0.0, 0.0, 0.0],  # no sales
+    ])
+    return CatalogForecast(["a", "b", "c"], ["A", "B", "C"], [2, 40, 7], sales, today=TODAY, **kwargs)
+
+def test_exponential_smoothing_matches_recursive_definition():
+    matrix = np.array([[3.0, 0.0, 5.0, 1.0]])
+    level = matrix[0, 0]
+    for value in matrix[0, 1:]:
+        level = 0.3 * value + 0.7 * level
+    assert np.allclose(exponential_smoothing(matrix, 0.3), [level])
+
+def test_catalog_forecast_metrics():
+    forecast = make_forecast(days_of_cover=3, lead_time=1, moving_average_days=2)
+    assert forecast.velocity.tolist() == [1.0, 2.0, 0.0]
+    assert forecast.moving_average.tolist() == [1.0, 4.0, 0.0]
+    assert forecast.days_remaining.tolist() == [2.0, 20.0, float('inf')]
+    assert forecast.predicted_stock.tolist() == [0.0, 34.0, 7.0]
+    assert forecast.stockout_dates.tolist() == [TODAY + timedelta(days=2), TODAY + timedelta(days=20), None]
+
+def test_slow_movers_beyond_the_horizon_have_no_stockout_date():
+    sales = np.zeros((1, 30))
+    sales[0, -1] = 1  # One sale in 30 days: 3 million days of cover
+    forecast = CatalogForecast(["a"], ["A"], [100000], sales, today=TODAY)
+    assert forecast.days_remaining.tolist() == [3e6]
+    assert forecast.stockout_dates.tolist() == [None]
+    assert forecast.predictions()[0]['stockout_date'] is None
+
+def test_catalog_forecast_views():
+    forecast = make_forecast(days_of_cover=3, lead_time=1)
+    assert forecast.alerts() == [{'product': 'A', 'days_remaining': 2.0, 'stockout_date': TODAY + timedelta(days=2)}]
+    predictions = forecast.predictions()
+    assert [prediction['product'] for prediction in predictions] == ['A', 'B', 'C']
+    assert all(prediction['restock_date'] == TODAY + timedelta(days=1) for prediction in predictions)
+
+def test_location_forecast_splits_demand_across_carrying_locations():
+    rows = [  # As packed by get_location_stock
+        ("a", "A", "west\x1feast\x1fwest", "4,2,2"),  # velocity 1: half a unit per day at each location
+        ("b", "B", "west", "40"),
+        ("c", "C", None, None),  # no inventory levels
+    ]
+    product_ids, titles, location_ids, stock, carried = build_stock_matrix(rows)
+    assert (product_ids, location_ids) == (["a", "b", "c"], ["east", "west"])
+    assert stock.tolist() == [[2, 6], [0, 40], [0, 0]]
+    assert carried.tolist() == [[True, True], [False, True], [False, False]]
+
+    sales = np.array([[1.0, 1.0, 1.0, 1.0], [0.0, 0.0, 0.0, 8.0], [0.0, 0.0, 0.0, 0.0]])
+    forecast = LocationForecast(product_ids, titles, location_ids, stock, carried, sales, days_of_cover=4,
+                                lead_time=1, today=TODAY)
+    assert forecast.catalog.stock.tolist() == [8.0, 40.0, 0.0]
+    assert forecast.days_remaining.tolist() == [[4.0, 12.0], [float('inf'), 20.0], [float('inf'), float('inf')]]
+    assert forecast.alerts() == [
+        {'product': 'A', 'location': 'east', 'stock': 2, 'days_remaining': 4.0, 'stockout_date': TODAY + timedelta(days=4)}
+    ] == forecast.alerts(limit=1)
+    assert forecast.locations() == [
+        {'location': 'east', 'stock': 2, 'products': 1, 'low_stock': 1, 'days_of_cover': 4.0},
+        {'location': 'west', 'stock': 46, 'products': 2, 'low_stock': 0, 'days_of_cover': 46 / 2.5},
+    ]
@@ -0,0 +1,85 @@
+import threading
+from datetime import datetime
+from conftest import SHOP
+from app.dashboard import DashboardSnapshot, forecast_section
+from app.forecasts import compute_shop_forecast, stored_alerts, stored_predictions
+from app.models import db, Order, LineItem, InventoryLevel, Forecast
+from app.instrumentation import collect_stats
+from app import scheduler as scheduler_module
+from app.scheduler import ForecastScheduler
+
+def test_stored_forecast_matches_on_demand_compute(app):
+    with app[0].app_context():
+        assert stored_alerts(SHOP) is None  # Nothing computed yet
+        result = compute_shop_forecast(SHOP)
+        assert result["products"] == 1
+
+        snapshot = DashboardSnapshot(SHOP)
+        assert stored_alerts(SHOP) == snapshot.low_stock_alerts()
+        assert stored_predictions(SHOP) == snapshot.stock_predictions()
+        assert stored_alerts(SHOP, lead_time=3) is None  # Other parameters are not precomputed
+
+def test_store_handles_stock_lasting_past_the_calendar(app):
+    with app[0].app_context():
+        InventoryLevel.query.first().available = 10 ** 9  # 10 sold in 30 days: 3 billion days of cover
+        db.session.commit()
+        compute_shop_forecast(SHOP)
+        assert db.session.get(Forecast, (SHOP, app[1])).stockout_date is None
+
+def test_data_change_makes_stored_forecast_stale(app):
+    scheduler = app[0].extensions["forecast_scheduler"]
+    with app[0].app_context():
+        assert SHOP in scheduler.stale_shops()
+        scheduler.run([SHOP])
+        assert SHOP not in scheduler.stale_shops()
+
+        db.session.add_all([
+            Order(id="order_forecast", shop=SHOP, created_at=datetime.now()),
+            LineItem(order_id="order_forecast", product_id=app[1], product_title="T-Shirt", quantity=5),
+        ])
+        db.session.commit()
+        assert stored_predictions(SHOP) is None
+        assert SHOP in scheduler.stale_shops()
+
+        # Until the scheduler catches up, requests compute on demand
+        assert forecast_section("alerts", SHOP) == DashboardSnapshot(SHOP).low_stock_alerts()
+        scheduler.run([SHOP])
+        with collect_stats() as stats:
+            alerts = forecast_section("alerts", SHOP)
+        assert alerts[0]["days_remaining"] == 5 / (15 / 30)
+        assert "query.catalog" not in [stage for stage, _ in stats.spans]  # Served from the forecasts table
+
+def test_follower_takes_over_within_a_poll_interval(app, tmp_path):
+    lock_path = str(tmp_path / "scheduler.lock")
+    leader = ForecastScheduler(app[0], {}, max_age=900, poll_interval=0.05, lock_path=lock_path)
+    assert leader._acquire_leadership()
+    follower = ForecastScheduler(app[0], {}, max_age=900, poll_interval=0.05, lock_path=lock_path)
+    polled = threading.Event()
+    follower.stale_shops = lambda: polled.set() or []
+    follower.start()
+    assert not polled.wait(0.2)
+    leader._lock_file.close()  # The leading worker exits
+    assert polled.wait(2)
+
+def test_failing_shop_backs_off(app, monkeypatch):
+    scheduler = ForecastScheduler(app[0], {}, max_age=60, poll_interval=1)
+    monkeypatch.setattr(scheduler_module, "compute_shop_forecast", lambda shop, **params: 1 / 0)
+    assert scheduler.run([SHOP]) == []
+    assert scheduler.due([SHOP, "other.myshopify.com"]) == ["other.myshopify.com"]
+    scheduler.run([SHOP])
+    assert scheduler._failures[SHOP][0] == 2
+
+    succeed = lambda shop, **params: {"shop": shop, "products": 1, "seconds": 0.0}
+    monkeypatch.setattr(scheduler_module, "compute_shop_forecast", succeed)
+    scheduler._failures[SHOP] = (2, 0)  # The backoff has elapsed
+    assert scheduler.due([SHOP]) == [SHOP]
+    scheduler.run([SHOP])
+    assert SHOP not in scheduler._failures
+
+def test_process_workers_boot_without_seeding_or_scheduling(monkeypatch):
+    monkeypatch.setattr("app.create_app", lambda config: config)
+    monkeypatch.setattr(scheduler_module, "_worker_app", None)
+    scheduler_module._init_process_worker({"SQLALCHEMY_DATABASE_URI": "sqlite://"})
+    assert scheduler_module._worker_app == {
+        "SQLALCHEMY_DATABASE_URI": "sqlite://", "BOOT_MODE": "production", "FORECAST_SCHEDULER": False
+    }
@@ -0,0 +1,80 @@
+import os
+from datetime import date, datetime, timedelta
+import numpy as np
+from conftest import SHOP
+from app.dashboard import DashboardSnapshot
+from app.forecasting import build_sales_matrix, load_sales_matrix
+from app.aggregates import get_sales_rows
+from app import history
+from app.history import export_history, open_history
+from app.models import db, Order, LineItem
+
+def add_sale(product_id, order_id, days_ago, quantity):
+    order = Order(id=order_id, shop=SHOP, created_at=datetime.now() - timedelta(days=days_ago))
+    db.session.add_all([order, LineItem(order_id=order.id, product_id=product_id, product_title="T-Shirt", quantity=quantity)])
+    db.session.commit()
+
+def test_snapshot_columns_match_the_rollup(app, tmp_path):
+    flask_app, product_id = app
+    add_sale(product_id, "order_old", 400, 3)
+    add_sale(product_id, "order_recent", 100, 4)
+    today = date.today()
+
+    result = export_history(str(tmp_path), SHOP)
+    assert (result["rows"], result["products"]) == (3, 1)
+    snapshot = open_history(str(tmp_path), SHOP)
+    assert isinstance(snapshot.columns["day"], np.memmap)
+    assert snapshot.start == today - timedelta(days=400)
+
+    first = today - timedelta(days=499)
+    matrix = snapshot.sales_matrix(["other", product_id], first, today)
+    assert matrix.shape == (2, 500)
+    assert matrix[0].sum() == 0
+    assert matrix[1].nonzero()[0].tolist() == [99, 399, 498]
+    assert snapshot.daily_totals(first, today).sum() == 17
+    assert snapshot.product_totals(today - timedelta(days=200), today) == {product_id: 14}
+
+def test_long_windows_read_the_snapshot_plus_newer_sales(app, tmp_path):
+    flask_app, product_id = app
+    flask_app.config.update(HISTORY_DIR=str(tmp_path), HISTORY_MIN_WINDOW=90)
+    add_sale(product_id, "order_old", 200, 3)
+    export_history(str(tmp_path), SHOP)
+    add_sale(product_id, "order_today", 0, 5)  # After the export
+
+    expected = build_sales_matrix(get_sales_rows(SHOP, 365), [product_id], 365)
+    assert np.array_equal(load_sales_matrix(SHOP, [product_id], 365), expected)
+    assert DashboardSnapshot(SHOP, window=365).sales_summary()["sales"] == expected[0].astype(int).tolist()
+    assert DashboardSnapshot(SHOP, window=365).history is not None
+    assert DashboardSnapshot(SHOP, window=30).history is None  # Short windows stay on the rollup
+
+def test_new_generation_replaces_the_old_one(app, tmp_path):
+    flask_app, product_id = app
+    export_history(str(tmp_path), SHOP)
+    first = open_history(str(tmp_path), SHOP)
+    add_sale(product_id, "order_new", 2, 1)
+    export_history(str(tmp_path), SHOP)
+    second = open_history(str(tmp_path), SHOP)
+    assert second.generation != first.generation and second.rows == first.rows + 1
+    assert sorted(os.listdir(tmp_path / SHOP)) == sorted(["current.json", second.generation])
+    assert first.daily_totals(date.today() - timedelta(days=5), date.today()).sum() == 10  # Still mapped
+
+def test_late_edit_to_a_past_day_falls_back_to_the_rollup(app, tmp_path):
+    flask_app, product_id = app
+    flask_app.config.update(HISTORY_DIR=str(tmp_path), HISTORY_MIN_WINDOW=90)
+    export_history(str(tmp_path), SHOP)
+    assert DashboardSnapshot(SHOP, window=365).history is not None
+    add_sale(product_id, "order_backfilled", 200, 3)  # A day the snapshot already covers
+
+    expected = build_sales_matrix(get_sales_rows(SHOP, 365), [product_id], 365)
+    assert DashboardSnapshot(SHOP, window=365).history is None
+    assert np.array_equal(load_sales_matrix(SHOP, [product_id], 365), expected)
+    export_history(str(tmp_path), SHOP)
+    assert DashboardSnapshot(SHOP, window=365).history is not None
+
+def test_generation_removed_while_opening_is_treated_as_missing(app, tmp_path):
+    export_history(str(tmp_path), SHOP)
+    generation = tmp_path / SHOP / open_history(str(tmp_path), SHOP).generation
+    history._snapshots.clear()  # A worker that has not mapped this generation yet
+    for name in os.listdir(generation):
+        os.remove(generation / name)  # As a concurrent export would
+    assert open_history(str(tmp_path), SHOP) is None
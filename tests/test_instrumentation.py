@@ -0,0 +1,58 @@
+import logging
+from conftest import SHOP, install_shop
+from app.instrumentation import Abbreviated, Counter, collect_stats, span
+from app.models import db, Product
+
+def test_dashboard_reports_server_timing_and_metrics(app):
+    flask_app = app[0]
+    install_shop(flask_app)
+    client = flask_app.test_client()
+    with collect_stats() as stats:
+        response = client.get(f"/api/v1/shops/{SHOP}/predictions")
+    assert response.status_code == 200
+    stages = [entry.split(";")[0] for entry in response.headers["Server-Timing"].split(", ")]
+    assert stages[0] == "db"
+    assert {"query.catalog", "query.sales_series", "compute.forecast", "serialize"} <= set(stages)
+    # The request's accounting is merged into the enclosing collect_stats()
+    assert stats.queries >= 3 and stats.rows >= 2
+
+    body = client.get("/metrics").get_data(as_text=True)
+    # Metrics are process-wide, so other tests' requests may be counted too
+    route = "/api/v1/shops/<shop>/predictions"
+    assert f'http_requests_total{{route="{route}",method="GET",status="200"}}' in body
+    assert 'stage_duration_seconds_count{stage="serialize"}' in body
+    assert f'db_queries_per_request_bucket{{route="{route}",le="+Inf"}}' in body
+    assert 'dashboard_cache_misses_total{backend="memory"} 1' in body
+
+def test_collect_stats_counts_queries_rows_and_spans(app):
+    with app[0].app_context(), collect_stats() as stats:
+        with span("load"):
+            products = db.session.query(Product).all()
+    assert stats.queries == 1
+    assert stats.rows == len(products) == 1
+    assert [stage for stage, _ in stats.spans] == ["load"]
+
+def test_repeated_statement_is_reported_as_n_plus_one(app, caplog):
+    flask_app = app[0]
+    flask_app.config["N_PLUS_ONE_THRESHOLD"] = 3
+
+    @flask_app.route("/n-plus-one")
+    def n_plus_one():
+        for _ in range(3):
+            db.session.get(Product, "missing")
+            db.session.expunge_all()
+        return "ok"
+
+    with caplog.at_level(logging.WARNING):
+        assert flask_app.test_client().get("/n-plus-one").status_code == 200
+    assert "Possible N+1 query pattern on /n-plus-one: statement executed 3 times" in caplog.text
+
+def test_abbreviated_bounds_log_output():
+    text = str(Abbreviated([{"product": f"Product {i}", "stock": i} for i in range(1000)]))
+    assert text.endswith("(1000 items)")
+    assert len(text) < 300
+
+def test_label_values_are_escaped():
+    counter = Counter("escaped_total", "Label escaping.", labels=("route",))
+    counter.inc(route='/a\\b"c\nd')
+    assert counter.render()[-1] == 'escaped_total{route="/a\\\\b\\"c\\nd"} 1'
@@ -0,0 +1,21 @@
+from sqlalchemy import inspect, text
+from app.models import db, SchemaMigration
+from app.migrations import MIGRATIONS, get_schema_version, run_migrations
+
+def index_names(table):
+    return {index["name"] for index in inspect(db.engine).get_indexes(table)}
+
+def test_database_is_at_latest_schema_version(app):
+    with app[0].app_context():
+        assert get_schema_version() == max(version for version, _, _ in MIGRATIONS)
+        assert run_migrations() == []
+
+def test_migrations_upgrade_a_legacy_database(app):
+    with app[0].app_context():
+        db.session.execute(text("DROP INDEX ix_orders_shop_created_at"))
+        db.session.query(SchemaMigration).delete()
+        db.session.commit()
+        assert "ix_orders_shop_created_at" not in index_names("orders")
+
+        assert run_migrations() == sorted(version for version, _, _ in MIGRATIONS)
+        assert "ix_orders_shop_created_at" in index_names("orders")
@@ -0,0 +1,54 @@
+import math
+import numpy as np
+from conftest import SHOP, install_shop
+from app.replenishment import ReplenishmentPlan, service_factor, what_if_grid
+
+SALES = np.array([
+    [2.0, 4.0, 2.0, 4.0],  # mean 3, sample std 1.1547
+    [5.0, 5.0, 5.0, 5.0],  # steady: no safety stock needed
+    [0.0, 0.0, 0.0, 0.0],  # never sold: never reordered
+])
+STOCK = [10, 100, 0]
+
+def test_plan_computes_safety_stock_reorder_point_and_eoq():
+    plan = ReplenishmentPlan(["a", "b", "c"], ["A", "B", "C"], STOCK, SALES, lead_time=4, service_level=0.95,
+                             order_cost=50, holding_cost=2)
+    std = np.std([2, 4, 2, 4], ddof=1)
+    assert plan.safety_stock.tolist() == [math.ceil(1.6448536 * std * 2), 0, 0]
+    assert plan.reorder_point.tolist() == [12 + math.ceil(1.6448536 * std * 2), 20, 0]
+    assert plan.eoq.tolist() == [math.ceil(math.sqrt(2 * 3 * 365 * 50 / 2)), math.ceil(math.sqrt(2 * 5 * 365 * 50 / 2)), 0]
+    assert plan.order_quantity.tolist() == [plan.eoq[0], 0, 0]
+    assert [item["product_id"] for item in plan.items()] == ["a"]
+    assert plan.summary()["reorder_products"] == 1
+
+def test_zero_lead_time_ranks_out_of_stock_products_first():
+    plan = ReplenishmentPlan(["a", "b", "c"], ["A", "B", "C"], [3, 0, -2], SALES[[0, 0, 1]], lead_time=0)
+    assert plan.reorder_point.tolist() == [0, 0, 0]
+    with np.errstate(all="raise"):
+        assert [item["product_id"] for item in plan.items()] == ["c", "b"]
+
+def test_grid_matches_individual_plans():
+    lead_times, service_levels = [1, 4, 10], [0.5, 0.9, 0.99]
+    grid = what_if_grid(STOCK, SALES, lead_times, service_levels)
+    assert len(grid) == 9
+    for cell in grid:
+        plan = ReplenishmentPlan(["a", "b", "c"], ["A", "B", "C"], STOCK, SALES, cell["lead_time"], cell["service_level"])
+        summary = plan.summary()
+        assert (cell["reorder_products"], cell["order_units"], cell["safety_stock_units"]) == (
+            summary["reorder_products"], summary["order_units"], summary["safety_stock_units"]
+        )
+    assert service_factor(0.5).tolist() == [0.0]
+
+def test_replenishment_endpoints(app):
+    install_shop(app[0])
+    client = app[0].test_client()
+    plan = client.get(f"/api/v1/shops/{SHOP}/replenishment?lead_time=7&service_level=0.9").get_json()
+    # 5 in stock, 10 sold yesterday over a 30-day window: below the reorder point
+    assert plan["items"][0]["product"] == "T-Shirt" and plan["items"][0]["order_quantity"] > 0
+
+    grid = client.get(f"/api/v1/shops/{SHOP}/replenishment/grid?lead_times=1,7,14&service_levels=0.9,0.99").get_json()["grid"]
+    assert [(cell["lead_time"], cell["service_level"]) for cell in grid][:2] == [(1, 0.9), (1, 0.99)]
+    assert len(grid) == 6
+    assert client.get(f"/api/v1/shops/{SHOP}/replenishment/grid?service_levels=1.5").status_code == 400
+    for query in ("lead_times=inf", "lead_times=1,-2", "lead_times=nan", "holding_cost=inf"):
+        assert client.get(f"/api/v1/shops/{SHOP}/replenishment/grid?{query}").status_code == 400
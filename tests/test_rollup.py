@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+from conftest import SHOP
+from app.models import db, Order, LineItem, DailyProductSales
+from app.rollup import rebuild_daily_sales
+
+def rollup_rows():
+    return {
+        (row.shop, row.product_id, row.date): row.quantity
+        for row in DailyProductSales.query.all()
+        if row.quantity
+    }
+
+def test_rollup_tracks_orm_writes(app):
+    with app[0].app_context():
+        yesterday = (datetime.now() - timedelta(days=1)).date()
+        assert rollup_rows() == {(SHOP, app[1], yesterday): 10}
+
+        order = Order(id="order_extra", shop=SHOP, created_at=datetime.now() - timedelta(days=1))
+        line_item = LineItem(order_id=order.id, product_id=app[1], product_title="T-Shirt", quantity=3)
+        db.session.add_all([order, line_item])
+        db.session.commit()
+        assert rollup_rows() == {(SHOP, app[1], yesterday): 13}
+
+        line_item.quantity = 1
+        db.session.commit()
+        assert rollup_rows() == {(SHOP, app[1], yesterday): 11}
+
+        db.session.delete(line_item)
+        db.session.commit()
+        assert rollup_rows() == {(SHOP, app[1], yesterday): 10}
+
+def test_rollup_follows_an_order_to_another_day(app):
+    with app[0].app_context():
+        today = datetime.now().date()
+        order = Order.query.one()
+        order.created_at = datetime.now()
+        db.session.commit()
+        assert rollup_rows() == {(SHOP, app[1], today): 10}
+
+def test_rollup_follows_an_order_to_another_shop(app):
+    with app[0].app_context():
+        yesterday = (datetime.now() - timedelta(days=1)).date()
+        order = Order.query.one()
+        db.session.expire(order)  # The old shop is not loaded when it is replaced
+        order.shop = "other-shop.myshopify.com"
+        db.session.commit()
+        assert rollup_rows() == {("other-shop.myshopify.com", app[1], yesterday): 10}
+
+def test_rollup_follows_a_line_item_to_another_product(app):
+    with app[0].app_context():
+        yesterday = (datetime.now() - timedelta(days=1)).date()
+        line_item = LineItem.query.one()
+        line_item.product_id = "prod_other"
+        line_item.quantity = 4
+        db.session.commit()
+        assert rollup_rows() == {(SHOP, "prod_other", yesterday): 4}
+        db.session.query(DailyProductSales).delete()
+        rebuild_daily_sales()
+        assert rollup_rows() == {(SHOP, "prod_other", yesterday): 4}
+
+def test_rebuild_daily_sales(app):
+    with app[0].app_context():
+        expected = rollup_rows()
+        db.session.query(DailyProductSales).delete()
+        db.session.commit()
+        assert rebuild_daily_sales() == 1
+        assert rollup_rows() == expected
@@ -0,0 +1,48 @@
+from conftest import SHOP, install_shop
+from app import create_app
+from app.instrumentation import collect_stats
+
+class TokenResponse:
+    status_code = 200
+
+    def json(self):
+        return {"access_token": "oauth-token", "scope": "read_orders,read_products"}
+
+def test_callback_installs_the_shop_for_every_worker(app, monkeypatch):
+    monkeypatch.setattr("requests.post", lambda url, data: TokenResponse())
+    client = app[0].test_client()
+    assert client.get(f"/dashboard?shop={SHOP}").headers["Location"].startswith("/install")
+
+    response = client.get(f"/auth/callback?shop={SHOP}&code=abc")
+    assert response.headers["Location"] == f"/dashboard?shop={SHOP}"
+    assert client.get(f"/dashboard?shop={SHOP}").status_code == 200
+    assert client.get("/").headers["Location"] == f"/dashboard?shop={SHOP}"
+
+    # Another worker shares the database, not the memory
+    other_worker = create_app()
+    with other_worker.app_context():
+        assert other_worker.extensions["shop_credentials"].get(SHOP) == {
+            "access_token": "oauth-token", "scopes": ["read_orders", "read_products"]
+        }
+
+def test_token_exchange_can_target_a_stand_in(app, monkeypatch):
+    urls = []
+    monkeypatch.setattr("requests.post", lambda url, data: urls.append(url) or TokenResponse())
+    app[0].config["SHOPIFY_BASE_URL"] = "http://127.0.0.1:9999"
+    assert app[0].test_client().get(f"/auth/callback?shop={SHOP}&code=abc").status_code == 302
+    assert urls == ["http://127.0.0.1:9999/admin/oauth/access_token"]
+
+def test_token_lookup_is_a_memory_hit(app):
+    install_shop(app[0])
+    credentials = app[0].extensions["shop_credentials"]
+    with app[0].app_context():
+        credentials.cache.clear()
+        with collect_stats() as stats:
+            assert credentials.get(SHOP)["access_token"] == "token"
+            assert credentials.get(SHOP)["access_token"] == "token"
+            assert credentials.get("unknown.myshopify.com") is None
+            assert credentials.get("unknown.myshopify.com") is None
+        assert stats.queries == 3  # One read-through, and unknown shops are never cached
+
+        credentials.delete(SHOP)
+        assert credentials.get(SHOP) is None
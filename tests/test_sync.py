@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+from shopify_stub import ShopifyStub
+from app.models import db, Order, LineItem, ShopSyncState
+from app.sync import ShopifyClient, sync_orders
+from app.aggregates import get_sales_velocities
+
+SYNC_SHOP = "sync-shop.myshopify.com"
+
+def shopify_order(number, product_id, quantity, updated_minutes, cancelled=False):
+    created = (datetime.now() - timedelta(days=2)).replace(microsecond=0)
+    return {
+        "id": 5000 + number,
+        "created_at": created.isoformat() + "-05:00",
+        "updated_at": (created + timedelta(minutes=updated_minutes)).isoformat() + "-05:00",
+        "cancelled_at": created.isoformat() + "-05:00" if cancelled else None,
+        "line_items": [
+            {"id": 9000 + number, "product_id": int(product_id), "title": f"Product {product_id}", "quantity": quantity},
+            {"id": 9500 + number, "product_id": None, "title": "Gift wrap", "quantity": 1},
+        ],
+    }
+
+def sold(product_id):
+    return round(get_sales_velocities(SYNC_SHOP, 30).get(product_id, 0) * 30)
+
+def test_full_then_incremental_sync(app):
+    orders = [shopify_order(n, 100 + n % 2, 2, updated_minutes=n) for n in range(7)]
+    with app[0].app_context(), ShopifyStub(orders) as stub:
+        client = ShopifyClient(SYNC_SHOP, "token", "2024-01", base_url=stub.url)
+        result = sync_orders(client, SYNC_SHOP, batch_size=2, page_size=3)
+
+        assert (result["orders"], result["line_items"]) == (7, 7)
+        assert len(stub.requests) == 3  # Pages of 3, 3 and 1 orders
+        assert stub.requests[0]["order"] == "updated_at asc" and "updated_at_min" not in stub.requests[0]
+        assert result["updated_at"] == orders[-1]["updated_at"]
+        assert db.session.get(ShopSyncState, SYNC_SHOP).orders_updated_at == orders[-1]["updated_at"]
+        assert Order.query.filter_by(shop=SYNC_SHOP).count() == 7
+        assert (sold("100"), sold("101")) == (8, 6)
+
+        # One order is edited, one cancelled and one placed after the first run
+        stub.orders[6] = shopify_order(6, 100, 5, updated_minutes=20)
+        stub.orders[5] = shopify_order(5, 101, 2, updated_minutes=21, cancelled=True)
+        stub.orders.append(shopify_order(7, 101, 4, updated_minutes=22))
+        stub.requests.clear()
+        result = sync_orders(client, SYNC_SHOP, batch_size=2, page_size=3)
+
+        assert stub.requests[0]["updated_at_min"] == orders[-1]["updated_at"]
+        assert result["orders"] == 3  # Only the delta is fetched
+        assert result["updated_at"] == stub.orders[-1]["updated_at"]
+        assert LineItem.query.filter_by(order_id="5006").one().quantity == 5
+        assert LineItem.query.filter_by(order_id="5005").count() == 0
+        assert (sold("100"), sold("101")) == (11, 8)
+
+def test_sync_retries_rate_limited_requests(app):
+    with app[0].app_context(), ShopifyStub([shopify_order(1, 100, 1, updated_minutes=1)]) as stub:
+        stub.fail_next = [429, 503]
+        client = ShopifyClient(SYNC_SHOP, "token", "2024-01", base_url=stub.url)
+        assert sync_orders(client, SYNC_SHOP)["orders"] == 1
+        assert len(stub.requests) == 3
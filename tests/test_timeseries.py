@@ -0,0 +1,78 @@
+from datetime import date, datetime, timedelta
+import numpy as np
+from sqlalchemy import event
+from conftest import SHOP
+from app.aggregates import get_sales_rows
+from app.dashboard import DashboardSnapshot
+from app.forecasting import build_sales_matrix
+from app.models import db, Order, LineItem, InventoryLevel
+from app.timeseries import SalesSeries, SalesSeriesStore
+
+TODAY = date(2024, 3, 10)
+
+def test_series_window_sums_roll_and_update():
+    daily = np.array([[1.0, 2.0, 3.0, 4.0], [0.0, 0.0, 0.0, 5.0]])
+    series = SalesSeries(4, ["a", "b"], daily, TODAY, version=1)
+    assert [series.window_sum("a", window) for window in (1, 2, 4)] == [4, 7, 10]
+    assert series.window_sum("missing", 4) == 0
+
+    series.add("a", TODAY - timedelta(days=2), 10)
+    series.add("c", TODAY, 3)  # New product
+    series.add("a", TODAY - timedelta(days=9), 100)  # Outside the window
+    assert [series.window_sum("a", window) for window in (1, 3, 4)] == [4, 19, 20]
+
+    series.roll(TODAY + timedelta(days=2))
+    assert series.window_sum("a", 2) == 0
+    assert series.window_sum("a", 4) == 3 + 4
+    product_ids, sums = series.window_sums(4)
+    assert dict(zip(product_ids, sums.tolist())) == {"a": 7, "b": 5, "c": 3}
+
+    series.add("b", TODAY + timedelta(days=2), -2)  # Refund
+    assert series.window_sum("b", 1) == -2
+    series.roll(TODAY + timedelta(days=30))
+    assert series.window_sums(4)[1].tolist() == [0, 0, 0]
+
+def test_series_matrix_matches_the_rollup_matrix():
+    daily = np.array([[1.0, 0.0, 3.0, -1.0], [0.0, 2.0, 0.0, 5.0]])
+    series = SalesSeries(4, ["a", "b"], daily, TODAY, version=1)
+    assert np.array_equal(series.matrix(["b", "missing", "a"], 4), np.array([daily[1], np.zeros(4), daily[0]]))
+    assert np.array_equal(series.matrix(["a"], 2), daily[:1, 2:])
+
+def test_store_applies_committed_sales_without_rewarming(app):
+    flask_app, product_id = app
+    store = flask_app.extensions["sales_series"]
+    assert store.velocity(SHOP, product_id, 30) == 10 / 30
+
+    queries = []
+    event.listen(db.engine, "before_cursor_execute", lambda *args: queries.append(args[2]))
+    order = Order(id="order_timeseries", shop=SHOP, created_at=datetime.now())
+    db.session.add_all([order, LineItem(order_id=order.id, product_id=product_id, product_title="T-Shirt", quantity=5)])
+    db.session.commit()
+    writes = len(queries)
+    assert store.velocity(SHOP, product_id, 1) == 5
+    assert store.velocities(SHOP, 30) == {product_id: 15 / 30}
+    assert not any("daily_product_sales" in query for query in queries[writes:])  # Version checks only
+    expected = build_sales_matrix(get_sales_rows(SHOP, 30), [product_id], 30)
+    assert np.array_equal(DashboardSnapshot(SHOP).sales_matrix([product_id]), expected)
+
+    order = Order(id="order_rolled_back", shop=SHOP, created_at=datetime.now())
+    db.session.add_all([order, LineItem(order_id=order.id, product_id=product_id, product_title="T-Shirt", quantity=7)])
+    db.session.flush()
+    db.session.rollback()
+    assert store.velocity(SHOP, product_id, 1) == 5
+
+def test_store_rewarms_after_unseen_writes_but_not_inventory_writes(app):
+    flask_app, product_id = app
+    store = SalesSeriesStore(days=30)  # Not registered with the engine: sees no writes
+    assert store.velocity(SHOP, product_id) == 10 / 30
+    InventoryLevel.query.first().available = 50
+    db.session.commit()
+    queries = []
+    event.listen(db.engine, "before_cursor_execute", lambda *args: queries.append(args[2]))
+    assert store.velocities(SHOP, 30) == {product_id: 10 / 30}
+    assert not any("daily_product_sales" in query for query in queries)  # Version check only
+
+    order = Order(id="order_elsewhere", shop=SHOP, created_at=datetime.now())
+    db.session.add_all([order, LineItem(order_id=order.id, product_id=product_id, product_title="T-Shirt", quantity=20)])
+    db.session.commit()
+    assert store.velocity(SHOP, product_id) == 1.0
@@ -0,0 +1,106 @@
+import base64
+import hashlib
+import hmac
+import json
+from datetime import datetime
+from conftest import SHOP
+from app.config import Config
+from app.models import db, LineItem, Order, InventoryLevel
+from app.versions import get_data_version
+
+def post_webhook(client, topic, payload, webhook_id, secret=None):
+    body = json.dumps(payload).encode()
+    signature = base64.b64encode(hmac.new((secret or Config.API_SECRET).encode(), body, hashlib.sha256).digest())
+    return client.post("/webhooks", data=body, headers={
+        "X-Shopify-Topic": topic,
+        "X-Shopify-Shop-Domain": SHOP,
+        "X-Shopify-Webhook-Id": webhook_id,
+        "X-Shopify-Hmac-Sha256": signature.decode(),
+        "Content-Type": "application/json",
+    })
+
+def order_payload(order_id, product_id, quantity, updated_at):
+    now = datetime.now().replace(microsecond=0).isoformat()
+    return {
+        "id": order_id,
+        "created_at": now,
+        "updated_at": updated_at or now,
+        "cancelled_at": None,
+        "line_items": [{"product_id": product_id, "title": "T-Shirt", "quantity": quantity}],
+    }
+
+def test_webhooks_are_verified_deduplicated_and_batched(app):
+    flask_app, product_id = app
+    client = flask_app.test_client()
+    writer = flask_app.extensions["webhook_writer"]
+    writer.flush_interval = 5  # Only the batch size closes this batch
+
+    assert post_webhook(client, "orders/create", {}, "bad", secret="wrong").status_code == 401
+    assert post_webhook(client, "shop/update", {}, "unknown").status_code == 400
+
+    writer.batch_size = 4
+    created = order_payload(7001, product_id, 2, "2024-05-01T10:00:00-04:00")
+    updated = order_payload(7001, product_id, 3, "2024-05-01T11:00:00-04:00")
+    for topic, payload, webhook_id in [
+        ("orders/updated", updated, "wh-2"),
+        ("orders/create", created, "wh-1"),
+        ("orders/create", created, "wh-1"),  # Shopify retry of the same delivery
+        ("orders/create", order_payload(7002, product_id, 1, None), "wh-3"),
+    ]:
+        assert post_webhook(client, topic, payload, webhook_id).status_code == 200
+    writer.flush()
+    assert writer.batches == 1
+
+    with flask_app.app_context():
+        # The newer update wins regardless of delivery order
+        assert LineItem.query.filter_by(order_id="7001").one().quantity == 3
+        assert Order.query.filter_by(shop=SHOP).count() == 3
+
+    writer.batch_size, writer.flush_interval = 500, 0.01
+    assert post_webhook(client, "orders/create", created, "wh-1").status_code == 200  # Already written
+    writer.flush()
+    with flask_app.app_context():
+        assert LineItem.query.filter_by(order_id="7001").one().quantity == 3
+
+def test_inventory_webhook_updates_stock_and_invalidates(app):
+    flask_app, _ = app
+    client = flask_app.test_client()
+    writer = flask_app.extensions["webhook_writer"]
+    writer.flush_interval = 0.01
+    with flask_app.app_context():
+        level = InventoryLevel.query.first()
+        item_id, location_id = level.inventory_item_id, level.location_id
+        version = get_data_version(SHOP)
+
+    payload = {"inventory_item_id": item_id, "location_id": location_id, "available": 42,
+               "updated_at": "2024-05-01T10:00:00-04:00"}
+    assert post_webhook(client, "inventory_levels/update", payload, "inv-1").status_code == 200
+    writer.flush()
+    with flask_app.app_context():
+        db.session.expire_all()
+        assert InventoryLevel.query.filter_by(inventory_item_id=item_id).one().available == 42
+        assert get_data_version(SHOP) == version + 1
+
+def test_order_updates_apply_in_utc_order_and_never_go_back(app):
+    flask_app, product_id = app
+    client = flask_app.test_client()
+    writer = flask_app.extensions["webhook_writer"]
+    writer.batch_size, writer.flush_interval = 2, 5
+
+    # 13:30 UTC sorts after 14:00 UTC as a raw string
+    newer = order_payload(7101, product_id, 6, "2024-05-01T10:00:00-04:00")
+    older = order_payload(7101, product_id, 4, "2024-05-01T15:30:00+02:00")
+    assert post_webhook(client, "orders/updated", newer, "wh-utc-1").status_code == 200
+    assert post_webhook(client, "orders/updated", older, "wh-utc-2").status_code == 200
+    writer.flush()
+    with flask_app.app_context():
+        assert LineItem.query.filter_by(order_id="7101").one().quantity == 6
+
+    # An older update arriving in a later batch, e.g. a Shopify retry served by another worker
+    writer.batch_size, writer.flush_interval = 500, 0.01
+    stale = order_payload(7101, product_id, 1, "2024-05-01T09:00:00-04:00")
+    assert post_webhook(client, "orders/updated", stale, "wh-utc-3").status_code == 200
+    writer.flush()
+    with flask_app.app_context():
+        assert LineItem.query.filter_by(order_id="7101").one().quantity == 6
+        assert str(db.session.get(Order, "7101").updated_at) == "2024-05-01 14:00:00"